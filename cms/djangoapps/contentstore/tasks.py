@@ -26,7 +26,7 @@ from django.test import RequestFactory
 from django.utils.text import get_valid_filename
 from django.utils.translation import ugettext as _
 from djcelery.common import respect_language
-from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.keys import AssetKey, CourseKey
 from opaque_keys.edx.locator import LibraryLocator, BlockUsageLocator
 from organizations.models import OrganizationCourse
 from path import Path as path
@@ -41,10 +41,12 @@ from contentstore.storage import course_import_export_storage
 from contentstore.utils import initialize_permissions, reverse_usage_url
 from course_action_state.models import CourseRerunState
 from models.settings.course_metadata import CourseMetadata
+from openedx.core.djangoapps.contentserver.caching import del_cached_content
 from openedx.core.djangoapps.embargo.models import CountryAccessRule, RestrictedCourse
 from openedx.core.lib.extract_tar import safetar_extractall
 from student.auth import has_course_author_access
 from xmodule.contentstore.django import contentstore
+from xmodule.contentstore.mongo import image_variants_to_mongo
 from xmodule.course_module import CourseFields
 from xmodule.exceptions import SerializationError
 from xmodule.modulestore import COURSE_ROOT, LIBRARY_ROOT
@@ -479,6 +481,49 @@ def push_course_update_task(course_key_string, course_subscription_id, course_di
     send_push_course_update(course_key_string, course_subscription_id, course_display_name)
 
 
+@task()
+def generate_image_derivatives(asset_key_string):
+    """
+    Generates the thumbnail and the resized variants of an uploaded image, and
+    records them on the image so they can be served in its place.
+    """
+    asset_key = AssetKey.from_string(asset_key_string)
+    store = contentstore()
+    try:
+        content = store.find(asset_key)
+    except NotFoundError:
+        LOGGER.warning(u'Image derivatives: asset %s was deleted before being processed', asset_key_string)
+        return
+
+    start = datetime.now(UTC)
+    thumbnail_content, thumbnail_location = store.generate_thumbnail(content)
+    image_variants = store.generate_image_variants(content)
+
+    attrs = {'image_variants': image_variants_to_mongo(image_variants)}
+    if thumbnail_content is not None:
+        attrs['thumbnail_location'] = thumbnail_location.to_deprecated_list_repr()
+    try:
+        store.set_attrs(asset_key, attrs)
+        # the variants were saved with the lock of the image, which may have changed meanwhile
+        locked = store.get_attr(asset_key, 'locked', False)
+    except NotFoundError:
+        LOGGER.warning(u'Image derivatives: asset %s was deleted while being processed', asset_key_string)
+        return
+    if locked != content.locked:
+        store.set_image_variants_locked(asset_key, image_variants, locked)
+
+    # delete cached thumbnail even if one couldn't be created this time (else the old thumbnail will continue to show)
+    del_cached_content(thumbnail_location)
+    for __, variant_location in image_variants:
+        del_cached_content(variant_location)
+    del_cached_content(asset_key)
+
+    duration = (datetime.now(UTC) - start).total_seconds()
+    dog_stats_api.histogram('contentstore.image_derivatives.duration', duration)
+    dog_stats_api.histogram('contentstore.image_derivatives.variants', len(image_variants))
+    LOGGER.info(u'Image derivatives: generated %d variants of %s in %.2fs', len(image_variants), asset_key, duration)
+
+
 class CourseExportTask(UserTask):  # pylint: disable=abstract-method
     """
     Base class for course and library export tasks.
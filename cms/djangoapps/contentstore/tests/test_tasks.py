@@ -5,6 +5,7 @@ from __future__ import absolute_import, division, print_function
 
 import copy
 import json
+from io import BytesIO
 from uuid import uuid4
 
 import mock
@@ -14,13 +15,16 @@ from django.test.utils import override_settings
 from opaque_keys.edx.locator import CourseLocator
 from organizations.models import OrganizationCourse
 from organizations.tests.factories import OrganizationFactory
+from PIL import Image
 from user_tasks.models import UserTaskArtifact, UserTaskStatus
 
-from contentstore.tasks import export_olx, rerun_course
+from contentstore.tasks import export_olx, generate_image_derivatives, rerun_course
 from contentstore.tests.test_libraries import LibraryTestCase
 from contentstore.tests.utils import CourseTestCase
 from course_action_state.models import CourseRerunState
 from openedx.core.djangoapps.embargo.models import Country, CountryAccessRule, RestrictedCourse
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
 
 TEST_DATA_CONTENTSTORE = copy.deepcopy(settings.CONTENTSTORE)
@@ -161,3 +165,37 @@ class RerunCourseTaskTestCase(CourseTestCase):
             restricted_course=restricted_course,
             country=restricted_country
         )
+
+
+@override_settings(CONTENTSTORE=TEST_DATA_CONTENTSTORE)
+class GenerateImageDerivativesTaskTestCase(CourseTestCase):
+    """
+    Tests of the generate_image_derivatives task
+    """
+    def test_success(self):
+        """
+        The thumbnail and the variants are generated, recorded on the image and locked along with it.
+        """
+        image_file = BytesIO()
+        Image.new('RGB', (800, 400)).save(image_file, 'PNG')
+        location = self.course.id.make_asset_key('asset', 'wide.png')
+        contentstore().save(StaticContent(location, 'wide.png', 'image/png', image_file.getvalue(), locked=True))
+
+        generate_image_derivatives(unicode(location))
+
+        content = contentstore().find(location)
+        self.assertIsNotNone(content.thumbnail_location)
+        self.assertEqual([width for width, __ in content.image_variants], [320, 640, 800])
+        self.assertEqual(content.image_variants[-1][1], location)
+        for __, variant_location in content.image_variants[:-1]:
+            variant = contentstore().find(variant_location)
+            self.assertEqual(variant.content_type, 'image/jpeg')
+            self.assertTrue(variant.locked)
+
+    def test_deleted_asset(self):
+        """
+        The task gives up on images deleted before it runs.
+        """
+        location = self.course.id.make_asset_key('asset', 'deleted.png')
+        generate_image_derivatives(unicode(location))
+        self.assertIsNone(contentstore().find(location, throw_on_not_found=False))
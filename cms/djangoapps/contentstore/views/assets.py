@@ -15,10 +15,12 @@ from pymongo import ASCENDING, DESCENDING
 from six import text_type
 from xmodule.contentstore.content import StaticContent
 from xmodule.contentstore.django import contentstore
+from xmodule.contentstore.mongo import image_variants_from_mongo
 from xmodule.exceptions import NotFoundError
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
+from contentstore.tasks import generate_image_derivatives
 from contentstore.utils import reverse_course_url
 from contentstore.views.exception import AssetNotFoundException, AssetSizeTooLargeException
 from edxmako.shortcuts import render_to_response
@@ -370,6 +372,13 @@ def update_course_run_asset(course_key, upload_file):
 
     content, temporary_file_path = _get_file_content_and_path(file_metadata, course_key)
 
+    if _generates_image_derivatives_asynchronously(content):
+        # the thumbnail and the resized variants are generated in the background
+        contentstore().save(content)
+        del_cached_content(content.location)
+        generate_image_derivatives.delay(text_type(content.location))
+        return content
+
     (thumbnail_content, thumbnail_location) = contentstore().generate_thumbnail(content,
                                                                                 tempfile_path=temporary_file_path)
 
@@ -483,6 +492,18 @@ def _get_file_content_and_path(file_metadata, course_key):
     return content, temporary_file_path
 
 
+def _generates_image_derivatives_asynchronously(content):
+    """
+    Returns whether the thumbnail and resized variants of the given content are
+    generated by a background task rather than during the upload.
+    """
+    return (
+        settings.FEATURES.get('ENABLE_IMAGE_VARIANTS', False) and
+        content.content_type is not None and
+        content.content_type.split('/')[0] == 'image'
+    )
+
+
 def _check_thumbnail_uploaded(thumbnail_content):
     return thumbnail_content is not None
 
@@ -527,6 +548,7 @@ def _update_asset(request, course_key, asset_key):
         contentstore().set_attr(asset_key, 'locked', modified_asset['locked'])
         # delete the asset from the cache so we check the lock status the next time it is requested.
         del_cached_content(asset_key)
+        _update_image_variants_lock(asset_key, modified_asset['locked'])
         return JsonResponse(modified_asset, status=201)
 
 
@@ -540,6 +562,7 @@ def delete_asset(course_key, asset_key):
     _save_content_to_trash(content)
 
     _delete_thumbnail(content.thumbnail_location, course_key, asset_key)
+    _delete_image_variants(content.image_variants, content.location)
     contentstore().delete(content.get_id())
     del_cached_content(content.location)
 
@@ -568,6 +591,28 @@ def _delete_thumbnail(thumbnail_location, course_key, asset_key):
             logging.warning('Could not delete thumbnail: %s', thumbnail_location)
 
 
+def _delete_image_variants(image_variants, location):
+    for __, variant_location in image_variants or []:
+        if variant_location == location:
+            continue
+        try:
+            variant_content = contentstore().find(variant_location)
+            contentstore().delete(variant_content.get_id())
+            del_cached_content(variant_location)
+        except Exception:  # pylint: disable=broad-except
+            logging.warning('Could not delete image variant: %s', variant_location)
+
+
+def _update_image_variants_lock(asset_key, locked):
+    """
+    Locks or unlocks the resized variants of an image along with it.
+    """
+    image_variants = image_variants_from_mongo(contentstore().get_attr(asset_key, 'image_variants'))
+    contentstore().set_image_variants_locked(asset_key, image_variants, locked)
+    for __, variant_location in image_variants or []:
+        del_cached_content(variant_location)
+
+
 def _get_asset_json(display_name, content_type, date, location, thumbnail_location, locked):
     '''
     Helper method for formatting the asset information to send to client.
@@ -349,6 +349,17 @@ class UploadTestCase(AssetsTestCase):
         resp = self.upload_asset("test_image", asset_type="image")
         self.assertEquals(resp.status_code, 200)
 
+    @mock.patch('contentstore.views.assets.generate_image_derivatives')
+    def test_upload_image_derivatives_async(self, mock_generate_image_derivatives):
+        with patch.dict(settings.FEATURES, {'ENABLE_IMAGE_VARIANTS': True}):
+            resp = self.upload_asset("test_image", asset_type="image")
+        self.assertEquals(resp.status_code, 200)
+        # the thumbnail is generated by the task
+        self.assertIsNone(json.loads(resp.content)['asset']['thumbnail'])
+        location = self.course.id.make_asset_key('asset', 'test_image.jpg')
+        self.assertIsNotNone(contentstore().find(location))
+        mock_generate_image_derivatives.delay.assert_called_once_with(unicode(location))
+
     def test_no_file(self):
         resp = self.client.post(self.url, {"name": "file.txt"}, "application/json")
         self.assertEquals(resp.status_code, 400)
@@ -490,6 +501,24 @@ class LockAssetTestCase(AssetsTestCase):
         self.assertFalse(resp_asset['locked'])
         verify_asset_locked_state(False)
 
+    def test_locking_image_variants(self):
+        """
+        Tests that the resized variants of an image are locked and unlocked along with it.
+        """
+        image_file = BytesIO()
+        Image.new('RGB', (800, 400)).save(image_file, 'PNG')
+        location = self.course.id.make_asset_key('asset', 'wide.png')
+        content = StaticContent(location, 'wide.png', 'image/png', image_file.getvalue())
+        content.image_variants = contentstore().generate_image_variants(content)
+        contentstore().save(content)
+        url = reverse_course_url('assets_handler', self.course.id, kwargs={'asset_key_string': unicode(location)})
+
+        for locked in (True, False):
+            resp = self.client.post(url, json.dumps({'locked': locked}), "application/json")
+            self.assertEqual(resp.status_code, 201)
+            for __, variant_location in content.image_variants:
+                self.assertEqual(contentstore().find(variant_location).locked, locked)
+
 
 class DeleteAssetTestCase(AssetsTestCase):
     """
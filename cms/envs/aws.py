@@ -381,6 +381,18 @@ for name, database in DATABASES.items():
         })
 
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
+COURSE_STRUCTURE_LRU_CACHE_SIZE = ENV_TOKENS.get('COURSE_STRUCTURE_LRU_CACHE_SIZE', COURSE_STRUCTURE_LRU_CACHE_SIZE)
+STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE = ENV_TOKENS.get(
+    'STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE', STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE
+)
+CONTENTSERVER_DISK_CACHE_DIR = ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE_DIR', CONTENTSERVER_DISK_CACHE_DIR)
+CONTENTSERVER_DISK_CACHE_SIZE = ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE_SIZE', CONTENTSERVER_DISK_CACHE_SIZE)
+CONTENTSERVER_DISK_CACHE_SENDFILE_HEADER = ENV_TOKENS.get(
+    'CONTENTSERVER_DISK_CACHE_SENDFILE_HEADER', CONTENTSERVER_DISK_CACHE_SENDFILE_HEADER
+)
+CONTENTSERVER_DISK_CACHE_SENDFILE_PREFIX = ENV_TOKENS.get(
+    'CONTENTSERVER_DISK_CACHE_SENDFILE_PREFIX', CONTENTSERVER_DISK_CACHE_SENDFILE_PREFIX
+)
 
 MODULESTORE_FIELD_OVERRIDE_PROVIDERS = ENV_TOKENS.get(
     'MODULESTORE_FIELD_OVERRIDE_PROVIDERS',
@@ -168,6 +168,12 @@ CACHES = {
     },
 }
 
+# Tests count the course structure cache and mongo calls
+COURSE_STRUCTURE_LRU_CACHE_SIZE = 0
+
+# Tests change course assets without going through del_cached_content
+STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE = 0
+
 ################################# CELERY ######################################
 
 CELERY_ALWAYS_EAGER = True
@@ -8,10 +8,24 @@ from django.conf import settings
 from xmodule.contentstore.content import StaticContent
 
 from opaque_keys.edx.locator import AssetLocator
+from openedx.core.djangoapps.contentserver.caching import get_course_assets_version
+from openedx.core.lib.cache_utils import LRUCache, memoized
 from six import text_type
 
 log = logging.getLogger(__name__)
 XBLOCK_STATIC_RESOURCE_PREFIX = '/static/xblock'
+COURSE_URL_PREFIX = '/course/'
+JUMP_TO_ID_URL_PREFIX = '/jump_to_id/'
+
+# Seconds a resolved course asset url is reused.  Assets changed without going
+# through del_cached_content, e.g. by a course import, are picked up after it.
+RESOLVED_URL_CACHE_TIMEOUT = 5 * 60
+
+# Matches the course image urls of img tags without a srcset.
+IMG_STATIC_SRC_PATTERN = re.compile(
+    r"""<img\b(?![^>]*\bsrcset\s*=)[^>]*?\ssrc\s*=\s*(?P<quote>\\?['"])/static/(?P<path>[^'"?#]+)(?P=quote)""",
+    re.IGNORECASE,
+)
 
 
 def _url_replace_regex(prefix):
@@ -65,13 +79,9 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
 
     output: <text> after the link rewriting rules are applied
     """
-
-    def replace_jump_to_id_url(match):
-        quote = match.group('quote')
-        rest = match.group('rest')
-        return "".join([quote, jump_to_id_base_url + rest, quote])
-
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return _apply_replacement(
+        text, JUMP_TO_ID_URL_PREFIX, _jump_to_id_url_replacement(jump_to_id_base_url)
+    )
 
 
 def replace_course_urls(text, course_key):
@@ -83,15 +93,7 @@ def replace_course_urls(text, course_key):
 
     returns: text with the links replaced
     """
-
-    course_id = text_type(course_key)
-
-    def replace_course_url(match):
-        quote = match.group('quote')
-        rest = match.group('rest')
-        return "".join([quote, '/courses/' + course_id + '/', rest, quote])
-
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return _apply_replacement(text, COURSE_URL_PREFIX, _course_url_replacement(course_key))
 
 
 def process_static_urls(text, replacement_function, data_dir=None):
@@ -99,35 +101,8 @@ def process_static_urls(text, replacement_function, data_dir=None):
     Run an arbitrary replacement function on any urls matching the static file
     directory
     """
-    def wrap_part_extraction(match):
-        """
-        Unwraps a match group for the captures specified in _url_replace_regex
-        and forward them on as function arguments
-        """
-        original = match.group(0)
-        prefix = match.group('prefix')
-        quote = match.group('quote')
-        rest = match.group('rest')
-
-        # Don't rewrite XBlock resource links.  Probably wasn't a good idea that /static
-        # works for actual static assets and for magical course asset URLs....
-        full_url = prefix + rest
-
-        starts_with_static_url = full_url.startswith(unicode(settings.STATIC_URL))
-        starts_with_prefix = full_url.startswith(XBLOCK_STATIC_RESOURCE_PREFIX)
-        contains_prefix = XBLOCK_STATIC_RESOURCE_PREFIX in full_url
-        if starts_with_prefix or (starts_with_static_url and contains_prefix):
-            return original
-
-        return replacement_function(original, prefix, quote, rest)
-
-    return re.sub(
-        _url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
-            static_url=settings.STATIC_URL,
-            data_dir=data_dir
-        )),
-        wrap_part_extraction,
-        text
+    return _apply_replacement(
+        text, _static_url_prefix(data_dir), _static_url_replacement(replacement_function)
     )
 
 
@@ -160,6 +135,197 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
     course_id: The course identifier used to distinguish static content for this course in studio
     static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
     """
+    text = _add_image_srcsets(text, course_id, static_asset_path)
+    return process_static_urls(
+        text,
+        _static_url_replacer(data_directory, course_id, static_asset_path),
+        data_dir=static_asset_path or data_directory,
+    )
+
+
+def replace_urls(text, data_directory=None, course_id=None, static_asset_path='', jump_to_id_base_url=None):
+    """
+    Applies replace_static_urls, replace_course_urls and, if jump_to_id_base_url
+    is given, replace_jump_to_id_urls to text in a single pass.  Unlike the
+    successive replacements, a quote is never shared by two urls, as in
+    '"/course/"/jump_to_id/id"'.
+    """
+    replacements = [
+        (
+            _static_url_prefix(static_asset_path or data_directory),
+            _static_url_replacement(_static_url_replacer(data_directory, course_id, static_asset_path)),
+        ),
+        (COURSE_URL_PREFIX, _course_url_replacement(course_id)),
+    ]
+    if jump_to_id_base_url is not None:
+        replacements.append((JUMP_TO_ID_URL_PREFIX, _jump_to_id_url_replacement(jump_to_id_base_url)))
+    text = _add_image_srcsets(text, course_id, static_asset_path)
+
+    prefixes = tuple(prefix for prefix, __ in replacements)
+    pattern = _url_replace_pattern(u'|'.join(u'(?P<prefix{}>{})'.format(index, prefix)
+                                             for index, prefix in enumerate(prefixes)))
+
+    def replace_url(match):
+        """
+        Dispatches the match to the replacement of the matched prefix.
+        """
+        for index, (__, replacement) in enumerate(replacements):
+            if match.group('prefix{}'.format(index)) is not None:
+                return replacement(match)
+        return match.group(0)
+
+    return pattern.sub(replace_url, text)
+
+
+def _add_image_srcsets(text, course_id, static_asset_path):
+    """
+    Adds a srcset of the resized variants of course images to the img tags
+    without one, if ENABLE_IMAGE_VARIANTS is set.  The srcset urls are final,
+    so the static url replacement leaves them alone.
+    """
+    if not settings.FEATURES.get('ENABLE_IMAGE_VARIANTS', False) or static_asset_path or not course_id:
+        return text
+    course_asset_settings = []
+
+    def add_image_srcset(match):
+        """
+        Appends the srcset of the matched image to its src attribute.
+        """
+        path = match.group('path')
+        if path.startswith('xblock/'):
+            return match.group(0)
+        if not course_asset_settings:
+            course_asset_settings.extend(_get_course_asset_settings(course_id))
+        srcset = _get_image_srcset(course_id, path, *course_asset_settings)
+        if not srcset:
+            return match.group(0)
+        quote = match.group('quote')
+        return u''.join([match.group(0), u' srcset=', quote, srcset, quote])
+
+    return IMG_STATIC_SRC_PATTERN.sub(add_image_srcset, text)
+
+
+def _get_course_asset_settings(course_id):
+    """
+    Returns the asset base url, the excluded extensions and, if the resolved
+    url cache is enabled, the assets version of the given course, read once
+    per replacement call rather than once per url.
+    """
+    # Import is placed here to avoid model import at project startup.
+    from static_replace.models import AssetBaseUrlConfig, AssetExcludedExtensionsConfig
+    assets_version = None
+    if getattr(settings, 'STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE', 0):
+        assets_version = get_course_assets_version(course_id)
+    return [
+        AssetBaseUrlConfig.get_base_url(),
+        AssetExcludedExtensionsConfig.get_excluded_extensions(),
+        assets_version,
+    ]
+
+
+def _get_image_srcset(course_id, path, base_url, excluded_exts, assets_version):
+    """
+    Returns the srcset of the given course image path, or an empty string if
+    it has no variants, from the process-wide cache of course asset urls if
+    STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE enables it.
+    """
+    max_size = getattr(settings, 'STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE', 0)
+    if not max_size:
+        return StaticContent.get_image_srcset(course_id, path, base_url, excluded_exts) or u''
+
+    cache = _get_resolved_url_cache(max_size)
+    cache_key = (
+        'srcset', text_type(course_id), path, base_url, tuple(excluded_exts), assets_version,
+    )
+    srcset = cache.get(cache_key)
+    if srcset is None:
+        srcset = StaticContent.get_image_srcset(course_id, path, base_url, excluded_exts) or u''
+        cache.set(cache_key, srcset)
+    return srcset
+
+
+@memoized
+def _url_replace_pattern(prefix):
+    """
+    Returns the compiled _url_replace_regex for the given prefix.
+    """
+    return re.compile(_url_replace_regex(prefix))
+
+
+def _apply_replacement(text, prefix, replacement):
+    """
+    Substitutes the result of replacement for each url matching the given prefix.
+    """
+    return _url_replace_pattern(prefix).sub(replacement, text)
+
+
+def _static_url_prefix(data_dir):
+    """
+    Returns the prefix of the static urls that are not in the given data directory.
+    """
+    return u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+        static_url=settings.STATIC_URL,
+        data_dir=data_dir
+    )
+
+
+def _course_url_replacement(course_key):
+    """
+    Returns the match replacement of replace_course_urls.
+    """
+    course_id = text_type(course_key)
+
+    def replace_course_url(match):
+        quote = match.group('quote')
+        rest = match.group('rest')
+        return "".join([quote, '/courses/' + course_id + '/', rest, quote])
+    return replace_course_url
+
+
+def _jump_to_id_url_replacement(jump_to_id_base_url):
+    """
+    Returns the match replacement of replace_jump_to_id_urls.
+    """
+    def replace_jump_to_id_url(match):
+        quote = match.group('quote')
+        rest = match.group('rest')
+        return "".join([quote, jump_to_id_base_url + rest, quote])
+    return replace_jump_to_id_url
+
+
+def _static_url_replacement(replacement_function):
+    """
+    Returns the match replacement running replacement_function on static urls.
+    """
+    def wrap_part_extraction(match):
+        """
+        Unwraps a match group for the captures specified in _url_replace_regex
+        and forward them on as function arguments
+        """
+        original = match.group(0)
+        prefix = match.group('prefix')
+        quote = match.group('quote')
+        rest = match.group('rest')
+
+        # Don't rewrite XBlock resource links.  Probably wasn't a good idea that /static
+        # works for actual static assets and for magical course asset URLs....
+        full_url = prefix + rest
+
+        starts_with_static_url = full_url.startswith(unicode(settings.STATIC_URL))
+        starts_with_prefix = full_url.startswith(XBLOCK_STATIC_RESOURCE_PREFIX)
+        contains_prefix = XBLOCK_STATIC_RESOURCE_PREFIX in full_url
+        if starts_with_prefix or (starts_with_static_url and contains_prefix):
+            return original
+
+        return replacement_function(original, prefix, quote, rest)
+    return wrap_part_extraction
+
+
+def _static_url_replacer(data_directory, course_id, static_asset_path):
+    """
+    Returns the replacement function of replace_static_urls.
+    """
+    course_asset_settings = []
 
     def replace_static_url(original, prefix, quote, rest):
         """
@@ -174,29 +340,9 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
             return original
         # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
         elif (not static_asset_path) and course_id:
-            # first look in the static file pipeline and see if we are trying to reference
-            # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
-
-            exists_in_staticfiles_storage = False
-            try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-
-            if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
-            else:
-                # if not, then assume it's courseware specific content and then look in the
-                # Mongo-backed database
-                # Import is placed here to avoid model import at project startup.
-                from static_replace.models import AssetBaseUrlConfig, AssetExcludedExtensionsConfig
-                base_url = AssetBaseUrlConfig.get_base_url()
-                excluded_exts = AssetExcludedExtensionsConfig.get_excluded_extensions()
-                url = StaticContent.get_canonicalized_asset_path(course_id, rest, base_url, excluded_exts)
-
-                if AssetLocator.CANONICAL_NAMESPACE in url:
-                    url = url.replace('block@', 'block/', 1)
+            if not course_asset_settings:
+                course_asset_settings.extend(_get_course_asset_settings(course_id))
+            url = _get_course_asset_url(course_id, rest, *course_asset_settings)
 
         # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
         else:
@@ -214,5 +360,60 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
                 url = "".join([prefix, course_path])
 
         return "".join([quote, url, quote])
+    return replace_static_url
+
+
+@memoized
+def _get_resolved_url_cache(max_size):
+    """
+    Returns the process-wide cache of course asset urls with the given size.
+    """
+    return LRUCache('static_replace.resolved_urls', max_size=max_size, timeout=RESOLVED_URL_CACHE_TIMEOUT)
+
+
+def _get_course_asset_url(course_id, rest, base_url, excluded_exts, assets_version):
+    """
+    Returns the url of the given course asset path, from the process-wide
+    cache if STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE enables it.  Cached urls
+    are keyed by the asset settings and the version of the course assets,
+    which changes on asset upload, lock and delete.
+    """
+    max_size = getattr(settings, 'STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE', 0)
+    if not max_size:
+        return _resolve_course_asset_url(course_id, rest, base_url, excluded_exts)
+
+    cache = _get_resolved_url_cache(max_size)
+    cache_key = (
+        text_type(course_id), rest, base_url, tuple(excluded_exts), assets_version,
+    )
+    url = cache.get(cache_key)
+    if url is None:
+        url = _resolve_course_asset_url(course_id, rest, base_url, excluded_exts)
+        cache.set(cache_key, url)
+    return url
+
 
-    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+def _resolve_course_asset_url(course_id, rest, base_url, excluded_exts):
+    """
+    Returns the url of the given course asset path.
+    """
+    # first look in the static file pipeline and see if we are trying to reference
+    # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
+
+    exists_in_staticfiles_storage = False
+    try:
+        exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+    except Exception as err:
+        log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+            rest, str(err)))
+
+    if exists_in_staticfiles_storage:
+        url = staticfiles_storage.url(rest)
+    else:
+        # if not, then assume it's courseware specific content and then look in the
+        # Mongo-backed database
+        url = StaticContent.get_canonicalized_asset_path(course_id, rest, base_url, excluded_exts)
+
+        if AssetLocator.CANONICAL_NAMESPACE in url:
+            url = url.replace('block@', 'block/', 1)
+    return url
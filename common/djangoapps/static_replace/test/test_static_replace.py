@@ -19,7 +19,9 @@ from static_replace import (
     make_static_urls_absolute,
     process_static_urls,
     replace_course_urls,
-    replace_static_urls
+    replace_jump_to_id_urls,
+    replace_static_urls,
+    replace_urls
 )
 from xmodule.assetstore.assetmgr import AssetManager
 from xmodule.contentstore.content import StaticContent
@@ -152,6 +154,87 @@ def test_data_dir_fallback(mock_storage, mock_modulestore, mock_settings):
     assert_equals('"/static/data_dir/file.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
 
 
+@patch('static_replace.StaticContent', autospec=True)
+@patch('static_replace.models.AssetBaseUrlConfig.get_base_url')
+@patch('static_replace.models.AssetExcludedExtensionsConfig.get_excluded_extensions')
+@patch('static_replace.get_course_assets_version')
+@override_settings(STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE=10)
+def test_resolved_url_cache(mock_assets_version, mock_get_excluded_extensions, mock_get_base_url, mock_static_content):
+    mock_static_content.get_canonicalized_asset_path.return_value = "/mock_url"
+    mock_get_base_url.return_value = u''
+    mock_get_excluded_extensions.return_value = ['foobar']
+    mock_assets_version.return_value = 'version1'
+    course_key = CourseKey.from_string('org/resolved_url_cache/run')
+
+    for _ in range(3):
+        assert_equals('"/mock_url"', replace_static_urls(STATIC_SOURCE, course_id=course_key))
+    assert_equals(mock_static_content.get_canonicalized_asset_path.call_count, 1)
+
+    # the assets version is read once per call, not once per url
+    mock_assets_version.reset_mock()
+    replace_static_urls(STATIC_SOURCE + ' ' + STATIC_SOURCE, course_id=course_key)
+    assert_equals(mock_assets_version.call_count, 1)
+
+    # changing the course assets changes their version
+    mock_assets_version.return_value = 'version2'
+    replace_static_urls(STATIC_SOURCE, course_id=course_key)
+    assert_equals(mock_static_content.get_canonicalized_asset_path.call_count, 2)
+
+
+@patch('static_replace.StaticContent', autospec=True)
+@patch('static_replace.models.AssetBaseUrlConfig.get_base_url')
+@patch('static_replace.models.AssetExcludedExtensionsConfig.get_excluded_extensions')
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_IMAGE_VARIANTS': True})
+def test_image_srcsets(mock_get_excluded_extensions, mock_get_base_url, mock_static_content):
+    mock_static_content.get_canonicalized_asset_path.side_effect = lambda course_key, path, base_url, exts: '/' + path
+    mock_static_content.get_image_srcset.side_effect = lambda course_key, path, base_url, exts: (
+        '/small.png 320w, /file.png 800w' if path == 'file.png' else None
+    )
+    mock_get_base_url.return_value = u''
+    mock_get_excluded_extensions.return_value = []
+    text = (
+        '<img alt="file" src="/static/file.png"/> <img src="/static/other.png"/> '
+        '<img src="/static/file.png" srcset="/custom.png 2x"/> <a href="/static/file.png">file</a>'
+    )
+    expected = (
+        '<img alt="file" src="/file.png" srcset="/small.png 320w, /file.png 800w"/> <img src="/other.png"/> '
+        '<img src="/file.png" srcset="/custom.png 2x"/> <a href="/file.png">file</a>'
+    )
+    assert_equals(expected, replace_static_urls(text, course_id=COURSE_KEY))
+    assert_equals(expected, replace_urls(text, course_id=COURSE_KEY))
+
+    # static asset paths aren't course assets
+    assert_false('srcset="/small.png' in replace_static_urls(text, DATA_DIRECTORY, static_asset_path=DATA_DIRECTORY))
+
+
+@patch('static_replace.staticfiles_storage', autospec=True)
+@patch('xmodule.modulestore.django.modulestore', autospec=True)
+def test_replace_urls(mock_modulestore, mock_storage):
+    """
+    Make sure replace_urls gives the same result as the successive replacements.
+    """
+    mock_storage.exists.return_value = False
+    mock_storage.url.side_effect = lambda path: '/static/' + path
+    mock_modulestore.return_value = Mock(XMLModuleStore)
+    jump_to_id_base_url = '/courses/org/course/run/jump_to_id/'
+    text = (
+        '<a href="/course/info">info</a> <img src="/static/file.png"/> <a href=\'/jump_to_id/id\'>id</a> '
+        '<img src="/static/file.png?raw"/> <img src="/static/data_dir/file.png"/>'
+    )
+    static_replaced = replace_static_urls(text, None, COURSE_KEY, static_asset_path=DATA_DIRECTORY)
+    expected = replace_jump_to_id_urls(
+        replace_course_urls(static_replaced, COURSE_KEY), COURSE_KEY, jump_to_id_base_url,
+    )
+    assert_equals(
+        expected,
+        replace_urls(
+            text, None, COURSE_KEY, static_asset_path=DATA_DIRECTORY, jump_to_id_base_url=jump_to_id_base_url,
+        )
+    )
+    assert_true('/courses/org/course/run/info' in expected)
+    assert_true(jump_to_id_base_url + 'id' in expected)
+
+
 def test_raw_static_check():
     """
     Make sure replace_static_urls leaves alone things that end in '.raw'
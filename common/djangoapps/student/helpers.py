@@ -31,6 +31,8 @@ from lms.djangoapps.certificates.api import (
 )
 from lms.djangoapps.certificates.models import (
     CertificateStatuses,
+    GeneratedCertificate,
+    certificate_status,
     certificate_status_for_student
 )
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
@@ -466,6 +468,34 @@ def cert_info(user, course_overview):
     )
 
 
+def cert_info_for_courses(user, course_overviews):
+    """
+    Get the certificate info of the given student for each of the given courses,
+    loading the student's certificates in a single query.
+
+    Arguments:
+        user (User): A user.
+        course_overviews (list of CourseOverview): The courses.
+
+    Returns:
+        dict: The `cert_info` of each course, keyed by course key.
+    """
+    certificates = {
+        certificate.course_id: certificate
+        for certificate in GeneratedCertificate.objects.filter(
+            user=user, course_id__in=[course_overview.id for course_overview in course_overviews],
+        )
+    }
+    return {
+        course_overview.id: _cert_info(
+            user,
+            course_overview,
+            certificate_status(certificates.get(course_overview.id))
+        )
+        for course_overview in course_overviews
+    }
+
+
 def _cert_info(user, course_overview, cert_status):
     """
     Implements the logic for cert_info -- split out for testing.
@@ -1789,11 +1789,15 @@ class CourseEnrollment(models.Model):
 
         return status_hash
 
-    def is_paid_course(self):
+    def is_paid_course(self, modes_dict=None):
         """
         Returns True, if course is paid
+
+        Keyword Args:
+            modes_dict (dict): If provided, use these selectable course modes
+                of the course instead of loading them.
         """
-        paid_course = CourseMode.is_white_label(self.course_id)
+        paid_course = CourseMode.is_white_label(self.course_id, modes_dict=modes_dict)
         if paid_course or CourseMode.is_professional_slug(self.mode):
             return True
 
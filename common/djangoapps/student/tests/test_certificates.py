@@ -170,7 +170,7 @@ class CertificateDisplayTest(CertificateDisplayTestBase):
 
     @patch.dict('django.conf.settings.FEATURES', {'CERTIFICATES_HTML_VIEW': False})
     def test_no_certificate_status_no_problem(self):
-        with patch('student.views.dashboard.cert_info', return_value={}):
+        with patch('student.views.dashboard.cert_info_for_courses', return_value={self.course.id: {}}):
             self._create_certificate('honor')
             self._check_can_not_download_certificate()
 
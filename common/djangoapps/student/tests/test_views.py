@@ -30,10 +30,11 @@ from openedx.core.djangoapps.content.course_overviews.tests.factories import Cou
 from openedx.core.djangoapps.site_configuration.tests.test_util import with_site_configuration_context
 from pyquery import PyQuery as pq
 from student.cookies import get_user_info_cookie_data
-from student.helpers import DISABLE_UNENROLL_CERT_STATES
+from student.helpers import DISABLE_UNENROLL_CERT_STATES, cert_info_for_courses
 from student.models import CourseEnrollment, UserProfile
 from student.signals import REFUND_ORDER
 from student.tests.factories import CourseEnrollmentFactory, UserFactory
+from student.views.dashboard import get_blocked_courses, get_paid_courses, get_started_courses
 from util.milestones_helpers import (get_course_milestones,
                                      remove_prerequisite_course,
                                      set_prerequisite_courses)
@@ -77,6 +78,10 @@ class TestStudentDashboardUnenrollments(SharedModuleStoreTestCase):
             'show_survey_button': False
         }
 
+    def mock_certs(self, user, course_overviews):
+        """ Return a preset certificate status for each course. """
+        return {course_overview.id: self.mock_cert(user, course_overview) for course_overview in course_overviews}
+
     @ddt.data(
         ('notpassing', 1),
         ('restricted', 1),
@@ -89,7 +94,7 @@ class TestStudentDashboardUnenrollments(SharedModuleStoreTestCase):
         """ Assert that the unenroll action is shown or not based on the cert status."""
         self.cert_status = cert_status
 
-        with patch('student.views.dashboard.cert_info', side_effect=self.mock_cert):
+        with patch('student.views.dashboard.cert_info_for_courses', side_effect=self.mock_certs):
             response = self.client.get(reverse('dashboard'))
 
             self.assertEqual(pq(response.content)(self.UNENROLL_ELEMENT_ID).length, unenroll_action_count)
@@ -280,6 +285,26 @@ class StudentDashboardTests(SharedModuleStoreTestCase, MilestonesTestCaseMixin,
         self.client.login(username=self.user.username, password=PASSWORD)
         self.path = reverse('dashboard')
 
+    @ddt.data(1, 4)
+    def test_per_course_checks_query_budget(self, nb_courses):
+        """
+        Verify the per-course checks of the dashboard take the same fixed
+        number of queries whatever the number of enrolled courses: one for
+        the certificates, one for the registration codes and one for the
+        started courses, the course modes being already loaded.
+        """
+        enrollments = [CourseEnrollmentFactory(user=self.user) for __ in range(nb_courses)]
+        course_overviews = [enrollment.course_overview for enrollment in enrollments]
+        course_ids = [enrollment.course_id for enrollment in enrollments]
+        request = RequestFactory().get(self.path)
+        request.user = self.user
+
+        with self.assertNumQueries(3):
+            cert_info_for_courses(self.user, course_overviews)
+            get_blocked_courses(request, enrollments)
+            get_started_courses(course_ids)
+            get_paid_courses(enrollments, {})
+
     def set_course_sharing_urls(self, set_marketing, set_social_sharing):
         """
         Set course sharing urls (i.e. social_sharing_url, marketing_url)
@@ -594,12 +619,12 @@ class StudentDashboardTests(SharedModuleStoreTestCase, MilestonesTestCaseMixin,
         self.assertIn('Related Programs:', response.content)
 
     @patch('openedx.core.djangoapps.catalog.utils.get_course_runs_for_course')
-    @patch.object(BulkEmailFlag, 'feature_enabled')
+    @patch.object(BulkEmailFlag, 'courses_with_feature_enabled')
     def test_email_settings_fulfilled_entitlement(self, mock_email_feature, mock_get_course_runs):
         """
         Assert that the Email Settings action is shown when the user has a fulfilled entitlement.
         """
-        mock_email_feature.return_value = True
+        mock_email_feature.side_effect = frozenset
         course_overview = CourseOverviewFactory(
             start=self.TOMORROW, self_paced=True, enrollment_end=self.TOMORROW
         )
@@ -615,12 +640,12 @@ class StudentDashboardTests(SharedModuleStoreTestCase, MilestonesTestCaseMixin,
         self.assertEqual(pq(response.content)(self.EMAIL_SETTINGS_ELEMENT_ID).length, 1)
 
     @patch.object(CourseOverview, 'get_from_id')
-    @patch.object(BulkEmailFlag, 'feature_enabled')
+    @patch.object(BulkEmailFlag, 'courses_with_feature_enabled')
     def test_email_settings_unfulfilled_entitlement(self, mock_email_feature, mock_course_overview):
         """
         Assert that the Email Settings action is not shown when the entitlement is not fulfilled.
         """
-        mock_email_feature.return_value = True
+        mock_email_feature.side_effect = frozenset
         mock_course_overview.return_value = CourseOverviewFactory(start=self.TOMORROW)
         CourseEntitlementFactory(user=self.user)
         response = self.client.get(self.path)
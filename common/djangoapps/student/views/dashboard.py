@@ -25,12 +25,12 @@ import track.views
 from bulk_email.models import BulkEmailFlag, Optout  # pylint: disable=import-error
 from course_modes.models import CourseMode
 from courseware.access import has_access
-from courseware.courses import sort_by_last_block_completed
+from courseware.courses import sort_by_last_activity
 from courseware.models import StudentModule, XModuleUserStateSummaryField
 from edxmako.shortcuts import render_to_response, render_to_string
 from entitlements.models import CourseEntitlement
 from lms.djangoapps.commerce.utils import EcommerceService  # pylint: disable=import-error
-from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
+from lms.djangoapps.grades.course_summary import get_learner_course_summaries
 from lms.djangoapps.verify_student.services import IDVerificationService
 from lms.lib import comment_client as cc
 from lms.lib.comment_client.utils import CommentClientMaintenanceError, CommentClientRequestError
@@ -52,7 +52,7 @@ from openedx.features.enterprise_support.api import get_dashboard_consent_notifi
 from shoppingcart.api import order_history
 from shoppingcart.models import CourseRegistrationCode, DonationConfiguration
 from student.cookies import set_user_info_cookie
-from student.helpers import cert_info, check_verify_status_by_course
+from student.helpers import cert_info_for_courses, check_verify_status_by_course
 from student.models import (
     CourseEnrollment,
     CourseEnrollmentAttribute,
@@ -347,6 +347,52 @@ def is_course_blocked(request, redeemed_registration_codes, course_key):
     return blocked
 
 
+def get_blocked_courses(request, course_enrollments):
+    """
+    Returns the keys of the courses of the given enrollments whose registration
+    is blocked, loading the redeemed registration codes of all of them at once.
+    """
+    redeemed_registration_codes = defaultdict(list)
+    for registration_code in CourseRegistrationCode.objects.filter(
+        course_id__in=[enrollment.course_id for enrollment in course_enrollments],
+        registrationcoderedemption__redeemed_by=request.user
+    ).select_related('invoice_item__invoice'):
+        redeemed_registration_codes[registration_code.course_id].append(registration_code)
+
+    return frozenset(
+        course_key for course_key, registration_codes in iteritems(redeemed_registration_codes)
+        if is_course_blocked(request, registration_codes, course_key)
+    )
+
+
+def get_paid_courses(course_enrollments, course_modes_by_course):
+    """
+    Returns the keys of the courses of the given enrollments that are paid, from
+    the unexpired course modes we already loaded.
+    """
+    paid_courses = set()
+    for enrollment in course_enrollments:
+        # Only the selectable modes tell whether a course is white label, as
+        # with CourseMode.modes_for_course_dict.
+        selectable_modes = {
+            slug: mode for slug, mode in iteritems(course_modes_by_course.get(enrollment.course_id, {}))
+            if slug not in CourseMode.CREDIT_MODES
+        } or {CourseMode.DEFAULT_MODE_SLUG: CourseMode.DEFAULT_MODE}
+        if enrollment.is_paid_course(modes_dict=selectable_modes):
+            paid_courses.add(enrollment.course_id)
+    return frozenset(paid_courses)
+
+
+def get_started_courses(course_keys):
+    """
+    Returns the keys, among the given course keys, of the courses that have any
+    student state.
+    """
+    return frozenset(
+        StudentModule.objects.filter(course_id__in=course_keys).values_list('course_id', flat=True).distinct()
+    )
+
+
 def get_verification_error_reasons_for_display(verification_error_codes):
     """
     Returns the display text for the given verification error codes.
@@ -598,13 +644,13 @@ def student_dashboard(request):
     # understanding of usage patterns on prod.
     monitoring_utils.accumulate('num_courses', len(course_enrollments))
 
+    # Load the course card summaries of all enrollments at once.
+    course_summaries = get_learner_course_summaries(user, [c.course_id for c in course_enrollments])
+
     # Get all badges earned and posts for all courses with this user.
-    nb_badges_obtained = 0
+    nb_badges_obtained = sum(summary.nb_trophies_earned for summary in course_summaries.values())
     nb_posts = 0
     for c in course_enrollments:
-        course_descriptor = modulestore().get_course(c.course_id)
-        if course_descriptor:
-            nb_badges_obtained += CourseGradeFactory().get_nb_trophies_earned(user, course_descriptor)
         try:
             cc_user = cc.User(id=user.id, course_id=c.course_id).to_dict()
             nb_posts += cc_user.get('comments_count', 0) + cc_user.get('threads_count', 0)
@@ -616,19 +662,19 @@ def student_dashboard(request):
 
     def order(course_enrollment):
         """
-        This helper function is created to avoid NoneType error raised in test.
-        In production, it will return a CourseDescriptor object when we call
-        modulestore().get_course
+        Returns the course_order of the enrollment's course, courses without
+        one or that can't be loaded coming last.
         """
-        course_desc = modulestore().get_course(course_enrollment.course_id)
-        return course_desc.course_order if course_desc and course_desc.course_order else 999
+        course_summary = course_summaries.get(course_enrollment.course_id)
+        return course_summary.course_order if course_summary and course_summary.course_order else 999
 
     # filter completed courses and not completed
     completed_courses = [c for c in course_enrollments if c.completed]
     uncompleted_courses = [c for c in course_enrollments if c not in completed_courses]
 
     # filter started courses and not started courses from uncompleted courses
-    started_courses = [c for c in uncompleted_courses if StudentModule.objects.filter(course_id=c.course_id).exists()]
+    started_course_ids = get_started_courses([c.course_id for c in uncompleted_courses])
+    started_courses = [c for c in uncompleted_courses if c.course_id in started_course_ids]
     not_started_courses = [c for c in uncompleted_courses if c not in started_courses]
 
     course_enrollments = started_courses + not_started_courses + completed_courses
@@ -751,16 +797,13 @@ def student_dashboard(request):
     # If a course is not included in this dictionary,
     # there is no verification messaging to display.
     verify_status_by_course = check_verify_status_by_course(user, course_enrollments)
-    cert_statuses = {
-        enrollment.course_id: cert_info(request.user, enrollment.course_overview)
-        for enrollment in course_enrollments
-    }
+    cert_statuses = cert_info_for_courses(
+        request.user, [enrollment.course_overview for enrollment in course_enrollments]
+    )
 
     # only show email settings for Mongo course and when bulk email is turned on
-    show_email_settings_for = frozenset(
-        enrollment.course_id for enrollment in course_enrollments if (
-            BulkEmailFlag.feature_enabled(enrollment.course_id)
-        )
+    show_email_settings_for = BulkEmailFlag.courses_with_feature_enabled(
+        [enrollment.course_id for enrollment in course_enrollments]
     )
 
     # Verification Attempts
@@ -772,22 +815,9 @@ def student_dashboard(request):
     statuses = ["approved", "denied", "pending", "must_reverify"]
     reverifications = reverification_info(statuses)
 
-    block_courses = frozenset(
-        enrollment.course_id for enrollment in course_enrollments
-        if is_course_blocked(
-            request,
-            CourseRegistrationCode.objects.filter(
-                course_id=enrollment.course_id,
-                registrationcoderedemption__redeemed_by=request.user
-            ),
-            enrollment.course_id
-        )
-    )
+    block_courses = get_blocked_courses(request, course_enrollments)
 
-    enrolled_courses_either_paid = frozenset(
-        enrollment.course_id for enrollment in course_enrollments
-        if enrollment.is_paid_course()
-    )
+    enrolled_courses_either_paid = get_paid_courses(course_enrollments, course_modes_by_course)
 
     # If there are *any* denied reverifications that have not been toggled off,
     # we'll display the banner
@@ -832,11 +862,9 @@ def student_dashboard(request):
     if configuration_helpers.get_value(
             'ENABLE_LAST_ACTIVITY',
             settings.FEATURES.get('ENABLE_LAST_ACTIVITY', False)):
-        last_activity_enrollments = sort_by_last_block_completed(
-            user, uncompleted_courses)
-        max_display = settings.FEATURES.get('LAST_ACTIVITY_COURSES_NUM', 3)
-        if len(last_activity_enrollments) > max_display:
-            last_activity_enrollments = last_activity_enrollments[:max_display]
+        last_activity_enrollments = sort_by_last_activity(
+            user, uncompleted_courses, course_summaries, settings.FEATURES.get('LAST_ACTIVITY_COURSES_NUM', 3)
+        )
     else:
         last_activity_enrollments = []
 
@@ -895,6 +923,7 @@ def student_dashboard(request):
         'nb_posts': nb_posts,
         'last_activity_enrollments': last_activity_enrollments,
         'bookmarks': bookmarks,
+        'course_summaries': course_summaries,
     }
 
     if ecommerce_service.is_enabled(request.user):
@@ -933,15 +962,15 @@ def my_courses(request, tab="all-courses"):
     # Get the org whitelist or the org blacklist for the current site
     site_org_whitelist, site_org_blacklist = get_org_black_and_whitelist_for_site()
     course_enrollments = list(get_course_enrollments(user, site_org_whitelist, site_org_blacklist))
+    course_summaries = get_learner_course_summaries(user, [c.course_id for c in course_enrollments])
 
     def order(course_enrollment):
         """
-        This helper function is created to avoid NoneType error raised in test.
-        In production, it will return a CourseDescriptor object when we call
-        modulestore().get_course
+        Returns the course_order of the enrollment's course, courses without
+        one or that can't be loaded coming last.
         """
-        course_desc = modulestore().get_course(course_enrollment.course_id)
-        return course_desc.course_order if course_desc and course_desc.course_order else 999
+        course_summary = course_summaries.get(course_enrollment.course_id)
+        return course_summary.course_order if course_summary and course_summary.course_order else 999
 
     # sort the enrollment by course_order
     course_enrollments.sort(key=order)
@@ -967,10 +996,8 @@ def my_courses(request, tab="all-courses"):
         site_org_blacklist
     )
 
-    show_email_settings_for = frozenset(
-        enrollment.course_id for enrollment in course_enrollments if (
-            BulkEmailFlag.feature_enabled(enrollment.course_id)
-        )
+    show_email_settings_for = BulkEmailFlag.courses_with_feature_enabled(
+        [enrollment.course_id for enrollment in course_enrollments]
     )
 
     show_courseware_links_for = frozenset(
@@ -1004,27 +1031,13 @@ def my_courses(request, tab="all-courses"):
     # If a course is not included in this dictionary,
     # there is no verification messaging to display.
     verify_status_by_course = check_verify_status_by_course(user, course_enrollments)
-    cert_statuses = {
-        enrollment.course_id: cert_info(request.user, enrollment.course_overview)
-        for enrollment in course_enrollments
-    }
-
-    enrolled_courses_either_paid = frozenset(
-        enrollment.course_id for enrollment in course_enrollments
-        if enrollment.is_paid_course()
+    cert_statuses = cert_info_for_courses(
+        request.user, [enrollment.course_overview for enrollment in course_enrollments]
     )
 
-    block_courses = frozenset(
-        enrollment.course_id for enrollment in course_enrollments
-        if is_course_blocked(
-            request,
-            CourseRegistrationCode.objects.filter(
-                course_id=enrollment.course_id,
-                registrationcoderedemption__redeemed_by=request.user
-            ),
-            enrollment.course_id
-        )
-    )
+    enrolled_courses_either_paid = get_paid_courses(course_enrollments, course_modes_by_course)
+
+    block_courses = get_blocked_courses(request, course_enrollments)
 
     # get list of courses having pre-requisites yet to be completed
     courses_having_prerequisites = frozenset(
@@ -1033,6 +1046,10 @@ def my_courses(request, tab="all-courses"):
     )
     courses_requirements_not_met = get_pre_requisite_courses_not_completed(user, courses_having_prerequisites)
 
+    started_course_ids = get_started_courses(
+        [enrollment.course_id for enrollment in course_enrollments if not enrollment.completed]
+    )
+
     # Disable lookup of Enterprise consent_required_course due to ENT-727
     # Will re-enable after fixing WL-1315
     consent_required_courses = set()
@@ -1051,6 +1068,7 @@ def my_courses(request, tab="all-courses"):
         'course_enrollments': course_enrollments,
         'course_entitlements': course_entitlements,
         'course_optouts': Optout.objects.filter(user=user).values_list('course_id', flat=True),
+        'course_summaries': course_summaries,
         'courses_requirements_not_met': courses_requirements_not_met,
         'credit_statuses': _credit_statuses(user, course_enrollments),
         'display_dashboard_courses': (user.is_active or not hide_dashboard_courses_until_activated),
@@ -1060,6 +1078,7 @@ def my_courses(request, tab="all-courses"):
         'show_dashboard_tabs': True,
         'show_email_settings_for': show_email_settings_for,
         'staff_access': staff_access,
+        'started_course_ids': started_course_ids,
         'verification_status_by_course': verify_status_by_course,
         'tab': tab
     }
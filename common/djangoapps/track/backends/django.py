@@ -9,9 +9,17 @@ Event tracker backend that saves events to a Django database.
 
 from __future__ import absolute_import
 
+import atexit
 import logging
+import os
 import re
-from django.db import models
+import threading
+import Queue
+
+import dogstats_wrapper as dog_stats_api
+from django.core.cache import cache
+from django.db import close_old_connections, models, transaction
+from django.db.models import Count, Sum
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
 from track.backends import BaseBackend
@@ -22,6 +30,9 @@ from django.contrib.auth.models import User
 
 log = logging.getLogger('track.backends.django')
 
+ROLLED_UP_UNTIL_CACHE_KEY = 'track.backends.django.rolled_up_until'
+ROLLED_UP_UNTIL_CACHE_TIMEOUT = 60 * 60
+
 
 LOGFIELDS = [
     'user_id',
@@ -46,6 +57,9 @@ EVENT_TYPE_BLACK_LIST = [
     'problem_check'
 ]
 
+# Matches the event types starting with one of the blacklisted prefixes
+EVENT_TYPE_BLACK_LIST_PATTERN = re.compile('|'.join(re.escape(prefix) for prefix in EVENT_TYPE_BLACK_LIST))
+
 
 class TrackingLog(models.Model):
     """Defines the fields that are stored in the tracking log database."""
@@ -99,9 +113,105 @@ class TrackingLog(models.Model):
         return 'desktop'
 
 
+class TrackingLogDailySummary(models.Model):
+    """
+    Time spent and number of events per day, user and section, for the days
+    whose raw tracking logs were deleted by the rollup_tracking_logs command.
+    """
+    day = models.DateField('event day', db_index=True)
+    user_id = models.PositiveIntegerField()
+    section = models.CharField(max_length=100, default=None, null=True, blank=True)
+    time_spent = models.FloatField(default=0)
+    events = models.PositiveIntegerField(default=0)
+
+    class Meta(object):
+        app_label = 'track'
+        unique_together = ['day', 'user_id', 'section']
+        index_together = ['user_id', 'section', 'day']
+
+    def __unicode__(self):
+        return u"[{self.day}] {self.user_id} | {self.section} | {self.time_spent}".format(self=self)
+
+    @classmethod
+    def get_rolled_up_until(cls):
+        """
+        Returns the first day whose raw tracking logs are kept, the earlier
+        days being only available in the summary, or None if there are no
+        raw tracking logs.
+        """
+        rolled_up_until = cache.get(ROLLED_UP_UNTIL_CACHE_KEY)
+        if rolled_up_until is None:
+            first_log_time = TrackingLog.objects.order_by('time').values_list('time', flat=True).first()
+            rolled_up_until = first_log_time.date() if first_log_time else ''
+            cache.set(ROLLED_UP_UNTIL_CACHE_KEY, rolled_up_until, ROLLED_UP_UNTIL_CACHE_TIMEOUT)
+        return rolled_up_until or None
+
+    @classmethod
+    def rollup_day(cls, day, day_start, day_end):
+        """
+        Summarizes the tracking logs with time in [day_start, day_end[.
+        Returns False if the day was already rolled up.
+        """
+        if cls.objects.filter(day=day).exists():
+            return False
+        logs = TrackingLog.objects.filter(time__gte=day_start, time__lt=day_end).exclude(user_id=None)
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                (
+                    cls(day=day,
+                        user_id=row['user_id'],
+                        section=row['section'],
+                        time_spent=row['time_spent'] or 0,
+                        events=row['events'])
+                    for row in logs.values('user_id', 'section').annotate(
+                        time_spent=Sum('time_spent'), events=Count('id')).order_by()
+                ),
+                batch_size=1000,
+            )
+        return True
+
+    @classmethod
+    def delete_raw_logs(cls, before, chunk_size):
+        """
+        Deletes the tracking logs with time before the given datetime, by chunks of ids.
+        Returns the number of deleted rows.
+        """
+        deleted = 0
+        while True:
+            log_ids = list(TrackingLog.objects.filter(time__lt=before).order_by('id').values_list(
+                'id', flat=True)[:chunk_size])
+            if not log_ids:
+                break
+            TrackingLog.objects.filter(id__in=log_ids)._raw_delete(TrackingLog.objects.db)
+            deleted += len(log_ids)
+        cache.delete(ROLLED_UP_UNTIL_CACHE_KEY)
+        return deleted
+
+    @classmethod
+    def get_total_time_spent(cls, since, **filters):
+        """
+        Sums the time spent in the tracking logs matching the given filters
+        on user_id and section since the given datetime, reading the summary
+        for the rolled up days and the raw tracking logs for the others.
+        Rolled up days are counted as a whole.
+        """
+        total_time_spent = 0
+        rolled_up_until = cls.get_rolled_up_until()
+        if rolled_up_until is None or since.date() < rolled_up_until:
+            summaries = cls.objects.filter(day__gte=since.date(), **filters)
+            if rolled_up_until is not None:
+                summaries = summaries.filter(day__lt=rolled_up_until)
+            total_time_spent += summaries.aggregate(Sum('time_spent')).get('time_spent__sum') or 0
+        if rolled_up_until is not None:
+            total_time_spent += TrackingLog.objects.filter(time__gte=since, **filters).aggregate(
+                Sum('time_spent')).get('time_spent__sum') or 0
+        return total_time_spent
+
+
 class DjangoBackend(BaseBackend):
     """Event tracker backend that saves to a Django database"""
-    def __init__(self, name='default', **options):
+    def __init__(self, name='default', buffered=False, max_queue_size=10000, batch_size=500, flush_interval=1.0,
+                 **options):
         """
         Configure database used by the backend.
 
@@ -109,24 +219,102 @@ class DjangoBackend(BaseBackend):
 
           - `name` is the name of the database as specified in the project
             settings.
+          - `buffered`: if True, events are put in an in-process queue and
+            saved by a background thread with multi-row inserts, instead of
+            one INSERT per event within the request.
+          - `max_queue_size`: number of events the queue can hold. Events
+            sent while the queue is full are dropped.
+          - `batch_size`: maximum number of rows per INSERT. The background
+            thread flushes as soon as this many events are queued.
+          - `flush_interval`: maximum number of seconds between flushes.
 
         """
         super(DjangoBackend, self).__init__(**options)
         self.name = name
+        self.buffered = buffered
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = Queue.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher_pid = None
+        if buffered:
+            atexit.register(self.flush)
 
     def send(self, event):
         field_values = {x: event.get(x, '') for x in LOGFIELDS}
         if field_values['user_id']:
-            if field_values['event_type']:
-                for blacklisted_event_type in EVENT_TYPE_BLACK_LIST:
-                    if field_values['event_type'].startswith(blacklisted_event_type):
-                        return
+            if field_values['event_type'] and EVENT_TYPE_BLACK_LIST_PATTERN.match(field_values['event_type']):
+                return
             tldat = TrackingLog(**field_values)
+            if self.buffered:
+                self._enqueue(tldat)
+                return
             try:
                 tldat.save(using=self.name)
             except Exception as e:  # pylint: disable=broad-except
                 log.exception(e)
 
+    def _enqueue(self, tracking_log):
+        """
+        Queues the event for the background thread, dropping it if the queue is full.
+        """
+        self._start_flusher()
+        try:
+            self.queue.put_nowait(tracking_log)
+        except Queue.Full:
+            self.dropped += 1
+            dog_stats_api.increment('track.backends.django.dropped')
+            return
+        if self.queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def _start_flusher(self):
+        """
+        Starts the background thread on first use, and again in forked worker processes.
+        """
+        pid = os.getpid()
+        if self._flusher_pid != pid:
+            self._flusher_pid = pid
+            flusher = threading.Thread(target=self._run_flusher, name='track.backends.django.flusher')
+            flusher.daemon = True
+            flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Saves all the queued events with INSERTs of at most `batch_size` rows.
+        """
+        with self._flush_lock:
+            dog_stats_api.histogram('track.backends.django.queue_size', self.queue.qsize())
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except Queue.Empty:
+                        break
+                if not batch:
+                    return
+
+                close_old_connections()
+                try:
+                    TrackingLog.objects.using(self.name).bulk_create(batch)
+                    self.flushed += len(batch)
+                    dog_stats_api.increment('track.backends.django.flushed', len(batch))
+                except Exception as e:  # pylint: disable=broad-except
+                    self.failed += len(batch)
+                    dog_stats_api.increment('track.backends.django.failed', len(batch))
+                    log.exception(e)
+
 
 class CourseUnenrollment(models.Model):
     created = models.DateTimeField('unenrollment date', auto_now_add=True, db_index=True)
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 from django.test import TestCase
+from mock import patch
 
 from track.backends.django import DjangoBackend, TrackingLog
 
@@ -25,3 +26,40 @@ class TestDjangoBackend(TestCase):
 
         # Check if time is stored in UTC
         self.assertEqual(str(results[0].time), '2013-01-01 17:01:00+00:00')
+
+    def test_blacklisted_event_type(self):
+        self.backend.send({'username': 'test', 'user_id': 16, 'event_type': 'problem_check'})
+        self.assertFalse(TrackingLog.objects.exists())
+
+
+class TestBufferedDjangoBackend(TestCase):
+    def setUp(self):
+        super(TestBufferedDjangoBackend, self).setUp()
+        self.backend = DjangoBackend(buffered=True, max_queue_size=3, batch_size=2)
+        # events are flushed explicitly, within the test transaction
+        patcher = patch.object(self.backend, '_start_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _send(self, count):
+        for index in range(count):
+            self.backend.send({
+                'username': 'test{}'.format(index),
+                'user_id': index + 1,
+                'time': '2013-01-01T12:01:00-05:00'
+            })
+
+    def test_flush(self):
+        self._send(3)
+        self.backend.flush()
+
+        self.assertEqual(TrackingLog.objects.count(), 3)
+        self.assertEqual(self.backend.flushed, 3)
+        self.assertEqual(self.backend.dropped, 0)
+
+    def test_full_queue_drops_events(self):
+        self._send(5)
+        self.assertEqual(self.backend.dropped, 2)
+
+        self.backend.flush()
+        self.assertEqual(TrackingLog.objects.count(), 3)
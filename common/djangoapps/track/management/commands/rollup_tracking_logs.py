@@ -0,0 +1,51 @@
+"""
+Rolls the tracking logs older than the retention window up into daily
+summaries per user and section, then deletes them.
+
+    ./manage.py lms rollup_tracking_logs --retention-days 90
+"""
+import logging
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from pytz import UTC
+
+from track.backends.django import TrackingLog, TrackingLogDailySummary
+
+log = logging.getLogger(__name__)
+
+# the nightly analytics compute the time spent of the previous day logs
+MIN_RETENTION_DAYS = 2
+
+
+class Command(BaseCommand):
+    help = 'Rolls old tracking logs up into daily summaries and deletes them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days',
+                            type=int,
+                            default=90,
+                            help='Number of days of raw tracking logs to keep')
+        parser.add_argument('--chunk-size',
+                            type=int,
+                            default=10000,
+                            help='Number of tracking logs deleted per query')
+
+    def handle(self, *args, **options):
+        retention_days = options['retention_days']
+        if retention_days < MIN_RETENTION_DAYS:
+            raise CommandError('--retention-days must be at least {}'.format(MIN_RETENTION_DAYS))
+
+        first_log_time = TrackingLog.objects.order_by('time').values_list('time', flat=True).first()
+        if first_log_time is None:
+            return
+        day = first_log_time.date()
+        retention_day = datetime.now(UTC).date() - timedelta(days=retention_days)
+
+        while day < retention_day:
+            day_start = datetime.combine(day, time.min).replace(tzinfo=UTC)
+            day_end = day_start + timedelta(days=1)
+            rolled_up = TrackingLogDailySummary.rollup_day(day, day_start, day_end)
+            deleted = TrackingLogDailySummary.delete_raw_logs(day_end, options['chunk_size'])
+            log.info(u'Tracking logs of %s: rolled up=%s, deleted %d raw logs', day, rolled_up, deleted)
+            day += timedelta(days=1)
@@ -0,0 +1,57 @@
+"""
+Tests for the rollup_tracking_logs management command.
+"""
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from pytz import UTC
+
+from track.backends.django import TrackingLog, TrackingLogDailySummary
+
+
+class RollupTrackingLogsTest(TestCase):
+    """
+    Tests the rollup of old tracking logs and the time spent readers.
+    """
+    def setUp(self):
+        super(RollupTrackingLogsTest, self).setUp()
+        cache.clear()
+        self.now = datetime.now(UTC)
+        self.old_time = (self.now - timedelta(days=10)).replace(hour=12, minute=0)
+        for time, time_spent, section in [
+            (self.old_time, 10, 'section1'),
+            (self.old_time + timedelta(minutes=1), 5, 'section1'),
+            (self.old_time, 7, 'section2'),
+            (self.now, 3, 'section1'),
+        ]:
+            TrackingLog.objects.create(user_id=1, time=time, time_spent=time_spent, section=section)
+        TrackingLog.objects.create(user_id=None, time=self.old_time)
+
+    def test_rollup(self):
+        call_command('rollup_tracking_logs', retention_days=5)
+
+        self.assertEqual(TrackingLog.objects.count(), 1)
+        summary = TrackingLogDailySummary.objects.get(section='section1')
+        self.assertEqual(summary.day, self.old_time.date())
+        self.assertEqual(summary.time_spent, 15)
+        self.assertEqual(summary.events, 2)
+        self.assertEqual(TrackingLogDailySummary.objects.count(), 2)
+
+        # running again does not change the summary
+        call_command('rollup_tracking_logs', retention_days=5)
+        self.assertEqual(TrackingLogDailySummary.objects.count(), 2)
+
+    def test_total_time_spent(self):
+        since = self.old_time - timedelta(days=1)
+        self.assertEqual(TrackingLogDailySummary.get_total_time_spent(since, user_id=1, section='section1'), 18)
+
+        call_command('rollup_tracking_logs', retention_days=5)
+        self.assertEqual(TrackingLogDailySummary.get_total_time_spent(since, user_id=1, section='section1'), 18)
+        self.assertEqual(TrackingLogDailySummary.get_total_time_spent(self.now, user_id=1, section='section1'), 3)
+
+    def test_retention_too_short(self):
+        with self.assertRaises(CommandError):
+            call_command('rollup_tracking_logs', retention_days=1)
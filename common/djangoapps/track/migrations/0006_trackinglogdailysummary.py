@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 10:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('track', '0005_merge_20210526_2140'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingLogDailySummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True, verbose_name=b'event day')),
+                ('user_id', models.PositiveIntegerField()),
+                ('section', models.CharField(blank=True, default=None, max_length=100, null=True)),
+                ('time_spent', models.FloatField(default=0)),
+                ('events', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='trackinglogdailysummary',
+            unique_together=set([('day', 'user_id', 'section')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='trackinglogdailysummary',
+            index_together=set([('user_id', 'section', 'day')]),
+        ),
+    ]
@@ -1,3 +1,3 @@
 # pylint: disable=unused-import, missing-docstring
-from track.backends.django import TrackingLog
+from track.backends.django import TrackingLog, TrackingLogDailySummary
 
@@ -1,7 +1,12 @@
 """
 Parser and evaluator for FormulaResponse and NumericalResponse
 
-Uses pyparsing to parse. Main function as of now is evaluator().
+Uses pyparsing to parse. Main functions as of now are evaluator() and
+evaluate_samples().
+
+The grammar is built once, and parsed expressions are compiled into nested
+closures and cached, so evaluating an expression again, e.g. for another
+sample of its variables, neither parses it nor walks its parse tree.
 """
 
 import math
@@ -81,6 +86,29 @@ SUFFIXES = {
     '%': 0.01,
 }
 
+# The default functions which can evaluate an array of real samples at once,
+# mapped to the function to use for it.  The scimath ones give complex results
+# out of their real domain, so they are replaced by their numpy counterparts,
+# which give NaN instead: then the samples are evaluated one by one.
+VECTORIZED_FUNCTIONS = {
+    function: function for name, function in DEFAULT_FUNCTIONS.iteritems()
+    if name not in ('arccot', 'fact', 'factorial')
+}
+VECTORIZED_FUNCTIONS.update({
+    numpy.lib.scimath.sqrt: numpy.sqrt,
+    numpy.lib.scimath.log10: numpy.log10,
+    numpy.lib.scimath.log2: numpy.log2,
+    numpy.lib.scimath.log: numpy.log,
+    numpy.lib.scimath.arccos: numpy.arccos,
+    numpy.lib.scimath.arcsin: numpy.arcsin,
+    numpy.lib.scimath.arctanh: numpy.arctanh,
+})
+
+# Parsed expressions, keyed by (math_expr, case_sensitive).  As with the `re`
+# module, the cache is simply cleared when it is full.
+_PARSED_EXPRESSIONS = {}
+MAX_PARSED_EXPRESSIONS = 1000
+
 
 class UndefinedVariable(Exception):
     """
@@ -178,6 +206,18 @@ def eval_parallel(parse_result):
     return 1. / sum(reciprocals)
 
 
+def eval_parallel_samples(values):
+    """
+    Like `eval_parallel`, for values which may be arrays of samples.
+
+    Give NaN for the samples where any of the inputs is zero.
+    """
+    if len(values) == 1 or not any(isinstance(value, numpy.ndarray) for value in values):
+        return eval_parallel(values)
+    has_zero = reduce(numpy.logical_or, [numpy.equal(value, 0) for value in values])
+    return numpy.where(has_zero, float('nan'), 1. / sum(1. / value for value in values))
+
+
 def eval_sum(parse_result):
     """
     Add the inputs, keeping in mind their sign.
@@ -232,6 +272,25 @@ def add_defaults(variables, functions, case_sensitive):
     return (all_variables, all_functions)
 
 
+def parse_expression(math_expr, case_sensitive=False):
+    """
+    Return the parsed and compiled `ParseAugmenter` of an expression.
+
+    Expressions are cached, so parsing the same expression again is free.
+    """
+    key = (math_expr, case_sensitive)
+    math_interpreter = _PARSED_EXPRESSIONS.get(key)
+    if math_interpreter is None:
+        check_parens(math_expr)
+        math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+        math_interpreter.parse_algebra()
+        math_interpreter.compile_tree()
+        if len(_PARSED_EXPRESSIONS) >= MAX_PARSED_EXPRESSIONS:
+            _PARSED_EXPRESSIONS.clear()
+        _PARSED_EXPRESSIONS[key] = math_interpreter
+    return math_interpreter
+
+
 def evaluator(variables, functions, math_expr, case_sensitive=False):
     """
     Evaluate an expression; that is, take a string of math and return a float.
@@ -245,9 +304,7 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
         return float('nan')
 
     # Parse the tree.
-    check_parens(math_expr)
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    math_interpreter = parse_expression(math_expr, case_sensitive)
 
     # Get our variables together.
     all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
@@ -255,24 +312,42 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     # ...and check them
     math_interpreter.check_variables(all_variables, all_functions)
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
+    return math_interpreter.compiled_tree(all_variables, all_functions)
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+
+def evaluate_samples(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for each of a list of variables dictionaries.
+
+    Return the list of results `evaluator` gives for each of them, raising
+    the error it would raise for the first sample that fails.  When all
+    samples define the same variables, with real values, evaluate them in
+    one vectorized pass instead of one by one.
+    """
+    if not variables_list:
+        return []
+    # No need to go further.
+    if math_expr.strip() == "":
+        return [float('nan')] * len(variables_list)
+
+    math_interpreter = parse_expression(math_expr, case_sensitive)
+    all_functions = add_defaults({}, functions, case_sensitive)[1]
+    all_variables_list = [
+        add_defaults(variables, {}, case_sensitive)[0]
+        for variables in variables_list
+    ]
+
+    if all(set(all_variables) == set(all_variables_list[0]) for all_variables in all_variables_list):
+        math_interpreter.check_variables(all_variables_list[0], all_functions)
+        results = math_interpreter.evaluate_vectorized(all_variables_list, all_functions)
+        if results is not None:
+            return results
+
+    results = []
+    for all_variables in all_variables_list:
+        math_interpreter.check_variables(all_variables, all_functions)
+        results.append(math_interpreter.compiled_tree(all_variables, all_functions))
+    return results
 
 
 def check_parens(formula):
@@ -316,26 +391,10 @@ class ParseAugmenter(object):
         self.case_sensitive = case_sensitive
         self.math_expr = math_expr
         self.tree = None
+        self.compiled_tree = None
         self.variables_used = set()
         self.functions_used = set()
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
-
     def parse_algebra(self):
         """
         Parse an algebraic expression into a tree.
@@ -343,71 +402,28 @@ class ParseAugmenter(object):
         Store a `pyparsing.ParseResult` in `self.tree` with proper groupings to
         reflect parenthesis and order of operations. Leave all operators in the
         tree and do not parse any strings of numbers into their float versions.
+        Store the variables and functions it uses in `variables_used` and
+        `functions_used`.
 
         Adding the groups and result names makes the `repr()` of the result
         really gross. For debugging, use something like
           print OBJ.tree.asXML()
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with a letter
-        # and may contain numbers and underscores afterward.
-        inner_varname = Combine(Word(alphas, alphanums + "_") + ZeroOrMore("'"))
-        # Alternative variable name in tensor format
-        # Tensor name must start with a letter, continue with alphanums
-        # Indices may be alphanumeric
-        # e.g., U_{ijk}^{123}
-        upper_indices = Literal("^{") + Word(alphanums) + Literal("}")
-        lower_indices = Literal("_{") + Word(alphanums) + Literal("}")
-        tensor_lower = Combine(Word(alphas, alphanums) + lower_indices + ZeroOrMore("'"))
-        tensor_mixed = Combine(Word(alphas, alphanums) + Optional(lower_indices) + upper_indices + ZeroOrMore("'"))
-        # Test for mixed tensor first, then lower tensor alone, then generic variable name
-        varname = Group(tensor_mixed | tensor_lower | inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
-
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=pointless-statement
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        self.tree = ALGEBRA_GRAMMAR.parseString(self.math_expr)[0]
+
+        def collect_names(node):
+            """
+            Add the variables and functions used in `node` to the sets.
+            """
+            for child in node:
+                if isinstance(child, ParseResults):
+                    if child.getName() == 'variable':
+                        self.variables_used.add(child[0])
+                    elif child.getName() == 'function':
+                        self.functions_used.add(child[0])
+                    collect_names(child)
+
+        collect_names([self.tree])
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
@@ -447,6 +463,163 @@ class ParseAugmenter(object):
         # Find the value of the entire tree.
         return handle_node(self.tree)
 
+    def compile_tree(self):
+        """
+        Compile `self.tree` into `self.compiled_tree`.
+
+        It is a function of the dictionaries of all variables and functions
+        (e.g. from `add_defaults`) which gives the value of the tree, as the
+        `eval_*` actions would compute it with `reduce_tree`.  The operators,
+        numbers and names are all resolved once, here.  Values may be arrays
+        of samples rather than numbers.
+        """
+        if self.case_sensitive:
+            casify = lambda x: x
+        else:
+            casify = lambda x: x.lower()  # Lowercase for case insens.
+
+        def compile_operations(node, kids, operators):
+            """
+            Return the (operator, compiled child) pairs of a sum or product node.
+            """
+            operations = []
+            kids = iter(kids)
+            current_op = operators[None]
+            for child in node:
+                if isinstance(child, ParseResults):
+                    operations.append((current_op, next(kids)))
+                else:
+                    current_op = operators[child]
+            return operations
+
+        def compile_node(node):
+            """
+            Return the function giving the value of the node, using recursion.
+            """
+            node_name = node.getName()
+            kids = [compile_node(k) for k in node if isinstance(k, ParseResults)]
+
+            if node_name == 'number':
+                number = eval_number(node)
+                return lambda variables, functions: number
+
+            elif node_name == 'variable':
+                varname = casify(node[0])
+                return lambda variables, functions: variables[varname]
+
+            elif node_name == 'function':
+                funcname = casify(node[0])
+                argument = kids[0]
+                return lambda variables, functions: functions[funcname](argument(variables, functions))
+
+            elif node_name == 'atom':
+                # In the case of parenthesis, ignore them.
+                return kids[0]
+
+            elif node_name == 'power':
+                def power(variables, functions):
+                    """
+                    Exponentiate the children, right to left.
+                    """
+                    values = [kid(variables, functions) for kid in kids]
+                    return reduce(lambda a, b: b ** a, reversed(values))
+                return power
+
+            elif node_name == 'parallel':
+                return lambda variables, functions: eval_parallel_samples(
+                    [kid(variables, functions) for kid in kids]
+                )
+
+            elif node_name == 'product':
+                operations = compile_operations(
+                    node, kids, {None: operator.mul, '*': operator.mul, '/': operator.truediv}
+                )
+
+                def product(variables, functions):
+                    """
+                    Multiply the children.
+                    """
+                    prod = 1.0
+                    for current_op, kid in operations:
+                        prod = current_op(prod, kid(variables, functions))
+                    return prod
+                return product
+
+            elif node_name == 'sum':
+                operations = compile_operations(
+                    node, kids, {None: operator.add, '+': operator.add, '-': operator.sub}
+                )
+
+                def total(variables, functions):
+                    """
+                    Add the children, keeping in mind their sign.
+                    """
+                    result = 0.0
+                    for current_op, kid in operations:
+                        result = current_op(result, kid(variables, functions))
+                    return result
+                return total
+
+            else:  # pragma: no cover
+                raise Exception(u"Unknown branch name '{}'".format(node_name))
+
+        self.compiled_tree = compile_node(self.tree)
+
+    def evaluate_vectorized(self, variables_list, functions):
+        """
+        Evaluate `self.compiled_tree` for all the samples of `variables_list`
+        at once, on arrays of their values.
+
+        Return the list of results, or None if they could differ from the
+        results of evaluating each sample: if any sampled value isn't real,
+        if a function used has no vectorized version, or if any operation
+        doesn't give a finite result (e.g. a division by zero, or a value out
+        of the real domain of a function).  Then evaluating each sample gives
+        the errors and special values as usual.
+        """
+        if self.case_sensitive:
+            casify = lambda x: x
+        else:
+            casify = lambda x: x.lower()  # Lowercase for case insens.
+
+        vectorized_functions = {}
+        for funcname in self.functions_used:
+            function = functions[casify(funcname)]
+            if function not in VECTORIZED_FUNCTIONS:
+                return None
+            vectorized_functions[casify(funcname)] = VECTORIZED_FUNCTIONS[function]
+
+        vectorized_variables = {}
+        for varname in set(casify(name) for name in self.variables_used):
+            values = [variables[varname] for variables in variables_list]
+            if not all(isinstance(value, float) for value in values):
+                return None
+            if all(value == values[0] for value in values):
+                vectorized_variables[varname] = values[0]
+            else:
+                vectorized_variables[varname] = numpy.array(values, dtype=float)
+
+        if not any(isinstance(value, numpy.ndarray) for value in vectorized_variables.itervalues()):
+            return None
+
+        # Where evaluating a sample raises an error, or gives an infinity or
+        # NaN which a later operation may hide, a floating point error is
+        # raised here.
+        # pylint: disable=broad-except
+        try:
+            with numpy.errstate(all='raise', under='ignore'):
+                results = self.compiled_tree(vectorized_variables, vectorized_functions)
+        except Exception:
+            return None
+        if (
+            not isinstance(results, numpy.ndarray) or
+            results.shape != (len(variables_list),) or
+            not numpy.isrealobj(results) or
+            not numpy.isfinite(results).all()
+        ):
+            return None
+        return results.tolist()
+
     def check_variables(self, valid_variables, valid_functions):
         """
         Confirm that all the variables used in the tree are valid/defined.
@@ -466,3 +639,75 @@ class ParseAugmenter(object):
 
         if bad_vars:
             raise UndefinedVariable(' '.join(sorted(bad_vars)))
+
+
+def build_algebra_grammar():
+    """
+    Build the pyparsing grammar of algebraic expressions.
+
+    See `ParseAugmenter.parse_algebra` for the tree it gives.
+    """
+    # 0.33 or 7 or .34 or 16.
+    number_part = Word(nums)
+    inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+    # pyparsing allows spaces between tokens--`Combine` prevents that.
+    inner_number = Combine(inner_number)
+
+    # SI suffixes and percent.
+    number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+    # 0.33k or 17
+    plus_minus = Literal('+') | Literal('-')
+    number = Group(
+        Optional(plus_minus) +
+        inner_number +
+        Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+        Optional(number_suffix)
+    )
+    number = number("number")
+
+    # Predefine recursive variables.
+    expr = Forward()
+
+    # Handle variables passed in. They must start with a letter
+    # and may contain numbers and underscores afterward.
+    inner_varname = Combine(Word(alphas, alphanums + "_") + ZeroOrMore("'"))
+    # Alternative variable name in tensor format
+    # Tensor name must start with a letter, continue with alphanums
+    # Indices may be alphanumeric
+    # e.g., U_{ijk}^{123}
+    upper_indices = Literal("^{") + Word(alphanums) + Literal("}")
+    lower_indices = Literal("_{") + Word(alphanums) + Literal("}")
+    tensor_lower = Combine(Word(alphas, alphanums) + lower_indices + ZeroOrMore("'"))
+    tensor_mixed = Combine(Word(alphas, alphanums) + Optional(lower_indices) + upper_indices + ZeroOrMore("'"))
+    # Test for mixed tensor first, then lower tensor alone, then generic variable name
+    varname = Group(tensor_mixed | tensor_lower | inner_varname)("variable")
+
+    # Same thing for functions.
+    function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+    atom = number | function | varname | "(" + expr + ")"
+    atom = Group(atom)("atom")
+
+    # Do the following in the correct order to preserve order of operation.
+    pow_term = atom + ZeroOrMore("^" + atom)
+    pow_term = Group(pow_term)("power")
+
+    par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+    par_term = Group(par_term)("parallel")
+
+    prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+    prod_term = Group(prod_term)("product")
+
+    sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+    sum_term = Group(sum_term)("sum")
+
+    # Finish the recursion.
+    expr << sum_term  # pylint: disable=pointless-statement
+    grammar = expr + stringEnd
+    # Streamline it now rather than on the first, maybe concurrent, parse.
+    grammar.streamline()
+    return grammar
+
+
+ALGEBRA_GRAMMAR = build_algebra_grammar()
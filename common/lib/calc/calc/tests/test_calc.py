@@ -5,6 +5,7 @@ Unit tests for calc.py
 import unittest
 import numpy
 import calc
+from mock import patch
 from pyparsing import ParseException
 
 # numpy's default behavior when it evaluates a function outside its domain
@@ -552,3 +553,74 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({}, {}, "(1+2")
         with self.assertRaisesRegexp(calc.UnmatchedParenthesis, 'no matching opening parenthesis'):
             calc.evaluator({}, {}, "(1+2))")
+
+    def test_parsed_expressions_cached(self):
+        """
+        Parsing the same expression again gives the cached `ParseAugmenter`
+        """
+        parsed = calc.parse_expression('x^2+1')
+        self.assertIs(calc.parse_expression('x^2+1'), parsed)
+        self.assertIsNot(calc.parse_expression('x^2+1', case_sensitive=True), parsed)
+        self.assertEqual(parsed.variables_used, {'x'})
+
+
+class EvaluateSamplesTest(unittest.TestCase):
+    """
+    Check that calc.evaluate_samples gives what calc.evaluator gives for each
+    sample, whether or not the samples are evaluated in one vectorized pass.
+    """
+    def assert_same_as_evaluator(self, math_expr, samples, functions=None, vectorized=True):
+        """
+        Assert that `evaluate_samples` and `evaluator` agree on `math_expr`,
+        and that the samples are evaluated at once if `vectorized`.
+        """
+        functions = functions or {}
+        vectorized_results = []
+        evaluate_vectorized = calc.ParseAugmenter.evaluate_vectorized
+
+        def evaluate_vectorized_side_effect(*args):
+            """Record the results of the vectorized pass."""
+            vectorized_results.append(evaluate_vectorized(*args))
+            return vectorized_results[-1]
+
+        with patch.object(
+            calc.ParseAugmenter, 'evaluate_vectorized', autospec=True, side_effect=evaluate_vectorized_side_effect,
+        ):
+            results = calc.evaluate_samples(samples, functions, math_expr)
+        # NaN results are equal too
+        numpy.testing.assert_array_equal(
+            results, [calc.evaluator(sample, functions, math_expr) for sample in samples]
+        )
+        self.assertEqual(vectorized_results[0] is not None, vectorized)
+
+    def test_vectorized(self):
+        samples = [{'x': 0.5, 'y': 1.5}, {'x': 1.0, 'y': 2.5}, {'x': 2.0, 'y': 3.5}]
+        self.assert_same_as_evaluator('x^2*y - sin(x)/y + x||y', samples)
+        self.assert_same_as_evaluator('sqrt(x)+ln(y)-e^(-x)', samples)
+
+    def test_not_vectorized(self):
+        samples = [{'x': -1.0}, {'x': 1.0}, {'x': 4.0}]
+        # complex results out of the real domain
+        self.assert_same_as_evaluator('sqrt(x)', samples, vectorized=False)
+        self.assert_same_as_evaluator('x*i', samples, vectorized=False)
+        # NaN for zero inputs
+        self.assert_same_as_evaluator('(x-1)||x', samples, vectorized=False)
+        # no vectorized version
+        self.assert_same_as_evaluator('fact(4)*x', samples, vectorized=False)
+        self.assert_same_as_evaluator('f(x)', samples, functions={'f': lambda x: x + 1}, vectorized=False)
+
+    def test_errors(self):
+        samples = [{'x': 1.0}, {'x': 0.0}]
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples(samples, {}, '1/x')
+        # the error would be hidden by the next operation
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples([{'x': -2.0}, {'x': 2.0}], {}, '0*x^0.5')
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            calc.evaluate_samples(samples, {}, 'x+y')
+
+    def test_empty(self):
+        self.assertEqual(calc.evaluate_samples([], {}, 'x'), [])
+        results = calc.evaluate_samples([{'x': 1.0}, {'x': 2.0}], {}, ' ')
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(numpy.isnan(result) for result in results))
@@ -71,6 +71,13 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# Parsed problem trees, before includes, keyed by the version of the problem
+# definition: the same problem definition is parsed once per process, and each
+# LoncapaProblem gets a copy of its tree.  As with the `re` module, the cache is
+# simply cleared when it is full.
+_PARSED_PROBLEM_TREES = {}
+MAX_PARSED_PROBLEM_TREES = 500
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -128,7 +135,7 @@ class LoncapaProblem(object):
     Main class for capa Problems.
     """
     def __init__(self, problem_text, id, capa_system, capa_module,  # pylint: disable=redefined-builtin
-                 state=None, seed=None, minimal_init=False, extract_tree=True):
+                 state=None, seed=None, minimal_init=False, extract_tree=True, definition_version=None):
         """
         Initializes capa Problem.
 
@@ -149,6 +156,8 @@ class LoncapaProblem(object):
             seed (int): random number generator seed.
             minimal_init (bool): whether to skip pre-processing student answers
             extract_tree (bool): whether to parse the problem XML and store the HTML
+            definition_version: version of the problem definition the problem text comes from, which
+                changes with the text; the parsed tree is cached by version when it is provided.
 
         """
 
@@ -179,9 +188,7 @@ class LoncapaProblem(object):
         self.problem_text = problem_text
 
         # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        self.make_xml_compatible(self.tree)
+        self.tree = self._parse_problem_text(problem_text, definition_version)
 
         # handle any <include file="foo"> tags
         self._process_includes()
@@ -217,6 +224,29 @@ class LoncapaProblem(object):
             if extract_tree:
                 self.extracted_tree = self._extract_html(self.tree)
 
+    def _parse_problem_text(self, problem_text, definition_version=None):
+        """
+        Returns a copy of the parsed tree of the problem text, made compatible.
+
+        The tree doesn't depend on the seed or the state, so it's cached by
+        definition version: rendering, checking or rescoring the same problem
+        again doesn't parse its XML again.
+        """
+        if definition_version is None:
+            tree = etree.XML(problem_text)
+            self.make_xml_compatible(tree)
+            return tree
+
+        cached_text, tree = _PARSED_PROBLEM_TREES.get(definition_version, (None, None))
+        # the text is still compared, in case it was modified without a new definition version
+        if cached_text != problem_text:
+            tree = etree.XML(problem_text)
+            self.make_xml_compatible(tree)
+            if len(_PARSED_PROBLEM_TREES) >= MAX_PARSED_PROBLEM_TREES:
+                _PARSED_PROBLEM_TREES.clear()
+            _PARSED_PROBLEM_TREES[definition_version] = (problem_text, tree)
+        return deepcopy(tree)
+
     def make_xml_compatible(self, tree):
         """
         Adjust tree xml in-place for compatibility before creating
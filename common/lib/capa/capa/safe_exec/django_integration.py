@@ -0,0 +1,46 @@
+"""
+Django integration for the safe_exec worker pool.
+
+Code jailing is configured by codejail's ConfigureCodeJailMiddleware.  This
+middleware configures the worker pool from the "worker_pool" key of the
+same CODE_JAIL setting::
+
+    CODE_JAIL = {
+        ...
+        'worker_pool': {
+            # How many sandbox workers each process can start.  0 means
+            # safe_exec starts a sandboxed Python for each execution.
+            'size': 2,
+            # How many executions a worker runs before it's recycled.
+            'max_runs': 100,
+            # How many workers all the processes of the host can start, at
+            # least size times the number of processes to keep them all
+            # warm.  The NPROC limit of the sandbox user is raised by two
+            # per worker.  Defaults to size.
+            'host_size': 16,
+        },
+    }
+
+"""
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import worker_pool
+from .safe_exec import ASSUMED_IMPORTS
+
+
+class ConfigureWorkerPoolMiddleware(object):
+    """
+    Configure the safe_exec worker pool on startup.
+    """
+    def __init__(self):
+        pool_settings = getattr(settings, 'CODE_JAIL', {}).get('worker_pool', {})
+        size = pool_settings.get('size')
+        if size:
+            worker_pool.configure(
+                size,
+                max_runs=pool_settings.get('max_runs', 100),
+                host_size=pool_settings.get('host_size'),
+                preload=[modname for _, modname in ASSUMED_IMPORTS],
+            )
+        raise MiddlewareNotUsed
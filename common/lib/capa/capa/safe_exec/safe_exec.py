@@ -3,7 +3,7 @@
 from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
-from . import lazymod
+from . import lazymod, worker_pool
 from dogapi import dog_stats_api
 from six import text_type
 
@@ -110,6 +110,9 @@ def safe_exec(
 
     If `unsafely` is true, then the code will actually be executed without sandboxing.
 
+    If the worker pool is configured, the code is executed by one of its warm
+    sandbox workers instead of a new sandboxed process.
+
     """
     # Check the cache for a previous result.
     if cache:
@@ -132,8 +135,11 @@ def safe_exec(
     code_prolog = CODE_PROLOG % random_seed
 
     # Decide which code executor to use.
+    pool = worker_pool.get_pool()
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif pool is not None:
+        exec_fn = pool.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
@@ -0,0 +1,278 @@
+"""
+The sandboxed side of the safe_exec worker pool.
+
+This script isn't imported by Capa: `worker_pool` copies it, followed by the
+source of codejail's `json_safe`, into the home of a sandbox worker, and runs
+it with the sandboxed Python as the sandbox user.
+
+The worker first reads its configuration on stdin, one JSON line, and imports
+the modules the problems usually use.  It then reads the execution requests
+on stdin, one JSON line each, and writes a JSON line on stdout for each.
+Every request is run in a forked child, so that it starts from the warm
+imports, doesn't see what the previous requests did, and gets a CPU limit
+of its own.
+
+The children run as the same user as the worker, so the worker makes itself
+non-dumpable: they can't ptrace it or open its pipes in /proc.  It's also
+the subreaper of the processes the children start, so that the ones which
+leave their process group or double-fork still end up as its children.
+Once a child has exited, the worker kills any process it left and tells the
+pool, which recycles the worker.
+
+Note that this file must not have `from __future__` imports: they would also
+apply to the code run by `exec`.
+
+"""
+import ctypes
+import errno
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import sys
+import time
+import traceback
+
+# prctl options, from linux/prctl.h.
+PR_SET_DUMPABLE = 4
+PR_SET_CHILD_SUBREAPER = 36
+
+
+class DevNull(object):
+    """
+    The stdout of the executed code, which mustn't write on the response pipe.
+    """
+    def write(self, *args, **kwargs):
+        pass
+
+    def flush(self, *args, **kwargs):
+        pass
+
+
+def prctl(option, value):
+    """
+    Set a prctl option of this process.
+    """
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.prctl(option, value, 0, 0, 0) != 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+
+
+def preimport(modules):
+    """
+    Import the given modules, ignoring the ones that fail: importing them
+    again in the executed code will report the error.
+    """
+    for modname in modules:
+        try:
+            __import__(modname)
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+
+def execute(request, config):
+    """
+    Run the code of the request in this forked child, and return the JSON of
+    the resulting globals.
+    """
+    # A process group of its own, so that all the processes the code starts
+    # can be killed with it.
+    os.setsid()
+    if config['cpu']:
+        resource.setrlimit(resource.RLIMIT_CPU, (config['cpu'], config['cpu'] + 1))
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdout = DevNull()
+
+    os.chdir(request['dir'])
+    os.environ['TMPDIR'] = os.path.abspath('tmp')
+    sys.path.extend(request['python_path'])
+
+    g_dict = request['globals']
+    exec(request['code'], g_dict)  # pylint: disable=exec-used
+    return json.dumps(json_safe(g_dict))  # pylint: disable=undefined-variable
+
+
+def write_all(fd, data):
+    """
+    Write all of `data` on the file descriptor `fd`.
+    """
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def read_output(fd, pid, realtime):
+    """
+    Read the output of the child `pid` on `fd` until it closes it, killing the
+    child if it runs longer than `realtime` seconds.  Returns the output, and
+    whether the child was killed.
+    """
+    chunks = []
+    deadline = time.time() + realtime if realtime else None
+    while True:
+        timeout = max(deadline - time.time(), 0) if deadline else None
+        try:
+            readable = select.select([fd], [], [], timeout)[0]
+        except select.error as error:
+            if error.args[0] == errno.EINTR:
+                continue
+            raise
+        if not readable:
+            kill_group(pid)
+            return b''.join(chunks), True
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return b''.join(chunks), False
+        chunks.append(chunk)
+
+
+def kill_group(pid):
+    """
+    Kill the child `pid` and all the processes it started.
+    """
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def child_pids():
+    """
+    Returns the pids of the children of this process.
+    """
+    pids = []
+    ppid = str(os.getpid())
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(os.path.join('/proc', name, 'stat')) as stat:
+                # The command name is in parentheses, and may contain spaces.
+                fields = stat.read().rpartition(')')[2].split()
+        except IOError:
+            continue
+        if fields[1] == ppid:
+            pids.append(int(name))
+    return pids
+
+
+def kill_orphans():
+    """
+    Kill the processes a child left.  As their subreaper, this process
+    adopted them.  Returns whether there were any.
+    """
+    found = False
+    while True:
+        pids = child_pids()
+        if not pids:
+            return found
+        found = True
+        for pid in pids:
+            kill_group(pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+
+
+def clean_directory(path):
+    """
+    Remove what the code wrote in the directory `path`.
+    """
+    for name in os.listdir(path):
+        child = os.path.join(path, name)
+        if os.path.isdir(child) and not os.path.islink(child):
+            shutil.rmtree(child, ignore_errors=True)
+        else:
+            try:
+                os.remove(child)
+            except OSError:
+                pass
+
+
+def run(request, config):
+    """
+    Run a request in a forked child, and return the response.
+    """
+    try:
+        read_fd, write_fd = os.pipe()
+        try:
+            pid = os.fork()
+        except OSError:
+            os.close(read_fd)
+            os.close(write_fd)
+            raise
+    except OSError as error:
+        # e.g. EAGAIN when the sandbox user reached its NPROC limit.
+        return {'status': 1, 'stderr': 'Could not fork: {}'.format(error), 'limit': False, 'error': True}
+    if pid == 0:
+        os.close(read_fd)
+        status = 0
+        try:
+            output = execute(request, config)
+        except BaseException:  # pylint: disable=broad-except
+            output = json.dumps({'stderr': traceback.format_exc()})
+            status = 1
+        try:
+            if not isinstance(output, bytes):
+                output = output.encode('utf-8')
+            write_all(write_fd, output)
+        finally:
+            os._exit(status)  # pylint: disable=protected-access
+
+    os.close(write_fd)
+    try:
+        output, timed_out = read_output(read_fd, pid, config['realtime'])
+    finally:
+        os.close(read_fd)
+    _, wait_status = os.waitpid(pid, 0)
+    # The processes the code started don't survive it.
+    kill_group(pid)
+    leaked = kill_orphans()
+    clean_directory(os.path.join(request['dir'], 'tmp'))
+
+    if leaked:
+        # This worker may have been tampered with: it's recycled.
+        return {'status': 1, 'stderr': 'The code left processes running', 'limit': False, 'leaked': True}
+    if timed_out or os.WIFSIGNALED(wait_status):
+        # The code reached a limit: this worker is recycled.
+        signum = signal.SIGKILL if timed_out else os.WTERMSIG(wait_status)
+        return {'status': -signum, 'stderr': '', 'limit': True}
+    status = os.WEXITSTATUS(wait_status)
+    try:
+        result = json.loads(output.decode('utf-8'))
+    except ValueError:
+        return {'status': status or 1, 'stderr': '', 'limit': False}
+    if status:
+        return {'status': status, 'stderr': result['stderr'], 'limit': False}
+    return {'status': 0, 'globals': result, 'limit': False}
+
+
+def main():
+    """
+    Serve the execution requests until stdin is closed.
+    """
+    prctl(PR_SET_DUMPABLE, 0)
+    prctl(PR_SET_CHILD_SUBREAPER, 1)
+    config = json.loads(sys.stdin.readline())
+    # See TNL-6456
+    os.environ["OPENBLAS_NUM_THREADS"] = "1"
+    preimport(config['modules'])
+    stdout = sys.stdout
+    sys.stdout = DevNull()
+
+    stdout.write('{}\n')
+    stdout.flush()
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        response = run(json.loads(line), config)
+        stdout.write(json.dumps(response) + '\n')
+        stdout.flush()
@@ -0,0 +1,95 @@
+"""Test worker_pool.py"""
+
+import os
+import os.path
+import textwrap
+import unittest
+
+from mock import patch
+from nose.plugins.skip import SkipTest
+from six import text_type
+
+from capa.safe_exec import safe_exec, worker_pool
+from codejail.safe_exec import SafeExecException
+from codejail.jail_code import is_configured
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        super(TestWorkerPool, self).setUp()
+        # The workers are sandboxed Pythons, they need CodeJail configured for python.
+        if not is_configured("python"):
+            raise SkipTest
+        worker_pool.configure(1, max_runs=3, preload=["math"])
+        self.addCleanup(worker_pool.configure, 0)
+        self.pool = worker_pool.get_pool()
+
+    def test_set_values(self):
+        g = {'b': 2}
+        safe_exec("a = 1/2 + b", g, random_seed=17)
+        self.assertEqual(g['a'], 2.5)
+
+    def test_python_lib(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        safe_exec("import constant; a = constant.THE_CONST", g, python_path=[pylib])
+        self.assertEqual(g['a'], 23)
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", text_type(cm.exception))
+        self.assertEqual(self.pool.recycled, 0)
+
+    def test_executions_are_isolated(self):
+        safe_exec("import math; math.leaked = 1", {})
+        g = {}
+        safe_exec("import math; leaked = hasattr(math, 'leaked')", g)
+        self.assertFalse(g['leaked'])
+        self.assertEqual(self.pool.started, 1)
+
+    def test_recycled_after_max_runs(self):
+        for _ in range(3):
+            safe_exec("a = 1", {})
+        self.assertEqual(self.pool.recycled, 1)
+        self.assertEqual(self.pool.started, 0)
+
+    def test_recycled_on_limits(self):
+        with self.assertRaises(SafeExecException):
+            safe_exec("while True: pass", {})
+        self.assertEqual(self.pool.recycled, 1)
+
+        g = {}
+        safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_recycled_on_leaked_processes(self):
+        # A grandchild in a session of its own, which doesn't keep the pipes.
+        code = textwrap.dedent("""
+            import os, time
+            if os.fork() == 0:
+                os.setsid()
+                if os.fork() == 0:
+                    os.closerange(0, 1024)
+                    time.sleep(60)
+                os._exit(0)
+            os.wait()
+            """)
+        with self.assertRaises(SafeExecException) as cm:
+            safe_exec(code, {})
+        self.assertIn("left processes running", text_type(cm.exception))
+        self.assertEqual(self.pool.recycled, 1)
+
+        g = {}
+        safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_host_full(self):
+        worker_pool.configure(1, host_size=1)
+        # Another process holds the only slot of the host.
+        slot_fd = worker_pool._acquire_host_slot(1)  # pylint: disable=protected-access
+        self.addCleanup(os.close, slot_fd)
+        with patch.object(worker_pool, 'codejail_safe_exec') as mock_codejail_safe_exec:
+            safe_exec("a = 1", {})
+        self.assertTrue(mock_codejail_safe_exec.called)
+        self.assertEqual(worker_pool.get_pool().started, 0)
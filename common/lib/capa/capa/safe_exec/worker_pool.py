@@ -0,0 +1,423 @@
+"""
+A pool of warm sandbox workers for safe_exec.
+
+Running code with codejail starts a new sandboxed Python for each execution,
+which then imports numpy, scipy and the other assumed imports again.  A pool
+worker is a sandboxed Python, started like codejail starts one: as the
+sandbox user and under the configured resource limits.  It imports those
+modules once and runs each execution request it receives over its pipe in a
+forked child (see `sandbox_worker.py`).  Workers are recycled after
+`max_runs` executions, when the code reaches a resource limit or leaves
+processes running, or when they stop responding.
+
+The workers of all the processes of a host count against the NPROC limit of
+the sandbox user, so they are capped host-wide: a worker holds one of
+`host_size` slots, lock files shared by the processes.  When none is free,
+the execution starts a sandboxed Python as it does without the pool.  The
+NPROC limit of a worker is codejail's, plus the worker and run child of
+each slot.
+
+The pool is enabled by the "worker_pool" key of the CODE_JAIL setting (see
+`django_integration.py`).  The pool size, the time spent waiting for a worker
+and the recycled workers are reported as the capa.safe_exec.pool.* metrics.
+
+"""
+import atexit
+import errno
+import fcntl
+import functools
+import inspect
+import json
+import logging
+import os
+import os.path
+import resource
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from codejail import jail_code
+from codejail.safe_exec import json_safe, safe_exec as codejail_safe_exec, SafeExecException
+from dogapi import dog_stats_api
+
+log = logging.getLogger(__name__)
+
+# The pool, if it's been configured.
+_POOL = None
+
+# How many seconds a worker has to start, and to respond on top of the real
+# time limit of the code.
+WORKER_GRACE_TIME = 10
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "sandbox_worker.py")
+
+# The processes a sandboxed execution can have, as codejail allows.
+CODEJAIL_NPROC = 15
+
+# The directory of the host slot lock files.
+SLOTS_DIR = os.path.join(tempfile.gettempdir(), "codejail-pool-slots")
+
+
+def configure(size, max_runs=100, preload=(), host_size=None):
+    """
+    Configure the pool of `size` workers used by safe_exec.  Each worker runs
+    `max_runs` executions at most, after importing the `preload` modules.  A
+    size of zero disables the pool.  `host_size` is how many workers all the
+    processes of the host can start, `size` by default.
+    """
+    global _POOL  # pylint: disable=global-statement
+    if _POOL is not None:
+        _POOL.close()
+    _POOL = SandboxWorkerPool(size, max_runs, preload, host_size or size) if size else None
+
+
+def get_pool():
+    """
+    Returns the configured pool, or None if safe_exec doesn't use a pool.
+    """
+    if _POOL is None or not jail_code.is_configured("python"):
+        return None
+    return _POOL
+
+
+class WorkerError(Exception):
+    """
+    A sandbox worker didn't respond as expected.
+    """
+    pass
+
+
+def _set_process_limits(rlimits):  # pragma: no cover
+    """
+    Set limits on a worker process, called in the child process.
+    """
+    # A new session id, so that the worker and the processes it starts can
+    # be killed together.
+    os.setsid()
+    for limit, value in rlimits:
+        resource.setrlimit(limit, value)
+
+
+def _acquire_host_slot(host_size):
+    """
+    Returns the descriptor of a locked slot file, or None if the workers of
+    the host hold all of the `host_size` slots.  The lock is released when
+    the descriptor is closed, or when the process dies.
+    """
+    try:
+        os.makedirs(SLOTS_DIR)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
+    for slot in range(host_size):
+        fd = os.open(os.path.join(SLOTS_DIR, "slot-%d" % slot), os.O_CREAT | os.O_RDWR, 0o600)
+        # Other subprocesses mustn't keep the slot.
+        fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.FD_CLOEXEC)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError as error:
+            os.close(fd)
+            if error.errno not in (errno.EAGAIN, errno.EACCES):
+                raise
+            continue
+        return fd
+    return None
+
+
+def _create_rlimits(host_size):
+    """
+    Returns the resource limits of a worker, from the codejail limits.  The
+    CPU limit is set by the worker on each execution.
+    """
+    # NPROC counts all the processes of the sandbox user: the workers of the
+    # host and their run children, on top of what an execution can start.
+    nproc = CODEJAIL_NPROC + 2 * host_size
+    rlimits = [(resource.RLIMIT_NPROC, (nproc, nproc))]
+    vmem = jail_code.LIMITS.get("VMEM")
+    if vmem:
+        rlimits.append((resource.RLIMIT_AS, (vmem, vmem)))
+    fsize = jail_code.LIMITS.get("FSIZE", 0)
+    rlimits.append((resource.RLIMIT_FSIZE, (fsize, fsize)))
+    return rlimits
+
+
+class SandboxWorker(object):
+    """
+    A sandboxed Python process running `sandbox_worker.py`.
+    """
+    def __init__(self, preload, host_size, slot_fd):
+        self.runs = 0
+        self.leaked = False
+        # The host slot of the worker, released by the pool.
+        self.slot_fd = slot_fd
+        self.user = jail_code.COMMANDS["python"]["user"]
+        self.realtime = jail_code.LIMITS.get("REALTIME")
+        self._buffer = b""
+
+        # The home of the worker, readable by the sandbox user.  Each
+        # execution gets a directory in it.
+        self.homedir = tempfile.mkdtemp(prefix="codejail-pool-")
+        os.chmod(self.homedir, 0o775)
+        with open(WORKER_SCRIPT) as script:
+            worker_code = script.read()
+        with open(os.path.join(self.homedir, "sandbox_worker"), "w") as worker:
+            worker.write(worker_code)
+            worker.write("\n\n")
+            worker.write(inspect.getsource(json_safe))
+            worker.write("\n\nmain()\n")
+
+        cmd = []
+        if self.user:
+            cmd.extend(["sudo", "-u", self.user])
+        cmd.extend(jail_code.COMMANDS["python"]["cmdline_start"])
+        cmd.append("sandbox_worker")
+        with open(os.devnull, "w") as devnull:
+            self.process = subprocess.Popen(
+                cmd, cwd=self.homedir, env={},
+                preexec_fn=functools.partial(_set_process_limits, _create_rlimits(host_size)),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull, close_fds=True,
+            )
+        try:
+            self._send({
+                "modules": list(preload),
+                "cpu": jail_code.LIMITS.get("CPU"),
+                "realtime": self.realtime,
+            })
+            # The worker responds once it has imported the modules.
+            self._receive(WORKER_GRACE_TIME)
+        except WorkerError:
+            self.close()
+            raise
+        log.info("Started sandbox worker with PID %s", self.process.pid)
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute `code` in the worker, as codejail's `safe_exec` does.  The
+        SafeExecException raised when the code fails tells whether it reached
+        a resource limit.
+        """
+        self.runs += 1
+        extra_files = extra_files or ()
+        extra_names = set(name for name, contents in extra_files)
+
+        rundir = tempfile.mkdtemp(dir=self.homedir)
+        try:
+            os.chmod(rundir, 0o775)
+            tmptmp = os.path.join(rundir, "tmp")
+            os.mkdir(tmptmp)
+            os.chmod(tmptmp, 0o777)
+
+            sys_path = []
+            for pydir in python_path or ():
+                pybase = os.path.basename(pydir)
+                sys_path.append(pybase)
+                if pybase not in extra_names:
+                    dest = os.path.join(rundir, pybase)
+                    if os.path.isfile(pydir):
+                        shutil.copy(pydir, dest)
+                    else:
+                        shutil.copytree(pydir, dest, symlinks=True)
+            for name, content in extra_files:
+                with open(os.path.join(rundir, name), "wb") as extra:
+                    extra.write(content)
+
+            if slug:
+                log.info("Executing jailed code %s in sandbox worker %s", slug, self.process.pid)
+            self._send({
+                "code": code,
+                "globals": json_safe(globals_dict),
+                "python_path": sys_path,
+                "dir": rundir,
+            })
+            response = self._receive((self.realtime or 0) + WORKER_GRACE_TIME)
+        finally:
+            # The worker removes what the code wrote in tmp.
+            shutil.rmtree(rundir, ignore_errors=True)
+
+        if response.get("leaked"):
+            self.leaked = True
+        if response.get("error"):
+            log.error("Sandbox worker %s couldn't run jailed code: %s", self.process.pid, response["stderr"])
+        if response["status"] != 0:
+            error = SafeExecException("Couldn't execute jailed code: %s" % response["stderr"])
+            error.limit_reached = response["limit"]
+            raise error
+        globals_dict.update(response["globals"])
+
+    def _send(self, message):
+        """
+        Write the JSON line of `message` to the worker.
+        """
+        try:
+            self.process.stdin.write(json.dumps(message) + "\n")
+            self.process.stdin.flush()
+        except (IOError, OSError) as error:
+            raise WorkerError(u"Couldn't write to the sandbox worker: {}".format(error))
+
+    def _receive(self, timeout):
+        """
+        Read the next JSON line from the worker, waiting `timeout` seconds at
+        most.
+        """
+        deadline = time.time() + timeout
+        fd = self.process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise WorkerError("The sandbox worker didn't respond in time")
+            try:
+                readable = select.select([fd], [], [], remaining)[0]
+            except select.error as error:
+                if error.args[0] == errno.EINTR:
+                    continue
+                raise
+            if readable:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    raise WorkerError("The sandbox worker exited")
+                self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line.decode("utf-8"))
+
+    def close(self):
+        """
+        Stop the worker, and remove its home.
+        """
+        try:
+            self.process.stdin.close()
+        except (IOError, OSError):
+            pass
+        if self.process.poll() is None:
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+        self.process.wait()
+        self.process.stdout.close()
+        if self.user:
+            # Remove what the sandbox user may have left, as codejail does.
+            subprocess.call(
+                ["sudo", "-u", self.user, "/usr/bin/find", self.homedir, "-mindepth", "3", "-delete"],
+                cwd=self.homedir,
+            )
+        shutil.rmtree(self.homedir, ignore_errors=True)
+
+
+class SandboxWorkerPool(object):
+    """
+    A pool of `size` sandbox workers, started on demand.
+    """
+    def __init__(self, size, max_runs, preload, host_size):
+        self.size = size
+        self.host_size = host_size
+        self.max_runs = max_runs
+        self.preload = list(preload)
+        self.started = 0
+        self.recycled = 0
+        self._idle = []
+        self._condition = threading.Condition()
+        atexit.register(self.close)
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute `code` in a worker of the pool, as codejail's `safe_exec` does.
+        """
+        worker = self._acquire()
+        if worker is None:
+            # The workers of the other processes hold all the host slots.
+            codejail_safe_exec(code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug)
+            return
+        recycle_reason = None
+        try:
+            worker.safe_exec(code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug)
+        except SafeExecException as error:
+            if getattr(error, 'limit_reached', False):
+                recycle_reason = "limit"
+            raise
+        except WorkerError as error:
+            recycle_reason = "error"
+            raise SafeExecException(u"Couldn't execute jailed code: {}".format(error))
+        except Exception:
+            recycle_reason = "error"
+            raise
+        finally:
+            if recycle_reason is None and worker.leaked:
+                recycle_reason = "leaked"
+            if recycle_reason is None and worker.runs >= self.max_runs:
+                recycle_reason = "max_runs"
+            self._release(worker, recycle_reason)
+
+    def _acquire(self):
+        """
+        Returns an idle worker, starting one if the pool isn't full, or waiting
+        for one otherwise.  Returns None if the host can't start more workers.
+        """
+        start = time.time()
+        with self._condition:
+            while not self._idle and self.started >= self.size:
+                self._condition.wait()
+            worker = self._idle.pop() if self._idle else None
+            if worker is None:
+                self.started += 1
+        if worker is None:
+            slot_fd = None
+            try:
+                slot_fd = _acquire_host_slot(self.host_size)
+                if slot_fd is not None:
+                    worker = SandboxWorker(self.preload, self.host_size, slot_fd)
+            except Exception:
+                if slot_fd is not None:
+                    os.close(slot_fd)
+                with self._condition:
+                    self.started -= 1
+                    self._condition.notify()
+                raise
+            if worker is None:
+                with self._condition:
+                    self.started -= 1
+                    self._condition.notify()
+                dog_stats_api.increment('capa.safe_exec.pool.host_full')
+                return None
+            dog_stats_api.gauge('capa.safe_exec.pool.size', self.started)
+        dog_stats_api.histogram('capa.safe_exec.pool.queue_wait', time.time() - start)
+        return worker
+
+    def _release(self, worker, recycle_reason):
+        """
+        Makes the worker available again, or stops it if it has to be recycled.
+        """
+        if recycle_reason is None:
+            with self._condition:
+                self._idle.append(worker)
+                self._condition.notify()
+            return
+
+        self._stop(worker)
+        with self._condition:
+            self.started -= 1
+            self.recycled += 1
+            self._condition.notify()
+        log.info("Recycled sandbox worker with PID %s (%s)", worker.process.pid, recycle_reason)
+        dog_stats_api.increment('capa.safe_exec.pool.recycled', tags=[u'reason:{}'.format(recycle_reason)])
+        dog_stats_api.gauge('capa.safe_exec.pool.size', self.started)
+
+    def close(self):
+        """
+        Stop the idle workers.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self.started -= len(idle)
+        for worker in idle:
+            self._stop(worker)
+
+    @staticmethod
+    def _stop(worker):
+        """
+        Stop the worker, and release its host slot.
+        """
+        worker.close()
+        os.close(worker.slot_fd)
@@ -7,7 +7,8 @@ from lxml import etree
 from mock import patch
 import unittest
 
-from capa.tests.helpers import new_loncapa_problem
+from capa import capa_problem
+from capa.tests.helpers import mock_capa_module, new_loncapa_problem, test_capa_system
 from openedx.core.djangolib.markup import HTML
 
 
@@ -708,3 +709,54 @@ class CAPAProblemReportHelpersTest(unittest.TestCase):
             """
         )
         self.assertEquals(problem.find_answer_text('1_2_1', 'hide'), 'hide')
+
+
+class CAPAProblemParsingTest(unittest.TestCase):
+    """ Test the parsing of the problem text """
+    xml = """
+        <problem>
+            <optionresponse>
+                <optioninput options="('yellow','blue','green')" correct="blue" label="Color_1"/>
+            </optionresponse>
+        </problem>
+    """
+
+    def setUp(self):
+        super(CAPAProblemParsingTest, self).setUp()
+        patcher = patch.dict(capa_problem._PARSED_PROBLEM_TREES, clear=True)  # pylint: disable=protected-access
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _new_problem(self, problem_id, seed, definition_version, xml=None):
+        """
+        Returns a problem built from the given version of the problem definition.
+        """
+        return capa_problem.LoncapaProblem(
+            xml or self.xml,
+            id=problem_id,
+            seed=seed,
+            capa_system=test_capa_system(),
+            capa_module=mock_capa_module(),
+            definition_version=definition_version,
+        )
+
+    def test_problem_text_parsed_once(self):
+        first = self._new_problem('first', 1, 'version_1')
+        cached = capa_problem._PARSED_PROBLEM_TREES['version_1']  # pylint: disable=protected-access
+        second = self._new_problem('second', 2, 'version_1')
+        self.assertIs(capa_problem._PARSED_PROBLEM_TREES['version_1'], cached)  # pylint: disable=protected-access
+
+        # each problem transforms its own copy of the tree
+        self.assertIsNot(first.tree, second.tree)
+        self.assertEqual(first.tree.find('.//optioninput').get('id'), 'first_2_1')
+        self.assertEqual(second.tree.find('.//optioninput').get('id'), 'second_2_1')
+        self.assertEqual(first.find_correct_answer_text('first_2_1'), 'blue')
+
+    def test_new_definition_version_parsed_again(self):
+        self._new_problem('first', 1, 'version_1')
+        edited = self._new_problem('first', 1, 'version_2', xml=self.xml.replace('correct="blue"', 'correct="green"'))
+        self.assertEqual(edited.find_correct_answer_text('first_2_1'), 'green')
+
+    def test_not_cached_without_definition_version(self):
+        self._new_problem('first', 1, None)
+        self.assertEqual(capa_problem._PARSED_PROBLEM_TREES, {})  # pylint: disable=protected-access
@@ -19,6 +19,7 @@ try:
     import dogstats_wrapper as dog_stats_api
 except ImportError:
     dog_stats_api = None
+from opaque_keys.edx.locator import LocalId
 from pytz import utc
 from django.utils.encoding import smart_text
 from six import text_type
@@ -66,6 +67,19 @@ def randomization_bin(seed, problem_id):
     return int(r_hash.hexdigest()[:7], 16) % NUM_RANDOMIZATION_BINS
 
 
+def get_definition_version(block):
+    """
+    Returns the id of the definition of the given problem block, which changes
+    each time its data is edited, or None if its modulestore doesn't version
+    the definitions.
+    """
+    definition_locator = getattr(getattr(block, 'descriptor', block), 'definition_locator', None)
+    definition_id = getattr(definition_locator, 'definition_id', None)
+    if isinstance(definition_id, LocalId):
+        return None
+    return definition_id
+
+
 class Randomization(String):
     """
     Define a field to store how to randomize a problem.
@@ -325,8 +339,10 @@ class CapaMixin(ScorableXBlockMixin, CapaFields):
         """
         Generate a new Loncapa Problem
         """
+        definition_version = None
         if text is None:
             text = self.data
+            definition_version = get_definition_version(self)
 
         capa_system = LoncapaSystem(
             ajax_url=self.runtime.ajax_url,
@@ -352,6 +368,7 @@ class CapaMixin(ScorableXBlockMixin, CapaFields):
             seed=self.seed,
             capa_system=capa_system,
             capa_module=self,  # njp
+            definition_version=definition_version,
         )
 
     def get_state_for_lcp(self):
@@ -14,7 +14,7 @@ from xmodule.raw_module import RawDescriptor
 from xmodule.util.misc import escape_html_characters
 from xmodule.x_module import DEPRECATION_VSCOMPAT_EVENT, XModule, module_attr
 
-from .capa_base import CapaFields, CapaMixin, ComplexEncoder
+from .capa_base import CapaFields, CapaMixin, ComplexEncoder, get_definition_version
 
 log = logging.getLogger("edx.courseware")
 
@@ -300,6 +300,7 @@ class CapaDescriptor(CapaFields, RawDescriptor):
             state={},
             seed=1,
             minimal_init=True,
+            definition_version=get_definition_version(self),
         )
         return lcp.get_max_score()
 
@@ -378,6 +379,7 @@ class CapaDescriptor(CapaFields, RawDescriptor):
                 # extract_tree=False allows us to work without a fully initialized CapaModule
                 # We'll still be able to find particular data in the XML when we need it
                 extract_tree=False,
+                definition_version=get_definition_version(self),
             )
 
             for answer_id, orig_answers in lcp.student_answers.items():
@@ -10,6 +10,8 @@ XASSET_THUMBNAIL_TAIL_NAME = '.jpg'
 STREAM_DATA_CHUNK_SIZE = 1024
 VERSIONED_ASSETS_PREFIX = '/assets/courseware'
 VERSIONED_ASSETS_PATTERN = r'/assets/courseware/(v[\d]/)?([a-f0-9]{32})'
+# Widths, in pixels, of the resized variants generated for uploaded images
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
 
 import os
 import logging
@@ -27,7 +29,7 @@ from PIL import Image
 
 class StaticContent(object):
     def __init__(self, loc, name, content_type, data, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False, content_digest=None):
+                 length=None, locked=False, content_digest=None, image_variants=None):
         self.location = loc
         self.name = name  # a display string which can be edited, and thus not part of the location which needs to be fixed
         self.content_type = content_type
@@ -40,6 +42,8 @@ class StaticContent(object):
         self.import_path = import_path
         self.locked = locked
         self.content_digest = content_digest
+        # list of (width, AssetKey) of the resized variants of an image, including the image itself
+        self.image_variants = image_variants
 
     @property
     def is_thumbnail(self):
@@ -68,6 +72,21 @@ class StaticContent(object):
             extension=extension,
         )
 
+    @staticmethod
+    def generate_image_variant_name(original_name, width, extension):
+        """
+        - original_name: Name of the image (typically its location.name)
+        - width: width of the variant in pixels
+        - extension: filename extension of the variant
+        """
+        name_root, ext = os.path.splitext(original_name)
+        return u"{name_root}{ext}-w{width}{extension}".format(
+            name_root=name_root,
+            ext=ext.replace(u'.', u'-'),
+            width=width,
+            extension=extension,
+        )
+
     @staticmethod
     def compute_location(course_key, path, revision=None, is_thumbnail=False):
         """
@@ -221,6 +240,38 @@ class StaticContent(object):
         """
         return any(path.lower().endswith(excluded_ext.lower()) for excluded_ext in excluded_exts)
 
+    @staticmethod
+    def get_image_srcset(course_key, path, base_url, excluded_exts):
+        """
+        Returns the srcset attribute value offering the resized variants of
+        the given course image, or None if it has none.  The variant urls are
+        canonicalized like the image url, so they are versioned and served
+        from the CDN if the image can be.
+
+        Args:
+            course_key: key to the course which owns this image
+            path: the path to said image
+        """
+        relative_path = urlparse(path)[2]
+        asset_key = StaticContent.get_asset_key_from_path(course_key, relative_path)
+        try:
+            content = AssetManager.find(asset_key, as_stream=True)
+        except (ItemNotFoundError, NotFoundError):
+            return None
+
+        image_variants = getattr(content, 'image_variants', None)
+        if not image_variants:
+            return None
+        srcset = []
+        for width, variant_location in image_variants:
+            url = StaticContent.get_canonicalized_asset_path(
+                course_key, StaticContent.serialize_asset_key_with_slash(variant_location), base_url, excluded_exts
+            )
+            if AssetLocator.CANONICAL_NAMESPACE in url:
+                url = url.replace('block@', 'block/', 1)
+            srcset.append(u'{} {}w'.format(url, width))
+        return u', '.join(srcset)
+
     @staticmethod
     def get_canonicalized_asset_path(course_key, path, base_url, excluded_exts, encode=True):
         """
@@ -308,10 +359,11 @@ class StaticContent(object):
 
 class StaticContentStream(StaticContent):
     def __init__(self, loc, name, content_type, stream, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False, content_digest=None):
+                 length=None, locked=False, content_digest=None, image_variants=None):
         super(StaticContentStream, self).__init__(loc, name, content_type, None, last_modified_at=last_modified_at,
                                                   thumbnail_location=thumbnail_location, import_path=import_path,
-                                                  length=length, locked=locked, content_digest=content_digest)
+                                                  length=length, locked=locked, content_digest=content_digest,
+                                                  image_variants=image_variants)
         self._stream = stream
 
     def stream_data(self):
@@ -344,7 +396,7 @@ class StaticContentStream(StaticContent):
         content = StaticContent(self.location, self.name, self.content_type, self._stream.read(),
                                 last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
                                 import_path=self.import_path, length=self.length, locked=self.locked,
-                                content_digest=self.content_digest)
+                                content_digest=self.content_digest, image_variants=self.image_variants)
         return content
 
 
@@ -463,6 +515,69 @@ class ContentStore(object):
 
         return thumbnail_content, thumbnail_file_location
 
+    def generate_image_variants(self, content, widths=IMAGE_VARIANT_WIDTHS):
+        """
+        Creates resized variants of the given image, one for each width smaller
+        than the image, to be offered to browsers along with the image itself.
+
+        Returns a list of (width, AssetKey) of the variants and of the image,
+        or an empty list if the content isn't a raster image.
+        """
+        if content.content_type is None or content.content_type == 'image/svg+xml' or \
+                content.content_type.split('/')[0] != 'image':
+            return []
+
+        variants = []
+        try:
+            with Image.open(StringIO.StringIO(content.data)) as image:
+                original_width, original_height = image.size
+                has_alpha = image.mode in ('RGBA', 'LA', 'P')
+                image_format, content_type, extension = ('PNG', 'image/png', '.png') if has_alpha else \
+                    ('JPEG', 'image/jpeg', '.jpg')
+                source = image.convert('RGBA' if has_alpha else 'RGB')
+                for width in sorted(widths):
+                    if width >= original_width:
+                        break
+                    variant_file = StringIO.StringIO()
+                    variant_image = source.resize(
+                        (width, max(1, original_height * width // original_width)), Image.ANTIALIAS
+                    )
+                    variant_image.save(variant_file, image_format)
+                    variant_file.seek(0)
+
+                    variant_name = StaticContent.generate_image_variant_name(
+                        content.location.block_id, width, extension
+                    )
+                    variant_location = StaticContent.compute_location(
+                        content.location.course_key, variant_name, is_thumbnail=True
+                    )
+                    # the variants are served with the same access checks as the image
+                    self.save(StaticContent(
+                        variant_location, variant_name, content_type, variant_file,
+                        locked=getattr(content, 'locked', False)
+                    ))
+                    variants.append((width, variant_location))
+        except Exception:  # pylint: disable=broad-except
+            # log and continue as variants are optional
+            logging.exception(u"Failed to generate image variants for %s", content.location)
+            return []
+
+        variants.append((original_width, content.location))
+        return variants
+
+    def set_image_variants_locked(self, location, image_variants, locked):
+        """
+        Sets the lock of the resized variants of the image at the given
+        location, which must be the lock of the image.
+        """
+        for __, variant_location in image_variants or []:
+            if variant_location == location:
+                continue
+            try:
+                self.set_attr(variant_location, 'locked', locked)
+            except NotFoundError:
+                logging.warning(u"Image variant %s of %s was not found", variant_location, location)
+
     def ensure_indexes(self):
         """
         Ensure that all appropriate indexes are created that are needed by this modulestore, or raise
@@ -91,6 +91,7 @@ class MongoContentStore(ContentStore):
         with self.fs.new_file(_id=content_id, filename=unicode(content.location), content_type=content.content_type,
                               displayname=content.name, content_son=content_son,
                               thumbnail_location=thumbnail_location,
+                              image_variants=image_variants_to_mongo(getattr(content, 'image_variants', None)),
                               import_path=content.import_path,
                               # getattr b/c caching may mean some pickled instances don't have attr
                               locked=getattr(content, 'locked', False)) as fp:
@@ -130,6 +131,7 @@ class MongoContentStore(ContentStore):
                     import_path=getattr(fp, 'import_path', None),
                     length=fp.length, locked=getattr(fp, 'locked', False),
                     content_digest=getattr(fp, 'md5', None),
+                    image_variants=image_variants_from_mongo(getattr(fp, 'image_variants', None)),
                 )
             else:
                 with self.fs.get(content_id) as fp:
@@ -145,6 +147,7 @@ class MongoContentStore(ContentStore):
                         import_path=getattr(fp, 'import_path', None),
                         length=fp.length, locked=getattr(fp, 'locked', False),
                         content_digest=getattr(fp, 'md5', None),
+                        image_variants=image_variants_from_mongo(getattr(fp, 'image_variants', None)),
                     )
         except NoFile:
             if throw_on_not_found:
@@ -411,7 +414,11 @@ class MongoContentStore(ContentStore):
                 thumbnail_location=asset['thumbnail_location'],
                 import_path=asset['import_path'],
                 # getattr b/c caching may mean some pickled instances don't have attr
-                locked=asset.get('locked', False)
+                locked=asset.get('locked', False),
+                image_variants=image_variants_to_mongo([
+                    (width, dest_course_key.make_asset_key(variant_location.block_type, variant_location.block_id))
+                    for width, variant_location in image_variants_from_mongo(asset.get('image_variants')) or []
+                ]),
             )
 
     def delete_all_course_assets(self, course_key):
@@ -580,3 +587,21 @@ def query_for_course(course_key, category=None):
     else:
         dbkey['{}.run'.format(prefix)] = course_key.run
     return dbkey
+
+
+def image_variants_to_mongo(image_variants):
+    """
+    Converts a list of (width, AssetKey) image variants to the list stored with the asset.
+    """
+    if not image_variants:
+        return None
+    return [[width, unicode(asset_key)] for width, asset_key in image_variants]
+
+
+def image_variants_from_mongo(image_variants):
+    """
+    Converts the image variants stored with an asset to a list of (width, AssetKey).
+    """
+    if not image_variants:
+        return None
+    return [(width, AssetKey.from_string(asset_key)) for width, asset_key in image_variants]
@@ -8,6 +8,8 @@ import zlib
 import pymongo
 import pytz
 import re
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 from time import time
 
@@ -15,7 +17,9 @@ from time import time
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
+    from django.core.exceptions import ImproperlyConfigured
     DJANGO_AVAILABLE = True
 except ImportError:
     DJANGO_AVAILABLE = False
@@ -161,6 +165,111 @@ class QueryTimer(object):
 
 
 TIMER = QueryTimer(__name__, 0.01)
+STRUCTURE_LRU_CACHE_SAMPLE_RATE = 0.01
+
+
+class StructureLRUCache(object):
+    """
+    Process-local, thread-safe LRU cache of deserialized course structures,
+    bounded by the total size of their pickled form.
+
+    The cached structures are shared by all the callers: each get returns
+    a copy of the structure and of its blocks dict, but the BlockData
+    objects themselves are shared and must not be modified in place.
+    Edits go through SplitMongoModuleStore.version_structure, which deep
+    copies the structure first.
+    """
+    METRIC = '{}.StructureLRUCache'.format(__name__)
+
+    def __init__(self, max_size):
+        """
+        Arguments:
+            max_size (int): The maximum total size, in bytes, of the pickled structures.
+                0 disables the cache.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self._structures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of the cached structure with the given id and mark it as most recently used, or None."""
+        if not self.max_size:
+            return None
+
+        with self._lock:
+            entry = self._structures.pop(key, None)
+            if entry is not None:
+                self._structures[key] = entry
+
+        dog_stats_api.increment(
+            '{}.{}'.format(self.METRIC, 'hit' if entry is not None else 'miss'),
+            sample_rate=STRUCTURE_LRU_CACHE_SAMPLE_RATE,
+        )
+        return _copy_structure(entry[0]) if entry is not None else None
+
+    def set(self, key, structure, size):
+        """
+        Cache the structure, whose pickled form is size bytes long, evicting the least
+        recently used ones to stay within max_size. The structure must not be modified afterwards.
+        Return whether it was cached.
+        """
+        if not self.max_size or size > self.max_size:
+            return False
+
+        evicted = 0
+        with self._lock:
+            previous_entry = self._structures.pop(key, None)
+            if previous_entry is not None:
+                self.size -= previous_entry[1]
+            self._structures[key] = (structure, size)
+            self.size += size
+            while self.size > self.max_size:
+                __, (__, evicted_size) = self._structures.popitem(last=False)
+                self.size -= evicted_size
+                evicted += 1
+            total_size = self.size
+
+        if evicted:
+            dog_stats_api.increment('{}.eviction'.format(self.METRIC), evicted)
+        dog_stats_api.histogram('{}.size'.format(self.METRIC), total_size)
+        return True
+
+    def clear(self):
+        """Remove all the cached structures."""
+        with self._lock:
+            self._structures.clear()
+            self.size = 0
+
+
+def _copy_structure(structure):
+    """
+    Return a copy of the structure and of its blocks dict, sharing the BlockData objects.
+    """
+    structure = dict(structure)
+    if 'blocks' in structure:
+        structure['blocks'] = dict(structure['blocks'])
+    return structure
+
+
+_STRUCTURE_LRU_CACHE = None
+
+
+def get_structure_lru_cache():
+    """
+    Return the process-wide StructureLRUCache, sized by the
+    COURSE_STRUCTURE_LRU_CACHE_SIZE setting (0 or missing disables it).
+    """
+    global _STRUCTURE_LRU_CACHE  # pylint: disable=global-statement
+    if _STRUCTURE_LRU_CACHE is None:
+        max_size = 0
+        if DJANGO_AVAILABLE:
+            try:
+                max_size = getattr(settings, 'COURSE_STRUCTURE_LRU_CACHE_SIZE', 0)
+            except ImproperlyConfigured:
+                pass
+        _STRUCTURE_LRU_CACHE = StructureLRUCache(max_size)
+    return _STRUCTURE_LRU_CACHE
 
 
 def structure_from_mongo(structure, course_context=None):
@@ -242,7 +351,15 @@ class CourseStructureCache(object):
                 pass
 
     def get(self, key, course_context=None):
-        """Pull the compressed, pickled struct data from cache and deserialize."""
+        """
+        Return the structure from the process-local LRU cache if it is there,
+        else pull the compressed, pickled struct data from cache and deserialize.
+        """
+        lru_cache = get_structure_lru_cache()
+        structure = lru_cache.get(key)
+        if structure is not None:
+            return structure
+
         if self.cache is None:
             return None
 
@@ -260,16 +377,25 @@ class CourseStructureCache(object):
             pickled_data = zlib.decompress(compressed_pickled_data)
             tagger.measure('uncompressed_size', len(pickled_data))
 
-            return pickle.loads(pickled_data)
+            structure = pickle.loads(pickled_data)
+            if lru_cache.set(key, structure, len(pickled_data)):
+                return _copy_structure(structure)
+            return structure
 
     def set(self, key, structure, course_context=None):
         """Given a structure, will pickle, compress, and write to cache."""
-        if self.cache is None:
+        lru_cache = get_structure_lru_cache()
+        if self.cache is None and not lru_cache.max_size:
             return None
 
         with TIMER.timer("CourseStructureCache.set", course_context) as tagger:
             pickled_data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
             tagger.measure('uncompressed_size', len(pickled_data))
+            # the caller keeps using the given structure, cache a copy of it
+            lru_cache.set(key, pickle.loads(pickled_data), len(pickled_data))
+
+            if self.cache is None:
+                return None
 
             # 1 = Fastest (slightly larger results)
             compressed_pickled_data = zlib.compress(pickled_data, 1)
@@ -796,12 +796,17 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                 definitions = {definition['_id']: definition
                                for definition in descendent_definitions}
 
-                for block in new_module_data.itervalues():
+                for block_key, block in new_module_data.items():
                     if block.definition in definitions:
                         definition = definitions[block.definition]
+                        # the block data belongs to the structure, which may be shared by other
+                        # requests through the structure cache, so update a copy of it
+                        block = copy.copy(block)
                         # convert_fields gets done later in the runtime's xblock_from_json
+                        block.fields = dict(block.fields)
                         block.fields.update(definition.get('fields'))
                         block.definition_loaded = True
+                        new_module_data[block_key] = block
 
             system.module_data.update(new_module_data)
             return system.module_data
@@ -3056,8 +3061,9 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                 elif isinstance(field, ReferenceList):
                     output_fields[field_name] = [robust_usage_key(ele) for ele in value]
                 elif isinstance(field, ReferenceValueDict):
-                    for key, subvalue in value.iteritems():
-                        value[key] = robust_usage_key(subvalue)
+                    output_fields[field_name] = {
+                        key: robust_usage_key(subvalue) for key, subvalue in value.iteritems()
+                    }
         return output_fields
 
     def _get_index_if_valid(self, course_key, force=False):
@@ -29,6 +29,7 @@ from ccx_keys.locator import CCXBlockUsageLocator
 from xmodule.modulestore.inheritance import InheritanceMixin
 from xmodule.x_module import XModuleMixin
 from xmodule.fields import Date, Timedelta
+from xmodule.modulestore.split_mongo.mongo_connection import StructureLRUCache
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
@@ -1011,6 +1012,71 @@ class TestCourseStructureCache(SplitModuleTest):
             course.location.as_object_id(course.location.version_guid)
         )
 
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_structure_lru_cache')
+    def test_structure_lru_cache(self, mock_get_structure_lru_cache):
+        mock_get_structure_lru_cache.return_value = StructureLRUCache(1024 * 1024)
+
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # the dummy course_structure_cache is skipped by the in-process cache
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+
+        # each get returns its own copy of the structure and of its blocks dict
+        self.assertEqual(cached_structure, not_cached_structure)
+        self.assertIsNot(cached_structure, not_cached_structure)
+        self.assertIsNot(cached_structure['blocks'], not_cached_structure['blocks'])
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_structure_lru_cache')
+    def test_structure_lru_cache_not_modified_by_definition_loading(self, mock_get_structure_lru_cache):
+        mock_get_structure_lru_cache.return_value = StructureLRUCache(1024 * 1024)
+        self._get_structure(self.new_course)
+        # loads the definitions of the blocks of the cached structure
+        modulestore().get_course(self.new_course.id, depth=None, lazy=False)
+
+        structure = self._get_structure(self.new_course)
+        self.assertFalse(any(block.definition_loaded for block in structure['blocks'].itervalues()))
+
+
+class TestStructureLRUCache(unittest.TestCase):
+    """Tests for the StructureLRUCache"""
+
+    def test_disabled(self):
+        cache = StructureLRUCache(0)
+        self.assertFalse(cache.set('a', {}, 10))
+        self.assertIsNone(cache.get('a'))
+
+    def test_size_eviction(self):
+        cache = StructureLRUCache(20)
+        cache.set('a', {'_id': 'a'}, 10)
+        cache.set('b', {'_id': 'b'}, 10)
+        # 'a' becomes the most recently used
+        self.assertEqual(cache.get('a'), {'_id': 'a'})
+        cache.set('c', {'_id': 'c'}, 10)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'_id': 'a'})
+        self.assertEqual(cache.get('c'), {'_id': 'c'})
+        self.assertEqual(cache.size, 20)
+
+    def test_returns_copies(self):
+        cache = StructureLRUCache(1000)
+        block = {'fields': {}}
+        cache.set('a', {'_id': 'a', 'blocks': {'b': block}}, 100)
+        structure = cache.get('a')
+        structure['_id'] = 'new version'
+        structure['blocks']['c'] = {'fields': {}}
+        self.assertEqual(cache.get('a'), {'_id': 'a', 'blocks': {'b': block}})
+        # the blocks themselves are shared, not deserialized again
+        self.assertIs(cache.get('a')['blocks']['b'], block)
+
+    def test_too_large(self):
+        cache = StructureLRUCache(10)
+        self.assertFalse(cache.set('a', {}, 11))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
 
 @attr(shard=2)
 class SplitModuleItemTests(SplitModuleTest):
@@ -1,10 +1,12 @@
 """Tests for contents"""
 
 import os
+import StringIO
 import unittest
 import ddt
 from mock import Mock, patch
 from path import Path as path
+from PIL import Image
 
 from xmodule.contentstore.content import StaticContent, StaticContentStream
 from xmodule.contentstore.content import ContentStore
@@ -160,6 +162,55 @@ class ContentTest(unittest.TestCase):
             thumbnail_file_location
         )
 
+    def test_generate_image_variants(self):
+        content_store = ContentStore()
+        content_store.save = Mock()
+        image_file = StringIO.StringIO()
+        Image.new('RGB', (800, 400)).save(image_file, 'PNG')
+        location = AssetLocator(CourseLocator(u'mitX', u'800', u'ignore_run'), u'asset', u'wide.png')
+        content = Content(location, 'image/png')
+        content.data = image_file.getvalue()
+
+        image_variants = content_store.generate_image_variants(content)
+        self.assertEqual(image_variants, [
+            (320, AssetLocator(CourseLocator(u'mitX', u'800', u'ignore_run'), u'thumbnail', u'wide-png-w320.jpg')),
+            (640, AssetLocator(CourseLocator(u'mitX', u'800', u'ignore_run'), u'thumbnail', u'wide-png-w640.jpg')),
+            (800, location),
+        ])
+        variant_content = content_store.save.call_args_list[0][0][0]
+        self.assertEqual(variant_content.content_type, 'image/jpeg')
+        self.assertEqual(Image.open(variant_content.data).size, (320, 160))
+        self.assertFalse(variant_content.locked)
+
+    @patch('xmodule.contentstore.content.StaticContent.get_canonicalized_asset_path')
+    @patch('xmodule.contentstore.content.AssetManager.find')
+    def test_get_image_srcset(self, mock_find, mock_get_canonicalized_asset_path):
+        course_key = CourseLocator(u'mitX', u'800', u'ignore_run')
+        location = AssetLocator(course_key, u'asset', u'wide.png')
+        variant_location = AssetLocator(course_key, u'thumbnail', u'wide-png-w320.jpg')
+        mock_find.return_value = Mock(image_variants=[(320, variant_location), (800, location)])
+        mock_get_canonicalized_asset_path.side_effect = lambda course_key, path, base_url, excluded_exts: (
+            base_url + u'/assets/courseware/v1/digest' + path
+        )
+        self.assertEqual(
+            StaticContent.get_image_srcset(course_key, u'/static/wide.png', u'//cdn', []),
+            u'//cdn/assets/courseware/v1/digest/asset-v1:mitX+800+ignore_run+type@thumbnail+block/wide-png-w320.jpg '
+            u'320w, //cdn/assets/courseware/v1/digest/asset-v1:mitX+800+ignore_run+type@asset+block/wide.png 800w'
+        )
+
+        mock_find.return_value = Mock(image_variants=None)
+        self.assertIsNone(StaticContent.get_image_srcset(course_key, u'/static/wide.png', u'//cdn', []))
+
+    def test_no_image_variants(self):
+        content_store = ContentStore()
+        content_store.save = Mock()
+        for original_filename, content_type in ((u'test.svg', 'image/svg+xml'), (u'test.pdf', 'application/pdf')):
+            content = Content(
+                AssetLocator(CourseLocator(u'mitX', u'800', u'ignore_run'), u'asset', original_filename), content_type
+            )
+            self.assertEqual(content_store.generate_image_variants(content), [])
+        self.assertFalse(content_store.save.called)
+
     def test_compute_location(self):
         # We had a bug that __ got converted into a single _. Make sure that substitution of INVALID_CHARS (like space)
         # still happen.
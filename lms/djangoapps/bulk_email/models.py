@@ -469,6 +469,24 @@ class BulkEmailFlag(ConfigurationModel):
         else:  # implies enabled == True and require_course_email == False, so email is globally enabled
             return True
 
+    @classmethod
+    def courses_with_feature_enabled(cls, course_ids):
+        """
+        Returns the ids, among the given course ids, of the courses for which the bulk email
+        feature is available, as `feature_enabled` would, with at most one query for the
+        course authorizations.
+        """
+        if not BulkEmailFlag.is_enabled():
+            return frozenset()
+        elif BulkEmailFlag.current().require_course_email_auth:
+            return frozenset(
+                CourseAuthorization.objects.filter(
+                    course_id__in=course_ids, email_enabled=True,
+                ).values_list('course_id', flat=True)
+            )
+        else:
+            return frozenset(course_ids)
+
     class Meta(object):
         app_label = "bulk_email"
 
@@ -300,3 +300,17 @@ class CourseAuthorizationTest(TestCase):
 
         # Now, course should STILL be authorized!
         self.assertTrue(BulkEmailFlag.feature_enabled(course_id))
+
+    def test_courses_with_feature_enabled(self):
+        authorized_id = CourseKey.from_string('abc/123/doremi')
+        unauthorized_id = CourseKey.from_string('blahx/blah101/ehhhhhhh')
+        CourseAuthorization.objects.create(course_id=authorized_id, email_enabled=True)
+        CourseAuthorization.objects.create(course_id=unauthorized_id, email_enabled=False)
+        course_ids = [authorized_id, unauthorized_id]
+        self.assertEqual(BulkEmailFlag.courses_with_feature_enabled(course_ids), frozenset())
+
+        BulkEmailFlag.objects.create(enabled=True, require_course_email_auth=True)
+        self.assertEqual(BulkEmailFlag.courses_with_feature_enabled(course_ids), {authorized_id})
+
+        BulkEmailFlag.objects.create(enabled=True, require_course_email_auth=False)
+        self.assertEqual(BulkEmailFlag.courses_with_feature_enabled(course_ids), set(course_ids))
@@ -7,8 +7,10 @@ from django.conf import settings
 
 from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
 from openedx.core.djangoapps.content.block_structure.transformers import BlockStructureTransformers
+from student.roles import CourseBetaTesterRole
 
 from .transformers import library_content, start_date, user_partitions, visibility, load_override_data
+from .transformers.user_partitions import UserPartitionTransformer, _get_user_partition_groups
 from .usage_info import CourseUsageInfo
 
 INDIVIDUAL_STUDENT_OVERRIDE_PROVIDER = 'courseware.student_field_overrides.IndividualStudentOverrideProvider'
@@ -84,3 +86,95 @@ def get_course_blocks(
         starting_block_usage_key,
         collected_block_structure,
     )
+
+
+def has_library_content(collected_block_structure):
+    """
+    Returns whether the given collected block structure contains library
+    content blocks, whose children are randomized per user.
+    """
+    return any(
+        block_key.block_type == 'library_content' and collected_block_structure.get_children(block_key)
+        for block_key in collected_block_structure
+    )
+
+
+def get_course_blocks_group_key(usage_info, user_partitions, is_beta_tester, library_content):
+    """
+    Returns the key of the group of users for which the default access
+    transformers give the same result: a tuple of the beta tester role
+    and the partition groups of the user.  The user id is returned for
+    staff users and for courses with library content, which are
+    transformed individually.
+    """
+    if library_content or usage_info.has_staff_access:
+        return usage_info.user.id
+    partition_groups = _get_user_partition_groups(usage_info.course_key, user_partitions, usage_info.user)
+    return (
+        is_beta_tester,
+        tuple(sorted((partition_id, group.id) for partition_id, group in partition_groups.iteritems())),
+    )
+
+
+def get_course_blocks_for_users(users, starting_block_usage_key, collected_block_structure=None):
+    """
+    Batch version of get_course_blocks for the default access
+    transformers, meant for course-wide jobs such as reports and
+    grading.
+
+    The collected block structure is loaded once, and users are grouped
+    by the inputs of the access transformers: beta tester role and
+    partition groups.  The transformers are applied once per group and
+    each user gets a copy-on-write copy of the group's result.  Staff
+    users, and all users of courses with randomized library content,
+    are transformed individually since their result depends on more
+    than these inputs.  Masquerading is not taken into account.
+
+    Arguments:
+        users (iterable of django.contrib.auth.models.User) - Users for
+            which the block structure is to be transformed.
+
+        starting_block_usage_key (UsageKey) - Specifies the starting block
+            of the block structures that are to be transformed.
+
+        collected_block_structure (BlockStructureBlockData) - A
+            block structure retrieved from a prior call to
+            BlockStructureManager.get_collected.
+
+    Returns:
+        Generator of (user, BlockStructureBlockData) tuples, in the
+            order of users.  Only one transformed structure per group is
+            kept in memory.
+    """
+    course_key = starting_block_usage_key.course_key
+    if collected_block_structure is None:
+        collected_block_structure = get_block_structure_manager(course_key).get_collected()
+
+    user_partitions = collected_block_structure.get_transformer_data(
+        UserPartitionTransformer, 'user_partitions', [],
+    )
+    library_content = has_library_content(collected_block_structure)
+    beta_tester_ids = set(CourseBetaTesterRole(course_key).users_with_role().values_list('id', flat=True))
+
+    transformed_by_group = {}
+    for user in users:
+        usage_info = CourseUsageInfo(course_key, user)
+        group_key = get_course_blocks_group_key(
+            usage_info, user_partitions, user.id in beta_tester_ids, library_content,
+        )
+
+        transformed = transformed_by_group.get(group_key)
+        if transformed is None:
+            transformers = BlockStructureTransformers(get_course_block_access_transformers())
+            transformers.usage_info = usage_info
+            transformed = get_block_structure_manager(course_key).get_transformed(
+                transformers,
+                starting_block_usage_key,
+                collected_block_structure,
+            )
+            if isinstance(group_key, tuple):
+                transformed_by_group[group_key] = transformed
+            else:
+                yield user, transformed
+                continue
+        yield user, transformed.copy()
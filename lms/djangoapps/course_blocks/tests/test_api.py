@@ -0,0 +1,59 @@
+"""
+Tests for the course_blocks api.
+"""
+from datetime import timedelta
+
+from django.utils.timezone import now
+from mock import patch
+
+from courseware.tests.factories import BetaTesterFactory
+from openedx.core.djangoapps.content.block_structure.manager import BlockStructureManager
+from student.tests.factories import CourseEnrollmentFactory, UserFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from ..api import get_course_blocks, get_course_blocks_for_users
+
+
+class GetCourseBlocksForUsersTest(ModuleStoreTestCase):
+    """
+    Tests get_course_blocks_for_users.
+    """
+    def setUp(self):
+        super(GetCourseBlocksForUsersTest, self).setUp()
+        self.course = CourseFactory.create(start=now() - timedelta(days=30), days_early_for_beta=33)
+        self.released_chapter = ItemFactory.create(parent=self.course, category='chapter')
+        self.future_chapter = ItemFactory.create(
+            parent=self.course, category='chapter', start=now() + timedelta(days=30),
+        )
+        self.students = [UserFactory.create() for __ in range(3)]
+        for student in self.students:
+            CourseEnrollmentFactory.create(user=student, course_id=self.course.id)
+        self.beta_tester = BetaTesterFactory(course_key=self.course.id)
+        self.staff = UserFactory.create(is_staff=True)
+
+    @patch.dict('django.conf.settings.FEATURES', {'DISABLE_START_DATES': False})
+    def test_same_blocks_as_get_course_blocks(self):
+        users = self.students + [self.beta_tester, self.staff]
+        with patch.object(
+            BlockStructureManager, 'get_transformed', autospec=True, side_effect=BlockStructureManager.get_transformed,
+        ) as mock_get_transformed:
+            results = list(get_course_blocks_for_users(users, self.course.location))
+
+        # students share a single transform, the beta tester and staff get their own
+        self.assertEqual(mock_get_transformed.call_count, 3)
+        self.assertEqual([user for user, __ in results], users)
+        for user, block_structure in results:
+            self.assertEqual(
+                set(block_structure),
+                set(get_course_blocks(user, self.course.location)),
+            )
+        self.assertNotIn(self.future_chapter.location, results[0][1])
+        self.assertIn(self.future_chapter.location, results[-2][1])
+
+    def test_copies_are_independent(self):
+        results = list(get_course_blocks_for_users(self.students, self.course.location))
+        first_structure, second_structure = results[0][1], results[1][1]
+        first_structure.remove_block(self.released_chapter.location, keep_descendants=False)
+        self.assertNotIn(self.released_chapter.location, first_structure)
+        self.assertIn(self.released_chapter.location, second_structure)
@@ -181,8 +181,9 @@ def _can_view_courseware_with_prerequisites(user, course):  # pylint: disable=in
     """
     Checks if a user has access to a course based on its prerequisites.
 
-    If the user is staff or anonymous, immediately grant access.
-    Else, return whether or not the prerequisite courses have been passed.
+    If the user is staff or anonymous, or the course has no prerequisite courses,
+    immediately grant access.  Else, return whether or not the prerequisite courses
+    have been passed.
 
     Arguments:
         user (User): the user whose course access we are checking.
@@ -202,6 +203,7 @@ def _can_view_courseware_with_prerequisites(user, course):  # pylint: disable=in
         _is_prerequisites_disabled()
         or _has_staff_access_to_descriptor(user, course, course.id)
         or user.is_anonymous
+        or not course.pre_requisite_courses
         or _has_fulfilled_prerequisites(user, [course.id])
     )
 
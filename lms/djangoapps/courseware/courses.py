@@ -8,7 +8,6 @@ from datetime import datetime
 
 from completion.exceptions import UnavailableCompletionData
 from completion.utilities import get_key_to_last_completed_course_block
-from completion.models import BlockCompletion
 import branding
 import pytz
 
@@ -492,40 +491,35 @@ def sort_by_start_date(courses):
     return courses
 
 
-def sort_by_last_block_completed(user, course_enrollments):
+def sort_by_last_activity(user, course_enrollments, course_summaries, limit):
     """
-    Sort courses according each course's last completed block time.
+    Returns up to limit of the given enrollments having some activity in a
+    course the user can load, the most recently active first, according to
+    the given dict of LearnerCourseSummary by course key.
     """
-    def has_last_block_completed_and_course_access(course_enrollment):
+    def last_activity(course_enrollment):
         """
-        Check if the course has any block completed.
+        Returns when the user last completed a block of the course, or None.
         """
-        last_completed_block = BlockCompletion.get_latest_block_completed(
-            user, course_enrollment.course_id)
-        course = get_course_by_id(course_enrollment.course_id, 0)
-        if last_completed_block:
-            try:
-                check_course_access(course, user, 'load', False, False)
-                return True
-            except (CourseAccessRedirect, CoursewareAccessException):
-                return False
-        else:
-            return False
+        course_summary = course_summaries.get(course_enrollment.course_id)
+        return course_summary.last_activity if course_summary else None
 
-    def sort_order(course_enrollment):
-        """
-        Sort func to handle.
-        """
-        last_completed_block = BlockCompletion.get_latest_block_completed(
-            user, course_enrollment.course_id)
+    active_enrollments = sorted(
+        (course_enrollment for course_enrollment in course_enrollments if last_activity(course_enrollment)),
+        key=last_activity,
+        reverse=True,
+    )
+    last_activity_enrollments = []
+    for course_enrollment in active_enrollments:
+        if len(last_activity_enrollments) >= limit:
+            break
+        course = get_course_by_id(course_enrollment.course_id, 0)
         try:
-            return last_completed_block.modified
-        except TypeError:
-            log.exception("Can't get modified time of last completed block: " +
-                          str(course_enrollment.course_id))
-
-    last_activity_enrollments = filter(has_last_block_completed_and_course_access, course_enrollments)
-    return sorted(last_activity_enrollments, key=sort_order, reverse=True)
+            check_course_access(course, user, 'load', False, False)
+        except (CourseAccessRedirect, CoursewareAccessException):
+            continue
+        last_activity_enrollments.append(course_enrollment)
+    return last_activity_enrollments
 
 
 # def get_course_resume_url(user, course_enrollment):
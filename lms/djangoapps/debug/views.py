@@ -4,12 +4,13 @@ import pprint
 import traceback
 
 from django.contrib.auth.decorators import login_required
-from django.http import Http404, HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.utils.html import escape
 from django.views.decorators.csrf import ensure_csrf_cookie
 
 from codejail.safe_exec import safe_exec
 from edxmako.shortcuts import render_to_response
+from openedx.core.lib.cache_utils import get_cache_stats
 
 
 @login_required
@@ -42,3 +43,11 @@ def show_parameters(request):
     for name, value in sorted(request.POST.items()):
         html.append(escape("POST {}: {!r}".format(name, value)))
     return HttpResponse("\n".join("<p>{}</p>".format(h) for h in html))
+
+
+@login_required
+def show_cache_stats(request):
+    """A page that shows the hit, miss and eviction counts of the in-process caches of this worker."""
+    if not request.user.is_staff:
+        raise Http404
+    return JsonResponse(get_cache_stats())
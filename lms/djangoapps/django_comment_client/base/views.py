@@ -326,13 +326,7 @@ def create_thread(request, course_id, commentable_id):
 
     track_thread_created_event(request, course, thread, follow)
 
-    leader_board, created = LeaderBoard.objects.get_or_create(
-        defaults={"non_graded_completed": 1},
-        user=request.user
-    )
-    if not created:
-        leader_board.non_graded_completed = leader_board.non_graded_completed + 1
-        leader_board.save()
+    LeaderBoard.add_activity(request.user.id, non_graded_completed=1)
     log.info(
         "updated non_graded activity of leaderboard score for user: {user_id}, activity: "
         "created thread, course_id: {course_id}, commentable_id: {commentable_id}".format(
@@ -443,13 +437,7 @@ def _create_comment(request, course_key, thread_id=None, parent_id=None):
 
     track_comment_created_event(request, course, comment, comment.thread.commentable_id, followed)
 
-    leader_board, created = LeaderBoard.objects.get_or_create(
-        defaults={"non_graded_completed": 1},
-        user=request.user
-    )
-    if not created:
-        leader_board.non_graded_completed = leader_board.non_graded_completed + 1
-        leader_board.save()
+    LeaderBoard.add_activity(request.user.id, non_graded_completed=1)
     log.info(
         "updated non_graded activity of leaderboard score for user: {user_id}, activity: "
         "comment reply, course_id: {course_id}, thread_id: {thread_id}, parent_id: {parent_id}".format(
@@ -0,0 +1,325 @@
+"""
+Incrementally maintained course completion aggregate.
+
+Course progress used to be computed by transforming the whole course for
+the learner and reading every BlockCompletion row on each update. Instead,
+the completable blocks of a course are indexed per subsection when the
+course is published (CompletableBlock), and each learner's completion sum
+is maintained per subsection (PersistentSubsectionCompletion) as blocks
+are completed. Course progress is then summed from the per-subsection
+values, honouring gradebook overrides.
+
+The number of completable blocks of each subsection is counted among the
+blocks the learner can access, once per group of learners sharing the
+same access (see get_course_blocks_group_key), and cached.
+"""
+from __future__ import division
+
+import hashlib
+from datetime import datetime, timedelta
+from logging import getLogger
+from uuid import uuid4
+
+from completion import waffle as completion_waffle
+from completion.models import BlockCompletion
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from pytz import UTC
+
+from lms.djangoapps.course_blocks.api import get_course_blocks, get_course_blocks_group_key, has_library_content
+from lms.djangoapps.course_blocks.transformers.start_date import StartDateTransformer
+from lms.djangoapps.course_blocks.transformers.user_partitions import UserPartitionTransformer
+from lms.djangoapps.course_blocks.usage_info import CourseUsageInfo
+from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
+from student.roles import CourseBetaTesterRole
+
+from .models import CompletableBlock, PersistentSubsectionCompletion
+from .transformer import GradesTransformer
+
+log = getLogger(__name__)
+
+NON_COMPLETABLE_BLOCK_TYPES = {'chapter', 'sequential', 'vertical', 'course', 'discussion'}
+COURSE_INDEX_CACHE_KEY = u'grades.completion_aggregate.index.{course_id}'
+SUBSECTION_TOTALS_CACHE_KEY = u'grades.completion_aggregate.totals.{course_id}.{version}.{group_hash}'
+SUBSECTION_TOTALS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def rebuild_completable_blocks(course_key, collected_block_structure=None):
+    """
+    Rebuilds the CompletableBlock index of the given course from its
+    collected block structure.
+
+    Learners' subsection completions are discarded only when the index
+    actually changed; they are lazily rebuilt on the next progress update.
+    """
+    if collected_block_structure is None:
+        collected_block_structure = get_block_structure_manager(course_key).get_collected()
+
+    rows = set()
+    for block_key in collected_block_structure:
+        if block_key.block_type in NON_COMPLETABLE_BLOCK_TYPES:
+            continue
+        auto_completed = _has_no_possible_score(collected_block_structure, block_key)
+        subsection_keys = collected_block_structure.get_transformer_block_field(
+            block_key, GradesTransformer, 'subsections', set(),
+        )
+        for subsection_key in subsection_keys:
+            rows.add((subsection_key, block_key, auto_completed))
+
+    # the access rules of the blocks may have changed even when the index did not
+    cache.delete(_course_index_cache_key(course_key))
+    existing_rows = set(
+        CompletableBlock.objects.filter(course_id=course_key).values_list(
+            'subsection_key', 'usage_key', 'auto_completed',
+        )
+    )
+    if rows == existing_rows:
+        return False
+
+    with transaction.atomic():
+        CompletableBlock.objects.filter(course_id=course_key).delete()
+        CompletableBlock.objects.bulk_create(
+            CompletableBlock(
+                course_id=course_key,
+                subsection_key=subsection_key,
+                usage_key=usage_key,
+                auto_completed=auto_completed,
+            )
+            for subsection_key, usage_key, auto_completed in rows
+        )
+        PersistentSubsectionCompletion.objects.filter(course_id=course_key).delete()
+    log.info(u'Grades: rebuilt completable blocks for %s: %d blocks', course_key, len(rows))
+    return True
+
+
+def update_subsection_completion(user_id, course_key, block_key, delta):
+    """
+    Adds the change of completion of the given block to the learner's
+    completion sums of the subsections containing it.
+
+    The sums of a learner who has none yet are not created here, on the
+    request path: the deferred course progress recalculation backfills
+    them from all of the learner's completions.
+    """
+    if not delta:
+        return
+    subsection_keys = CompletableBlock.objects.filter(
+        course_id=course_key, usage_key=block_key, auto_completed=False,
+    ).values('subsection_key')
+    PersistentSubsectionCompletion.objects.filter(
+        user_id=user_id, course_id=course_key, usage_key__in=subsection_keys,
+    ).update(completed=F('completed') + delta)
+
+
+def get_course_completion_percentage(user, course_key, overridden_subsection_keys=None):
+    """
+    Returns the learner's course completion percentage, between 0 and 100,
+    from the per-subsection aggregates. Only the blocks the learner can
+    access are counted. Blocks of overridden subsections count as
+    completed.
+    """
+    subsection_totals = _get_subsection_totals(user, course_key)
+    if not subsection_totals:
+        return 0
+
+    completions = {
+        unicode(row.usage_key): row.completed
+        for row in PersistentSubsectionCompletion.objects.filter(user_id=user.id, course_id=course_key)
+    }
+    if not completions:
+        completions = _backfill_subsection_completions(user.id, course_key)
+
+    overridden = {unicode(key) for key in overridden_subsection_keys or []}
+    count_auto_completed = completion_waffle.waffle().is_enabled(completion_waffle.ENABLE_COMPLETION_TRACKING)
+
+    completed_total = 0
+    possible_total = 0
+    for subsection_key, (possible, auto_completed) in subsection_totals.iteritems():
+        possible_total += possible
+        if subsection_key in overridden:
+            completed_total += possible
+        else:
+            completed = completions.get(subsection_key, 0)
+            if count_auto_completed:
+                completed += auto_completed
+            completed_total += min(completed, possible)
+
+    return min(100 * (completed_total / possible_total), 100)
+
+
+def _backfill_subsection_completions(user_id, course_key):
+    """
+    Creates the learner's subsection completion sums from all of their
+    completions in the course, including the empty ones so that later
+    completions only have to be added. Returns them keyed by subsection.
+    """
+    subsections_by_block = {}
+    completions = {}
+    for subsection_key, usage_key in CompletableBlock.objects.filter(
+            course_id=course_key, auto_completed=False,
+    ).values_list('subsection_key', 'usage_key'):
+        subsections_by_block.setdefault(usage_key, []).append(subsection_key)
+        completions[subsection_key] = 0
+
+    for block_key, completion in BlockCompletion.objects.filter(
+            user_id=user_id, course_key=course_key,
+    ).values_list('block_key', 'completion'):
+        for subsection_key in subsections_by_block.get(block_key.replace(course_key=course_key), []):
+            completions[subsection_key] = completions.get(subsection_key, 0) + completion
+
+    try:
+        with transaction.atomic():
+            PersistentSubsectionCompletion.objects.bulk_create(
+                PersistentSubsectionCompletion(
+                    user_id=user_id,
+                    course_id=course_key,
+                    usage_key=subsection_key,
+                    completed=completed,
+                )
+                for subsection_key, completed in completions.iteritems()
+            )
+    except IntegrityError:
+        # backfilled concurrently, e.g. by a progress read racing the deferred recalculation
+        for subsection_key, completed in completions.iteritems():
+            PersistentSubsectionCompletion.objects.update_or_create(
+                user_id=user_id,
+                course_id=course_key,
+                usage_key=subsection_key,
+                defaults={'completed': completed},
+            )
+    return {unicode(subsection_key): completed for subsection_key, completed in completions.iteritems()}
+
+
+def _get_course_index(course_key):
+    """
+    Returns the cached access data of the course needed to group its
+    learners, and whether it has completable blocks. Builds the index of
+    completable blocks on first use.
+
+    Its version changes each time it is rebuilt, which invalidates the
+    subsection totals of all the groups.
+    """
+    cache_key = _course_index_cache_key(course_key)
+    course_index = cache.get(cache_key)
+    if course_index is not None:
+        return course_index
+
+    collected_block_structure = get_block_structure_manager(course_key).get_collected()
+    if not CompletableBlock.objects.filter(course_id=course_key).exists():
+        rebuild_completable_blocks(course_key, collected_block_structure)
+
+    course_index = {
+        'version': uuid4().hex,
+        # also cached when false, so that a course without completable blocks is not indexed on every read
+        'has_completable_blocks': CompletableBlock.objects.filter(course_id=course_key).exists(),
+        'user_partitions': collected_block_structure.get_transformer_data(
+            UserPartitionTransformer, 'user_partitions', [],
+        ),
+        'has_library_content': has_library_content(collected_block_structure),
+    }
+    cache.set(cache_key, course_index, SUBSECTION_TOTALS_CACHE_TIMEOUT)
+    return course_index
+
+
+def _get_subsection_totals(user, course_key):
+    """
+    Returns a dict mapping each subsection of the course the learner can
+    access to its number of accessible completable blocks and auto
+    completed blocks.
+
+    The totals are computed from the learner's block structure once per
+    group of learners with the same access, and cached until the next
+    start date of a block hidden from the group.
+    """
+    course_index = _get_course_index(course_key)
+    if not course_index['has_completable_blocks']:
+        return {}
+
+    usage_info = CourseUsageInfo(course_key, user)
+    group_key = get_course_blocks_group_key(
+        usage_info,
+        course_index['user_partitions'],
+        CourseBetaTesterRole(course_key).has_user(user),
+        course_index['has_library_content'],
+    )
+    cache_key = _subsection_totals_cache_key(course_key, course_index['version'], group_key)
+    subsection_totals = cache.get(cache_key)
+    if subsection_totals is not None:
+        return subsection_totals
+
+    collected_block_structure = get_block_structure_manager(course_key).get_collected()
+    block_structure = get_course_blocks(
+        user,
+        collected_block_structure.root_block_usage_key,
+        collected_block_structure=collected_block_structure,
+    )
+
+    subsection_totals = {}
+    hidden_block_keys = set()
+    for subsection_key, usage_key, auto_completed in CompletableBlock.objects.filter(
+            course_id=course_key,
+    ).values_list('subsection_key', 'usage_key', 'auto_completed'):
+        usage_key = usage_key.map_into_course(course_key)
+        if usage_key not in block_structure or subsection_key.map_into_course(course_key) not in block_structure:
+            hidden_block_keys.add(usage_key)
+            continue
+        possible, auto_total = subsection_totals.get(unicode(subsection_key), (0, 0))
+        subsection_totals[unicode(subsection_key)] = (possible + 1, auto_total + int(auto_completed))
+
+    cache.set(
+        cache_key,
+        subsection_totals,
+        _get_subsection_totals_timeout(collected_block_structure, hidden_block_keys),
+    )
+    return subsection_totals
+
+
+def _get_subsection_totals_timeout(collected_block_structure, hidden_block_keys):
+    """
+    Returns the number of seconds until one of the hidden blocks may
+    start, the beta testers' early access included, capped by
+    SUBSECTION_TOTALS_CACHE_TIMEOUT.
+    """
+    now = datetime.now(UTC)
+    timeout = SUBSECTION_TOTALS_CACHE_TIMEOUT
+    for block_key in hidden_block_keys:
+        if block_key not in collected_block_structure:
+            continue
+        start = collected_block_structure.get_transformer_block_field(
+            block_key, StartDateTransformer, StartDateTransformer.MERGED_START_DATE,
+        )
+        if not start:
+            continue
+        days_early_for_beta = collected_block_structure.get_xblock_field(block_key, 'days_early_for_beta')
+        if days_early_for_beta is not None:
+            start -= timedelta(days=days_early_for_beta)
+        if start > now:
+            timeout = min(timeout, int((start - now).total_seconds()) + 1)
+    return timeout
+
+
+def _has_no_possible_score(block_structure, block_key):
+    """
+    Returns whether the given problem cannot be scored, in which case it
+    is completed as soon as progress is computed.
+    """
+    if block_key.block_type != 'problem':
+        return False
+    if not block_structure.get_xblock_field(block_key, 'has_score', False):
+        return True
+    max_score = block_structure.get_transformer_block_field(block_key, GradesTransformer, 'max_score')
+    weight = block_structure.get_xblock_field(block_key, 'weight')
+    return not max_score or weight == 0
+
+
+def _course_index_cache_key(course_key):
+    return COURSE_INDEX_CACHE_KEY.format(course_id=course_key)
+
+
+def _subsection_totals_cache_key(course_key, version, group_key):
+    return SUBSECTION_TOTALS_CACHE_KEY.format(
+        course_id=course_key,
+        version=version,
+        group_hash=hashlib.md5(repr(group_key)).hexdigest(),
+    )
@@ -19,7 +19,9 @@ from student.models import CourseEnrollment
 from xmodule.modulestore.django import modulestore
 from util.course import get_badge_url
 
+from .completion_aggregate import get_course_completion_percentage as get_aggregated_completion_percentage
 from .config import assume_zero_if_absent, should_persist_grades
+from .config.waffle import INCREMENTAL_COURSE_PROGRESS, waffle
 from .course_data import CourseData
 from .course_grade import CourseGrade, ZeroCourseGrade
 from .models import PersistentCourseGrade, PersistentCourseProgress, PersistentSubsectionGradeOverride, prefetch
@@ -236,6 +238,7 @@ class CourseGradeFactory(object):
     def update_course_completion_percentage(self, course_key, user, course_grade=None,
                                             enrollment=None, force_update_grade=False):
         from triboo_analytics.models import LeaderBoard
+        from .course_summary import update_learner_course_progress
         course_usage_key = modulestore().make_course_usage_key(course_key)
         overrides = PersistentSubsectionGradeOverride.objects.filter(
             grade__user_id=user.id,
@@ -243,9 +246,14 @@ class CourseGradeFactory(object):
         ).select_related('grade')
         overridden_subsection_keys = [i.grade.usage_key for i in overrides]
         overridden_subsection_keys = list(set(overridden_subsection_keys))
-        percent_progress = get_subsection_completion_percentage_with_gradebook_edit(
-            course_usage_key, user, overrides=overridden_subsection_keys
-        )
+        if waffle().is_enabled(INCREMENTAL_COURSE_PROGRESS):
+            percent_progress = get_aggregated_completion_percentage(
+                user, course_key, overridden_subsection_keys=overridden_subsection_keys
+            )
+        else:
+            percent_progress = get_subsection_completion_percentage_with_gradebook_edit(
+                course_usage_key, user, overrides=overridden_subsection_keys
+            )
         log.info(u'Course Progress Calculate: %s, User: %s, Progress: %s',
                  unicode(course_key), user.id, percent_progress)
         if not enrollment:
@@ -277,9 +285,7 @@ class CourseGradeFactory(object):
                     enrollment.save()
                     log.info(
                         "Create completion date for user id %d / %s: %s" % (user.id, course_key, completion_date))
-                    leader_board, _ = LeaderBoard.objects.get_or_create(user=user)
-                    leader_board.course_completed = leader_board.course_completed + 1
-                    leader_board.save()
+                    LeaderBoard.add_activity(user.id, course_completed=1)
                     log.info(
                         "updated course completed of leaderboard score "
                         "for user: {user_id}, course_id: {course_id}".format(
@@ -292,17 +298,14 @@ class CourseGradeFactory(object):
                     enrollment.completed = None
                     enrollment.save()
                     log.info("Delete completion date for user id %d / %s" % (user.id, course_key))
-                    leader_board, _ = LeaderBoard.objects.get_or_create(user=user)
-                    if leader_board.course_completed > 0:
-                        leader_board.course_completed = leader_board.course_completed - 1
-                        leader_board.save()
-                        log.info(
-                            "updated course completed (-1) of leaderboard score "
-                            "for user: {user_id}, course_id: {course_id}".format(
-                                user_id=user.id,
-                                course_id=course_key
-                            )
+                    LeaderBoard.add_activity(user.id, course_completed=-1)
+                    log.info(
+                        "updated course completed (-1) of leaderboard score "
+                        "for user: {user_id}, course_id: {course_id}".format(
+                            user_id=user.id,
+                            course_id=course_key
                         )
+                    )
                     cert = GeneratedCertificate.objects.filter(
                         user=user, course_id=course_key, status='downloadable'
                     )
@@ -315,6 +318,7 @@ class CourseGradeFactory(object):
                 course_id=course_key,
                 percent_progress=round(percent_progress / 100, 2)
             )
+        update_learner_course_progress(user.id, course_key, round(percent_progress / 100, 2))
         self.check_badge_success(user, course_key, enrollment)
         return round(percent_progress / 100, 2)
 
@@ -412,10 +416,12 @@ class CourseGradeFactory(object):
                             success.delete()
 
 
-    def get_progress(self, user, course, progress=None, grade_summary=None, enrollment=None, clear_request_cache=False):
+    def get_progress(self, user, course, progress=None, grade_summary=None, enrollment=None, clear_request_cache=False,
+                     course_structure=None):
         course_key = course.id
         if not grade_summary:
-            grade_summary = self.read(user, course, clear_request_cache=clear_request_cache)
+            grade_summary = self.read(user, course, course_structure=course_structure,
+                                      clear_request_cache=clear_request_cache)
         if not grade_summary:
             return
 
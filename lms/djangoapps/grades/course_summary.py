@@ -0,0 +1,120 @@
+"""
+Denormalized learner course summaries for the course cards.
+
+The dashboard and My Courses pages used to load the course and read the
+learner's course grade and progress for each enrollment while rendering.
+The LearnerCourseSummary of each enrollment is created the first time it
+is needed and then kept up to date: its learner fields when the course
+progress or grade is updated, its course fields when the course is
+published.  The pages load the summaries of all enrollments in one query.
+"""
+from logging import getLogger
+
+from completion.models import BlockCompletion
+from django.db import IntegrityError, transaction
+from xmodule.modulestore.django import modulestore
+
+from .course_grade_factory import CourseGradeFactory
+from .models import LearnerCourseSummary
+
+log = getLogger(__name__)
+
+
+def get_learner_course_summaries(user, course_keys):
+    """
+    Returns a dict of the LearnerCourseSummary of the given user for each
+    given course, creating the missing ones.  Courses that can't be loaded
+    have no summary.
+    """
+    summaries = {
+        summary.course_id: summary
+        for summary in LearnerCourseSummary.objects.filter(user_id=user.id, course_id__in=course_keys)
+    }
+    for course_key in course_keys:
+        if course_key not in summaries:
+            summary = _create_learner_course_summary(user, course_key)
+            if summary is not None:
+                summaries[course_key] = summary
+    return summaries
+
+
+def update_learner_course_progress(user_id, course_key, percent_progress):
+    """
+    Updates the progress and last activity of the learner's course summary,
+    if it exists.
+    """
+    LearnerCourseSummary.objects.filter(user_id=user_id, course_id=course_key).update(
+        percent_progress=percent_progress,
+        last_activity=_get_last_activity(user_id, course_key),
+    )
+
+
+def update_learner_course_trophies(user, course, course_grade):
+    """
+    Updates the trophies earned of the learner's course summary from the
+    given course grade, if it exists.
+    """
+    nb_trophies_earned = CourseGradeFactory().get_nb_trophies_earned(user, course, grade_summary=course_grade)
+    LearnerCourseSummary.objects.filter(user_id=user.id, course_id=course.id).update(
+        nb_trophies_earned=nb_trophies_earned or 0,
+    )
+
+
+def update_course_summaries(course_key):
+    """
+    Updates the course fields of the summaries of all learners of the course.
+    """
+    course = modulestore().get_course(course_key)
+    if course is None:
+        return
+    updated = LearnerCourseSummary.objects.filter(course_id=course_key).update(**_get_course_fields(course))
+    log.info(u'Learner course summaries: updated %d summaries of %s', updated, course_key)
+
+
+def _create_learner_course_summary(user, course_key):
+    """
+    Computes and saves the LearnerCourseSummary of the given user in the
+    given course, or returns None if the course can't be loaded.
+    """
+    course = modulestore().get_course(course_key)
+    if course is None:
+        return None
+
+    course_grade_factory = CourseGradeFactory()
+    summary = LearnerCourseSummary(
+        user_id=user.id,
+        course_id=course_key,
+        percent_progress=course_grade_factory.get_course_completion_percentage(user, course_key),
+        nb_trophies_earned=course_grade_factory.get_nb_trophies_earned(user, course) or 0,
+        last_activity=_get_last_activity(user.id, course_key),
+        **_get_course_fields(course)
+    )
+    try:
+        with transaction.atomic():
+            summary.save()
+    except IntegrityError:
+        # created concurrently, e.g. by another page load
+        log.info(u'Learner course summaries: summary of user %s in %s already created', user.id, course_key)
+    return summary
+
+
+def _get_course_fields(course):
+    """
+    Returns the values of the course fields of a summary of the given CourseDescriptor.
+    """
+    return {
+        'nb_trophies_possible': CourseGradeFactory().get_nb_trophies_possible(course),
+        'course_order': course.course_order,
+        'course_mandatory_enabled': course.course_mandatory_enabled,
+        'course_category': course.course_category,
+        'language': course.language,
+    }
+
+
+def _get_last_activity(user_id, course_key):
+    """
+    Returns when the learner last completed a block of the course, or None.
+    """
+    return BlockCompletion.objects.filter(
+        user_id=user_id, course_key=course_key,
+    ).order_by('-modified').values_list('modified', flat=True).first()
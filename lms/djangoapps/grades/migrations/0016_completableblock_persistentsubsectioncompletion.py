@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.15 on 2026-10-18 09:12
+from __future__ import unicode_literals
+
+import coursewarehistoryextended.fields
+from django.db import migrations, models
+import django.utils.timezone
+import model_utils.fields
+import opaque_keys.edx.django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grades', '0015_persistentsubsectiongradeoverridehistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompletableBlock',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('course_id', opaque_keys.edx.django.models.CourseKeyField(max_length=255)),
+                ('subsection_key', opaque_keys.edx.django.models.UsageKeyField(max_length=255)),
+                ('usage_key', opaque_keys.edx.django.models.UsageKeyField(max_length=255)),
+                ('auto_completed', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PersistentSubsectionCompletion',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('id', coursewarehistoryextended.fields.UnsignedBigIntAutoField(primary_key=True, serialize=False)),
+                ('user_id', models.IntegerField()),
+                ('course_id', opaque_keys.edx.django.models.CourseKeyField(max_length=255)),
+                ('usage_key', opaque_keys.edx.django.models.UsageKeyField(max_length=255)),
+                ('completed', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='completableblock',
+            unique_together=set([('course_id', 'subsection_key', 'usage_key')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='completableblock',
+            index_together=set([('course_id', 'usage_key')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='persistentsubsectioncompletion',
+            unique_together=set([('course_id', 'user_id', 'usage_key')]),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.15 on 2026-10-18 14:37
+from __future__ import unicode_literals
+
+import coursewarehistoryextended.fields
+from django.db import migrations, models
+import django.utils.timezone
+import model_utils.fields
+import opaque_keys.edx.django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grades', '0016_completableblock_persistentsubsectioncompletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearnerCourseSummary',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('id', coursewarehistoryextended.fields.UnsignedBigIntAutoField(primary_key=True, serialize=False)),
+                ('user_id', models.IntegerField()),
+                ('course_id', opaque_keys.edx.django.models.CourseKeyField(db_index=True, max_length=255)),
+                ('percent_progress', models.FloatField(default=0)),
+                ('nb_trophies_earned', models.IntegerField(default=0)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+                ('nb_trophies_possible', models.IntegerField(default=0)),
+                ('course_order', models.IntegerField(blank=True, null=True)),
+                ('course_mandatory_enabled', models.BooleanField(default=False)),
+                ('course_category', models.CharField(blank=True, max_length=255, null=True)),
+                ('language', models.CharField(blank=True, max_length=255, null=True)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='learnercoursesummary',
+            unique_together=set([('user_id', 'course_id')]),
+        ),
+    ]
@@ -588,6 +588,100 @@ class PersistentCourseProgress(TimeStampedModel):
         return u"progresses_cache.{}".format(course_id)
 
 
+class CompletableBlock(models.Model):
+    """
+    Index of the completable blocks of a course, keyed by the subsection
+    that contains them. It is rebuilt when the course is published and
+    lets course progress be maintained per subsection instead of walking
+    the whole course.
+    """
+
+    class Meta(object):
+        app_label = "grades"
+        unique_together = [
+            ('course_id', 'subsection_key', 'usage_key'),
+        ]
+        # (course_id, usage_key): find the subsections containing a completed block
+        index_together = [
+            ('course_id', 'usage_key'),
+        ]
+
+    course_id = CourseKeyField(blank=False, max_length=255)
+    subsection_key = UsageKeyField(blank=False, max_length=255)
+    usage_key = UsageKeyField(blank=False, max_length=255)
+
+    # problems without any possible score are considered completed for every learner
+    auto_completed = models.BooleanField(default=False)
+
+    def __unicode__(self):
+        return u"{}: {} in {}".format(type(self).__name__, self.usage_key, self.subsection_key)
+
+
+class PersistentSubsectionCompletion(TimeStampedModel):
+    """
+    A django model tracking the sum of a learner's block completions
+    per subsection, excluding auto completed blocks.
+    """
+
+    class Meta(object):
+        app_label = "grades"
+        unique_together = [
+            ('course_id', 'user_id', 'usage_key'),
+        ]
+
+    # primary key will need to be large for this table
+    id = UnsignedBigIntAutoField(primary_key=True)  # pylint: disable=invalid-name
+    user_id = models.IntegerField(blank=False)
+    course_id = CourseKeyField(blank=False, max_length=255)
+    usage_key = UsageKeyField(blank=False, max_length=255)
+
+    completed = models.FloatField(default=0, blank=False)
+
+    def __unicode__(self):
+        return u"{}: user {}, {}, completed: {}".format(
+            type(self).__name__, self.user_id, self.usage_key, self.completed,
+        )
+
+
+class LearnerCourseSummary(TimeStampedModel):
+    """
+    A denormalized summary of a learner's course, as shown on the course
+    cards of the dashboard and My Courses pages, so those pages don't load
+    the course or its grades per enrollment.
+
+    The learner fields are updated along with the course progress and
+    grade, the course fields when the course is published.
+    """
+
+    class Meta(object):
+        app_label = "grades"
+        unique_together = [
+            ('user_id', 'course_id'),
+        ]
+
+    # primary key will need to be large for this table
+    id = UnsignedBigIntAutoField(primary_key=True)  # pylint: disable=invalid-name
+    user_id = models.IntegerField(blank=False)
+    course_id = CourseKeyField(blank=False, max_length=255, db_index=True)
+
+    # learner fields
+    percent_progress = models.FloatField(default=0, blank=False)
+    nb_trophies_earned = models.IntegerField(default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    # course fields
+    nb_trophies_possible = models.IntegerField(default=0)
+    course_order = models.IntegerField(null=True, blank=True)
+    course_mandatory_enabled = models.BooleanField(default=False)
+    course_category = models.CharField(max_length=255, null=True, blank=True)
+    language = models.CharField(max_length=255, null=True, blank=True)
+
+    def __unicode__(self):
+        return u"{}: user {}, {}, progress: {}".format(
+            type(self).__name__, self.user_id, self.course_id, self.percent_progress,
+        )
+
+
 class PersistentCourseGrade(TimeStampedModel):
     """
     A django model tracking persistent course grades.
@@ -7,18 +7,21 @@ from logging import getLogger
 import six
 from completion.models import BlockCompletion
 from courseware.model_data import get_score, set_score
-from django.contrib.auth.models import User
+from django.conf import settings
 from django.db import models
 from django.dispatch import receiver
 from submissions.models import score_reset, score_set
 from xblock.scorable import ScorableXBlockMixin, Score
 from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.locator import LibraryLocator
 from openedx.core.djangoapps.course_groups.signals.signals import COHORT_MEMBERSHIP_UPDATED
+from openedx.core.djangoapps.signals.signals import COURSE_GRADE_CHANGED
 from openedx.core.lib.grade_utils import is_score_higher_or_equal
 from student.models import CourseEnrollment, user_by_anonymous_id
 from student.signals import ENROLLMENT_TRACK_UPDATED
 from track.event_transaction_utils import get_event_transaction_id, get_event_transaction_type
 from util.date_utils import to_timestamp
+from xmodule.modulestore.django import SignalHandler
 from .signals import (
     PROBLEM_RAW_SCORE_CHANGED,
     PROBLEM_WEIGHTED_SCORE_CHANGED,
@@ -28,14 +31,19 @@ from .signals import (
     GRADE_EDITED
 )
 from .. import events
+from ..completion_aggregate import update_subsection_completion
+from ..config.waffle import INCREMENTAL_COURSE_PROGRESS, waffle
 from ..constants import ScoreDatabaseTableEnum
 from ..course_grade_factory import CourseGradeFactory
+from ..course_summary import update_learner_course_trophies
 from ..scores import weighted_score
 from ..tasks import (
     RECALCULATE_GRADE_DELAY_SECONDS,
     recalculate_subsection_grade_v3,
     recalculate_course_and_subsection_grades_for_user,
-    calculate_course_progress
+    enqueue_course_progress_update,
+    update_completable_blocks,
+    update_learner_course_summaries
 )
 
 log = getLogger(__name__)
@@ -280,17 +288,86 @@ def recalculate_course_and_subsection_grades(sender, user, course_key, countdown
 @receiver(models.signals.post_save, sender=BlockCompletion)
 def recalculate_course_completion_percentage(**kwargs):
     """
-    Receives the BlockCompletion signal and triggers the
-    evaluation of course progress.
+    Receives the BlockCompletion signal and schedules a deferred,
+    coalesced evaluation of course progress off the request path.
     """
     instance = kwargs['instance']
-    course_key = instance.course_key
-    user = User.objects.get(id=instance.user_id)
-    calculate_course_progress.apply(
-        kwargs={
-            'course_id': unicode(course_key),
-            'user_id': user.id
-        }
+    enqueue_course_progress_update(instance.user_id, instance.course_key)
+
+
+@receiver(models.signals.post_init, sender=BlockCompletion)
+def remember_initial_completion(**kwargs):
+    """
+    Keeps the completion a BlockCompletion was loaded with, so that
+    update_subsection_completion_aggregate can apply the change without
+    reading the completions of the subsection again.
+    """
+    instance = kwargs['instance']
+    # read from __dict__ so that a deferred completion field is not loaded
+    instance._initial_completion = instance.__dict__.get('completion', 0)  # pylint: disable=protected-access
+
+
+@receiver(models.signals.post_save, sender=BlockCompletion)
+def update_subsection_completion_aggregate(**kwargs):
+    """
+    Receives the BlockCompletion signal and adds the change of completion
+    to the learner's completion sums for the subsections containing the
+    completed block.
+
+    Kept separate from recalculate_course_completion_percentage, which is
+    temporarily disconnected by batch completion code paths.
+    """
+    instance = kwargs['instance']
+    initial_completion = 0 if kwargs['created'] else getattr(instance, '_initial_completion', 0)
+    instance._initial_completion = instance.completion  # pylint: disable=protected-access
+    if not waffle().is_enabled(INCREMENTAL_COURSE_PROGRESS):
+        return
+    update_subsection_completion(
+        instance.user_id,
+        instance.course_key,
+        instance.block_key.map_into_course(instance.course_key),
+        instance.completion - initial_completion,
+    )
+
+
+@receiver(SignalHandler.course_published)
+def update_completable_blocks_on_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Catches the signal that a course has been published in the module
+    store and rebuilds the course's completable blocks index.
+    Ignores publish signals from content libraries.
+    """
+    if isinstance(course_key, LibraryLocator) or not waffle().is_enabled(INCREMENTAL_COURSE_PROGRESS):
+        return
+
+    update_completable_blocks.apply_async(
+        kwargs=dict(course_id=unicode(course_key)),
+        countdown=settings.BLOCK_STRUCTURES_SETTINGS['COURSE_PUBLISH_TASK_DELAY'],
+    )
+
+
+@receiver(COURSE_GRADE_CHANGED)
+def update_learner_course_summary_trophies(sender, user, course_grade, **kwargs):  # pylint: disable=unused-argument
+    """
+    Updates the trophies earned of the learner's course summary along with
+    the course grade.
+    """
+    update_learner_course_trophies(user, course_grade.course_data.course, course_grade)
+
+
+@receiver(SignalHandler.course_published)
+def update_learner_course_summaries_on_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Catches the signal that a course has been published in the module
+    store and updates the course fields of its learner course summaries.
+    Ignores publish signals from content libraries.
+    """
+    if isinstance(course_key, LibraryLocator):
+        return
+
+    update_learner_course_summaries.apply_async(
+        kwargs=dict(course_id=unicode(course_key)),
+        countdown=settings.BLOCK_STRUCTURES_SETTINGS['COURSE_PUBLISH_TASK_DELAY'],
     )
 
 
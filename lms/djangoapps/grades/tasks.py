@@ -3,13 +3,16 @@ This module contains tasks for asynchronous execution of grade updates.
 """
 
 from logging import getLogger
+from time import time
 
+import dogstats_wrapper as dog_stats_api
 import six
 from celery import task
 from celery_utils.persist_on_failure import LoggedPersistOnFailureTask
 from courseware.model_data import get_score
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db.utils import DatabaseError
 
@@ -17,6 +20,7 @@ from lms.djangoapps.course_blocks.api import get_course_blocks
 from lms.djangoapps.grades.config.models import ComputeGradesSetting
 from opaque_keys.edx.keys import CourseKey, UsageKey
 from opaque_keys.edx.locator import CourseLocator
+from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
 from openedx.core.djangoapps.monitoring_utils import set_custom_metric, set_custom_metrics_for_course_key
 from openedx.core.djangoapps.site_configuration import helpers as configuration_helpers
 from student.models import CourseEnrollment
@@ -26,9 +30,11 @@ from django.core.mail import send_mail
 from util.date_utils import from_timestamp
 from xmodule.modulestore.django import modulestore
 
+from .completion_aggregate import rebuild_completable_blocks
 from .config.waffle import DISABLE_REGRADE_ON_POLICY_CHANGE, waffle
 from .constants import ScoreDatabaseTableEnum
 from .course_grade_factory import CourseGradeFactory
+from .course_summary import update_course_summaries
 from .exceptions import DatabaseNotReadyError
 from .services import GradesService
 from .signals.signals import SUBSECTION_SCORE_CHANGED
@@ -47,6 +53,14 @@ RECALCULATE_GRADE_DELAY_SECONDS = 2  # to prevent excessive _has_db_updated fail
 RETRY_DELAY_SECONDS = 40
 SUBSECTION_GRADE_TIMEOUT_SECONDS = 300
 
+# Completion events for the same learner and course arriving within this window
+# are coalesced into a single, deferred course progress recalculation.
+COURSE_PROGRESS_COALESCE_SECONDS = 10
+COURSE_PROGRESS_PENDING_KEY = u'grades.course_progress.pending.{user_id}.{course_id}'
+# The pending marker expires on its own so that a lost task cannot block
+# further recalculations for the learner.
+COURSE_PROGRESS_PENDING_TIMEOUT = COURSE_PROGRESS_COALESCE_SECONDS + SUBSECTION_GRADE_TIMEOUT_SECONDS
+
 
 @task(base=LoggedPersistOnFailureTask, routing_key=settings.POLICY_CHANGE_GRADES_ROUTING_KEY)
 def compute_all_grades_for_course(**kwargs):
@@ -250,15 +264,82 @@ def send_grade_override_email(self, **kwargs):
 def calculate_course_progress(self, **kwargs):
     """
     celery task to update course progress for a single learner
-    this task will be called after a BlockCompletion.post_save
+    this task is scheduled by enqueue_course_progress_update after a BlockCompletion.post_save
     """
     course_id = kwargs.get('course_id')
     user_id = kwargs.get('user_id')
+    enqueued_at = kwargs.get('enqueued_at')
+
+    # Release the pending marker before recalculating, so completions saved while
+    # this task runs schedule a new recalculation instead of being lost.
+    cache.delete(_course_progress_pending_key(user_id, course_id))
+    if enqueued_at is not None:
+        queue_lag = time() - enqueued_at
+        dog_stats_api.histogram('grades.course_progress.queue_lag', queue_lag)
+        set_custom_metric('course_progress_queue_lag', queue_lag)
+
     course_key = CourseKey.from_string(course_id)
     user = User.objects.get(id=user_id)
     CourseGradeFactory().update_course_completion_percentage(course_key, user)
 
 
+@task(base=LoggedPersistOnFailureTask, routing_key=settings.RECALCULATE_PROGRESS_ROUTING_KEY)
+def update_completable_blocks(course_id):
+    """
+    Rebuilds the completable blocks index used to maintain course progress
+    incrementally, once the course block structure is up to date.
+    """
+    course_key = CourseKey.from_string(course_id)
+    manager = get_block_structure_manager(course_key)
+    manager.update_collected_if_needed()
+    rebuild_completable_blocks(course_key, manager.get_collected())
+
+
+@task(base=LoggedPersistOnFailureTask, routing_key=settings.RECALCULATE_PROGRESS_ROUTING_KEY)
+def update_learner_course_summaries(course_id):
+    """
+    Updates the course fields of the learner course summaries of a
+    course once it is published.
+    """
+    update_course_summaries(CourseKey.from_string(course_id))
+
+
+def enqueue_course_progress_update(user_id, course_key):
+    """
+    Schedules a deferred course progress recalculation for the given learner.
+
+    Only one recalculation is pending per (user, course) at a time: events
+    arriving while one is already scheduled are counted as coalesced and
+    dropped, since the pending task will read their completions anyway.
+
+    Returns whether a new task was scheduled.
+    """
+    course_id = six.text_type(course_key)
+    pending_key = _course_progress_pending_key(user_id, course_id)
+    # cache.add is atomic and only succeeds when no recalculation is pending.
+    if not cache.add(pending_key, True, COURSE_PROGRESS_PENDING_TIMEOUT):
+        dog_stats_api.increment('grades.course_progress.coalesced')
+        return False
+
+    dog_stats_api.increment('grades.course_progress.enqueued')
+    calculate_course_progress.apply_async(
+        kwargs={
+            'course_id': course_id,
+            'user_id': user_id,
+            'enqueued_at': time(),
+        },
+        countdown=COURSE_PROGRESS_COALESCE_SECONDS,
+    )
+    return True
+
+
+def _course_progress_pending_key(user_id, course_id):
+    """
+    Returns the cache key marking a pending course progress recalculation.
+    """
+    return COURSE_PROGRESS_PENDING_KEY.format(user_id=user_id, course_id=course_id)
+
+
 def _recalculate_subsection_grade(self, **kwargs):
     """
     Updates a saved subsection grade.
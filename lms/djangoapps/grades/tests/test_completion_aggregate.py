@@ -0,0 +1,159 @@
+"""
+Tests for the incrementally maintained course completion aggregate.
+"""
+from completion.models import BlockCompletion
+from completion.test_utils import CompletionWaffleTestMixin
+from django.core.cache import cache
+from django.db.models import signals
+from mock import patch
+
+from lms.djangoapps.grades.completion_aggregate import (
+    _backfill_subsection_completions,
+    get_course_completion_percentage,
+    rebuild_completable_blocks,
+    update_subsection_completion
+)
+from lms.djangoapps.grades.models import CompletableBlock, PersistentSubsectionCompletion
+from lms.djangoapps.grades.signals.handlers import recalculate_course_completion_percentage
+from student.tests.factories import UserFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+class CompletionAggregateTest(CompletionWaffleTestMixin, ModuleStoreTestCase):
+    """
+    Tests the per-subsection completion aggregate.
+    """
+    def setUp(self):
+        super(CompletionAggregateTest, self).setUp()
+        signals.post_save.disconnect(receiver=recalculate_course_completion_percentage, sender=BlockCompletion)
+        self.addCleanup(
+            signals.post_save.connect, receiver=recalculate_course_completion_percentage, sender=BlockCompletion
+        )
+        self.override_waffle_switch(False)
+        cache.clear()
+        self.user = UserFactory.create()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent=self.course, category='chapter')
+        self.sequential1 = ItemFactory.create(parent=chapter, category='sequential')
+        self.sequential2 = ItemFactory.create(parent=chapter, category='sequential')
+        vertical1 = ItemFactory.create(parent=self.sequential1, category='vertical')
+        self.vertical2 = ItemFactory.create(parent=self.sequential2, category='vertical')
+        self.html1 = ItemFactory.create(parent=vertical1, category='html')
+        self.html2 = ItemFactory.create(parent=vertical1, category='html')
+        self.html3 = ItemFactory.create(parent=self.vertical2, category='html')
+        self.html4 = ItemFactory.create(parent=self.vertical2, category='html')
+
+    def _complete(self, block, completion=1.0):
+        """
+        Saves a completion for the given block and updates the aggregate.
+        """
+        previous = BlockCompletion.objects.filter(
+            user=self.user, block_key=block.location,
+        ).values_list('completion', flat=True).first() or 0
+        BlockCompletion.objects.submit_completion(
+            user=self.user,
+            course_key=self.course.id,
+            block_key=block.location,
+            completion=completion,
+        )
+        update_subsection_completion(self.user.id, self.course.id, block.location, completion - previous)
+
+    def test_index(self):
+        self.assertTrue(rebuild_completable_blocks(self.course.id))
+        self.assertEqual(CompletableBlock.objects.filter(course_id=self.course.id).count(), 4)
+        self.assertEqual(
+            CompletableBlock.objects.filter(subsection_key=self.sequential1.location).count(), 2
+        )
+        # unchanged content does not rebuild the index
+        self.assertFalse(rebuild_completable_blocks(self.course.id))
+
+    def test_no_completions(self):
+        self.assertEqual(get_course_completion_percentage(self.user, self.course.id), 0)
+
+    def test_incremental_update(self):
+        rebuild_completable_blocks(self.course.id)
+        self._complete(self.html1)
+        self._complete(self.html2, completion=0.5)
+        self.assertEqual(get_course_completion_percentage(self.user, self.course.id), 37.5)
+
+        self._complete(self.html3)
+        self.assertEqual(get_course_completion_percentage(self.user, self.course.id), 62.5)
+        row = PersistentSubsectionCompletion.objects.get(user_id=self.user.id, usage_key=self.sequential1.location)
+        self.assertEqual(row.completed, 1.5)
+
+    def test_backfill_existing_completions(self):
+        for block in (self.html1, self.html3):
+            BlockCompletion.objects.submit_completion(
+                user=self.user,
+                course_key=self.course.id,
+                block_key=block.location,
+                completion=1.0,
+            )
+        self.assertEqual(get_course_completion_percentage(self.user, self.course.id), 50)
+        self.assertEqual(PersistentSubsectionCompletion.objects.filter(user_id=self.user.id).count(), 2)
+
+    def test_update_applies_delta(self):
+        rebuild_completable_blocks(self.course.id)
+        self._complete(self.html1, completion=0.5)
+        self.assertEqual(get_course_completion_percentage(self.user, self.course.id), 12.5)
+        self._complete(self.html2)
+        self._complete(self.html1)
+        row = PersistentSubsectionCompletion.objects.get(user_id=self.user.id, usage_key=self.sequential1.location)
+        self.assertEqual(row.completed, 2.0)
+        # the sums are updated in place, without reading the completions of the subsection
+        with self.assertNumQueries(1):
+            update_subsection_completion(self.user.id, self.course.id, self.html3.location, 1.0)
+
+    def test_inaccessible_blocks_not_counted(self):
+        ItemFactory.create(parent=self.vertical2, category='html', visible_to_staff_only=True)
+        rebuild_completable_blocks(self.course.id)
+        self.assertEqual(CompletableBlock.objects.filter(course_id=self.course.id).count(), 5)
+        for block in (self.html1, self.html2, self.html3, self.html4):
+            self._complete(block)
+        self.assertEqual(get_course_completion_percentage(self.user, self.course.id), 100)
+
+    def test_course_without_completable_blocks(self):
+        course = CourseFactory.create()
+        with patch(
+            'lms.djangoapps.grades.completion_aggregate.rebuild_completable_blocks',
+            wraps=rebuild_completable_blocks,
+        ) as mock_rebuild:
+            self.assertEqual(get_course_completion_percentage(self.user, course.id), 0)
+            self.assertEqual(get_course_completion_percentage(self.user, course.id), 0)
+        self.assertEqual(mock_rebuild.call_count, 1)
+
+    def test_first_completion_deferred_to_backfill(self):
+        rebuild_completable_blocks(self.course.id)
+        self._complete(self.html1)
+        self.assertFalse(PersistentSubsectionCompletion.objects.filter(user_id=self.user.id).exists())
+        self.assertEqual(get_course_completion_percentage(self.user, self.course.id), 25)
+
+    def test_concurrent_backfill(self):
+        rebuild_completable_blocks(self.course.id)
+        BlockCompletion.objects.submit_completion(
+            user=self.user,
+            course_key=self.course.id,
+            block_key=self.html1.location,
+            completion=1.0,
+        )
+        # the sums of another subsection were created meanwhile
+        PersistentSubsectionCompletion.objects.create(
+            user_id=self.user.id, course_id=self.course.id, usage_key=self.sequential1.location, completed=0,
+        )
+        self.assertEqual(
+            _backfill_subsection_completions(self.user.id, self.course.id),
+            {unicode(self.sequential1.location): 1.0, unicode(self.sequential2.location): 0},
+        )
+        row = PersistentSubsectionCompletion.objects.get(user_id=self.user.id, usage_key=self.sequential1.location)
+        self.assertEqual(row.completed, 1.0)
+
+    def test_overridden_subsection(self):
+        rebuild_completable_blocks(self.course.id)
+        self._complete(self.html3)
+        self.assertEqual(
+            get_course_completion_percentage(
+                self.user, self.course.id, overridden_subsection_keys=[self.sequential1.location]
+            ),
+            75,
+        )
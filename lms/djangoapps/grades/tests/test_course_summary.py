@@ -0,0 +1,69 @@
+"""
+Tests for the learner course summaries.
+"""
+from completion.models import BlockCompletion
+from django.db.models import signals
+
+from lms.djangoapps.grades.course_summary import (
+    get_learner_course_summaries,
+    update_course_summaries,
+    update_learner_course_progress
+)
+from lms.djangoapps.grades.models import LearnerCourseSummary
+from lms.djangoapps.grades.signals.handlers import recalculate_course_completion_percentage
+from student.tests.factories import CourseEnrollmentFactory, UserFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+class LearnerCourseSummaryTest(ModuleStoreTestCase):
+    """
+    Tests the creation and maintenance of the learner course summaries.
+    """
+    def setUp(self):
+        super(LearnerCourseSummaryTest, self).setUp()
+        signals.post_save.disconnect(receiver=recalculate_course_completion_percentage, sender=BlockCompletion)
+        self.addCleanup(
+            signals.post_save.connect, receiver=recalculate_course_completion_percentage, sender=BlockCompletion
+        )
+        self.user = UserFactory.create()
+        self.course = CourseFactory.create(course_order=2, course_category='compliance')
+        chapter = ItemFactory.create(parent=self.course, category='chapter')
+        sequential = ItemFactory.create(parent=chapter, category='sequential')
+        vertical = ItemFactory.create(parent=sequential, category='vertical')
+        self.html = ItemFactory.create(parent=vertical, category='html')
+        CourseEnrollmentFactory.create(user=self.user, course_id=self.course.id)
+
+    def test_created_once(self):
+        summaries = get_learner_course_summaries(self.user, [self.course.id])
+        summary = summaries[self.course.id]
+        self.assertEqual(summary.course_order, 2)
+        self.assertEqual(summary.course_category, 'compliance')
+        self.assertEqual(summary.percent_progress, 0)
+        self.assertIsNone(summary.last_activity)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_learner_course_summaries(self.user, [self.course.id]), summaries)
+
+    def test_update_progress(self):
+        get_learner_course_summaries(self.user, [self.course.id])
+        BlockCompletion.objects.submit_completion(
+            user=self.user,
+            course_key=self.course.id,
+            block_key=self.html.location,
+            completion=1.0,
+        )
+        update_learner_course_progress(self.user.id, self.course.id, 1.0)
+
+        summary = LearnerCourseSummary.objects.get(user_id=self.user.id, course_id=self.course.id)
+        self.assertEqual(summary.percent_progress, 1.0)
+        self.assertIsNotNone(summary.last_activity)
+
+    def test_update_course_fields(self):
+        get_learner_course_summaries(self.user, [self.course.id])
+        self.course.course_order = 1
+        self.update_course(self.course, self.user.id)
+        update_course_summaries(self.course.id)
+
+        summary = LearnerCourseSummary.objects.get(user_id=self.user.id, course_id=self.course.id)
+        self.assertEqual(summary.course_order, 1)
@@ -11,6 +11,7 @@ import ddt
 import pytz
 import six
 from django.conf import settings
+from django.core.cache import cache
 from django.db.utils import IntegrityError
 from mock import MagicMock, patch
 
@@ -498,3 +499,45 @@ class RecalculateGradesForUserTest(HasCourseWithProblemsMixin, ModuleStoreTestCa
 
             factory.read.assert_called_once_with(self.user, course_key=self.course.id)
             self.assertFalse(factory.update.called)
+
+
+class CourseProgressQueueTest(HasCourseWithProblemsMixin, ModuleStoreTestCase):
+    """
+    Test the coalescing course progress queue fed by BlockCompletion saves.
+    """
+    def setUp(self):
+        super(CourseProgressQueueTest, self).setUp()
+        self.user = UserFactory.create()
+        self.set_up_course()
+        cache.clear()
+
+    @patch('lms.djangoapps.grades.tasks.calculate_course_progress.apply_async')
+    def test_events_are_coalesced(self, mock_apply_async):
+        self.assertTrue(tasks.enqueue_course_progress_update(self.user.id, self.course.id))
+        self.assertFalse(tasks.enqueue_course_progress_update(self.user.id, self.course.id))
+        self.assertFalse(tasks.enqueue_course_progress_update(self.user.id, self.course.id))
+
+        self.assertEqual(mock_apply_async.call_count, 1)
+        _, call_kwargs = mock_apply_async.call_args
+        self.assertEqual(call_kwargs['countdown'], tasks.COURSE_PROGRESS_COALESCE_SECONDS)
+        self.assertEqual(call_kwargs['kwargs']['course_id'], six.text_type(self.course.id))
+        self.assertEqual(call_kwargs['kwargs']['user_id'], self.user.id)
+
+    @patch('lms.djangoapps.grades.tasks.calculate_course_progress.apply_async')
+    def test_other_learner_not_coalesced(self, mock_apply_async):
+        other_user = UserFactory.create()
+        self.assertTrue(tasks.enqueue_course_progress_update(self.user.id, self.course.id))
+        self.assertTrue(tasks.enqueue_course_progress_update(other_user.id, self.course.id))
+        self.assertEqual(mock_apply_async.call_count, 2)
+
+    @patch('lms.djangoapps.grades.tasks.calculate_course_progress.apply_async')
+    def test_recalculation_releases_pending_marker(self, mock_apply_async):
+        tasks.enqueue_course_progress_update(self.user.id, self.course.id)
+        with patch('lms.djangoapps.grades.tasks.CourseGradeFactory') as mock_factory:
+            tasks.calculate_course_progress.apply(kwargs=mock_apply_async.call_args[1]['kwargs'])
+            mock_factory.return_value.update_course_completion_percentage.assert_called_once_with(
+                self.course.id, self.user
+            )
+
+        self.assertTrue(tasks.enqueue_course_progress_update(self.user.id, self.course.id))
+        self.assertEqual(mock_apply_async.call_count, 2)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 10:05
+from __future__ import unicode_literals
+
+from datetime import datetime
+import json
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+from pytz import UTC
+import triboo_analytics.models
+
+
+BATCH_SIZE = 1000
+
+
+def _load_datetime(date_time_str):
+    if not date_time_str:
+        return None
+    return datetime.strptime(date_time_str, '%Y-%m-%d %H:%M:%S.%f').replace(tzinfo=UTC)
+
+
+def _load_day(day_key):
+    return datetime.strptime(day_key, '%Y-%m-%d').date()
+
+
+def _learner_course_record(record):
+    return {
+        'status': record['status'],
+        'progress': int(record['progress']),
+        'badges': "%s" % record['badges'],
+        'current_score': int(record['current_score']),
+        'posts': record['posts'],
+        'total_time_spent': int(record['total_time_spent']),
+        'enrollment_date': _load_datetime(record['enrollment_date']),
+        'completion_date': _load_datetime(record['completion_date']),
+    }
+
+
+def _learner_section_record(record):
+    return {'total_time_spent': int(record['total_time_spent'])}
+
+
+def _learner_badge_record(record):
+    return {
+        'score': record['score'],
+        'success': record['success'],
+        'success_date': _load_datetime(record['success_date']),
+    }
+
+
+def _convert_records(report_model, record_model, convert):
+    day_records = []
+    for report_id, records_str in report_model.objects.values_list('id', 'records').iterator():
+        for day_key, record in json.loads(records_str).iteritems():
+            day_records.append(record_model(report_id=report_id, day=_load_day(day_key), **convert(record)))
+        if len(day_records) >= BATCH_SIZE:
+            record_model.objects.bulk_create(day_records)
+            day_records = []
+    record_model.objects.bulk_create(day_records)
+
+
+def convert_json_records(apps, schema_editor):
+    """
+    Moves the JSON history of the learner course, section and badge reports
+    into their per-day record tables.
+    """
+    _convert_records(apps.get_model('triboo_analytics', 'LearnerCourseJsonReport'),
+                     apps.get_model('triboo_analytics', 'LearnerCourseDayRecord'),
+                     _learner_course_record)
+    _convert_records(apps.get_model('triboo_analytics', 'LearnerSectionJsonReport'),
+                     apps.get_model('triboo_analytics', 'LearnerSectionDayRecord'),
+                     _learner_section_record)
+    _convert_records(apps.get_model('triboo_analytics', 'LearnerBadgeJsonReport'),
+                     apps.get_model('triboo_analytics', 'LearnerBadgeDayRecord'),
+                     _learner_badge_record)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('triboo_analytics', '0011_auto_20210526_2141'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearnerBadgeDayRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('score', models.FloatField(blank=True, default=0, null=True)),
+                ('success', models.BooleanField(default=False)),
+                ('success_date', models.DateTimeField(blank=True, default=None, null=True)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_records', to='triboo_analytics.LearnerBadgeJsonReport')),
+            ],
+            bases=(triboo_analytics.models.DayRecordMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name='LearnerCourseDayRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.PositiveSmallIntegerField(default=0)),
+                ('progress', models.PositiveSmallIntegerField(default=0, validators=[django.core.validators.MaxValueValidator(100)])),
+                ('badges', models.CharField(default='0 / 0', max_length=20)),
+                ('current_score', models.PositiveSmallIntegerField(default=0, validators=[django.core.validators.MaxValueValidator(100)])),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('total_time_spent', models.PositiveIntegerField(default=0)),
+                ('enrollment_date', models.DateTimeField(blank=True, default=None, null=True)),
+                ('completion_date', models.DateTimeField(blank=True, default=None, null=True)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_records', to='triboo_analytics.LearnerCourseJsonReport')),
+            ],
+            bases=(triboo_analytics.models.DayRecordMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name='LearnerSectionDayRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('total_time_spent', models.PositiveIntegerField(default=0)),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_records', to='triboo_analytics.LearnerSectionJsonReport')),
+            ],
+            bases=(triboo_analytics.models.DayRecordMixin, models.Model),
+        ),
+        migrations.AlterUniqueTogether(
+            name='learnersectiondayrecord',
+            unique_together=set([('report', 'day')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='learnersectiondayrecord',
+            index_together=set([('day', 'report')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='learnercoursedayrecord',
+            unique_together=set([('report', 'day')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='learnercoursedayrecord',
+            index_together=set([('day', 'report')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='learnerbadgedayrecord',
+            unique_together=set([('report', 'day')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='learnerbadgedayrecord',
+            index_together=set([('day', 'report')]),
+        ),
+        migrations.RunPython(convert_json_records, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 10:05
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('triboo_analytics', '0012_learner_day_records'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='learnerbadgejsonreport',
+            name='records',
+        ),
+        migrations.RemoveField(
+            model_name='learnercoursejsonreport',
+            name='records',
+        ),
+        migrations.RemoveField(
+            model_name='learnersectionjsonreport',
+            name='records',
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 11:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import opaque_keys.edx.django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('triboo_analytics', '0013_remove_json_records'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearnerCourseReportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('course_id', opaque_keys.edx.django.models.CourseKeyField(max_length=255)),
+                ('first_enrollment_id', models.PositiveIntegerField()),
+                ('last_enrollment_id', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='learnercoursereportcheckpoint',
+            index_together=set([('day', 'course_id')]),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 12:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+import model_utils.fields
+import opaque_keys.edx.django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('triboo_analytics', '0014_learnercoursereportcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSectionIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('course_id', opaque_keys.edx.django.models.CourseKeyField(max_length=255, unique=True)),
+                ('structure_modified', models.DateTimeField()),
+                ('structure_hash', models.CharField(max_length=32)),
+                ('sections_json', models.TextField(default='{}')),
+                ('block_sections_json', models.TextField(default='{}')),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 12:40
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('triboo_analytics', '0015_coursesectionindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderBoardRank',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('org', models.CharField(blank=True, max_length=255)),
+                ('period', models.CharField(max_length=10)),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('rank', models.PositiveIntegerField()),
+                ('last_rank', models.PositiveIntegerField(default=0)),
+                ('refreshed', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardrank',
+            unique_together=set([('org', 'period', 'user')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='leaderboardrank',
+            index_together=set([('org', 'period', 'rank')]),
+        ),
+    ]
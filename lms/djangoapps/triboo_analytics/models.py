@@ -3,15 +3,19 @@ from __future__ import unicode_literals
 
 from collections import defaultdict
 import hashlib
+from itertools import groupby, izip
 import json
 import logging
 import multiprocessing
-import re
+from operator import attrgetter
+import time
 import uuid
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.validators import MaxValueValidator
-from django.db import models, connection, connections
-from django.db.models import Sum, Count, Q, Max
+from django.db import models, connection, connections, transaction, IntegrityError
+from django.db.models import Sum, Count, Q, Max, Case, When, Value, OuterRef, Subquery, F
 from django.http import Http404
 from datetime import date, datetime
 from django.utils import timezone
@@ -20,12 +24,14 @@ from django.utils.translation import ugettext_noop
 from django_countries.fields import CountryField
 from model_utils.fields import AutoLastModifiedField
 from model_utils.models import TimeStampedModel
+import numpy
 from requests import ConnectionError
 from completion.models import BlockCompletion
-from course_blocks.api import get_course_blocks
+from course_blocks.api import get_course_blocks, get_course_blocks_for_users
 from courseware.courses import get_course_by_id
-from courseware.models import XModuleUserStateSummaryField, StudentModule
+from courseware.models import XModuleUserStateSummaryField, StudentModule, chunks
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
+from lms.djangoapps.grades.models import PersistentCourseGrade, PersistentSubsectionGrade
 from lms.djangoapps.grades.subsection_grade_factory import SubsectionGradeFactory
 import lms.lib.comment_client as cc
 from lms.lib.comment_client.utils import CommentClientMaintenanceError, CommentClientRequestError
@@ -33,11 +39,12 @@ from opaque_keys.edx.keys import CourseKey, UsageKey
 from opaque_keys.edx.django.models import CourseKeyField, UsageKeyField
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from openedx.core.djangoapps.content.course_structures.api.v0.api import course_structure, CourseStructureNotAvailableError
+from openedx.core.djangoapps.content.course_structures.models import CourseStructure
 from openedx.core.djangoapps.content.course_structures.tasks import update_course_structure
 from openedx.core.djangoapps.models.course_details import CourseDetails
 from openedx.core.djangoapps.site_configuration.models import SiteConfiguration
 from student.models import CourseEnrollment, UserProfile
-from track.backends.django import TrackingLog
+from track.backends.django import TrackingLog, TrackingLogDailySummary
 from xmodule.modulestore.django import modulestore
 from six import text_type
 
@@ -48,6 +55,17 @@ ANALYTICS_WORKER_USER = "analytics_worker"
 
 IDLE_TIME = 900 # 15 minutes
 
+REPORTS_CHUNK_SIZE = 500
+REPORTS_CHECK_MAX_RETRIES = 3
+TRACKING_LOGS_USERS_CHUNK_SIZE = 1000
+
+LEADERBOARD_CACHE_VERSION_KEY = "triboo_analytics.leaderboard.version"
+LEADERBOARD_DIRTY_KEY = "triboo_analytics.leaderboard.dirty"
+LEADERBOARD_REFRESHED_KEY = "triboo_analytics.leaderboard.refreshed"
+LEADERBOARD_REFRESH_LOCK_KEY = "triboo_analytics.leaderboard.refresh_lock"
+# interval (in seconds) of the refresh_leaderboard_ranks task, which refreshes the ranks when scores changed
+LEADERBOARD_REFRESH_INTERVAL = 300
+
 logger = logging.getLogger('triboo_analytics')
 
 
@@ -70,12 +88,48 @@ def dt2key(date_time=None):
     return date_time.strftime('%Y-%m-%d')
 
 
-def dtload(date_time_str):
-    return datetime.strptime(date_time_str, '%Y-%m-%d %H:%M:%S.%f').replace(tzinfo=UTC)
+def dt2day(date_time=None):
+    if not date_time:
+        date_time = timezone.now()
+    return date_time.date() if isinstance(date_time, datetime) else date_time
+
+
+def bulk_update(model, objs, fields, batch_size=REPORTS_CHUNK_SIZE):
+    """
+    Django 1.11 has no QuerySet.bulk_update: updates the given fields of the given objects
+    with one UPDATE ... SET field = CASE WHEN id = ... query per batch
+    """
+    for batch in chunks(objs, batch_size):
+        updates = {}
+        for field_name in fields:
+            field = model._meta.get_field(field_name)
+            updates[field_name] = Case(*[When(pk=obj.pk, then=Value(getattr(obj, field_name), output_field=field))
+                                         for obj in batch],
+                                       output_field=field)
+        model.objects.filter(pk__in=[obj.pk for obj in batch]).update(**updates)
 
 
-def dtdump(date_time):
-    return date_time.strftime('%Y-%m-%d %H:%M:%S.%f')
+_process_course = {}
+
+
+def get_process_course(course_key):
+    """
+    keeps the last course used by the process: a worker mostly receives consecutive chunks of the same course
+    """
+    if course_key not in _process_course:
+        _process_course.clear()
+        _process_course[course_key] = modulestore().get_course(course_key)
+    return _process_course[course_key]
+
+
+def _process_generate_learner_course_reports(chunk_task):
+    try:
+        LearnerCourseJsonReport.process_generate_today_reports(*chunk_task)
+        return True
+    except Exception as e:
+        logger.exception("learner course reports of course_id=%s failed for enrollments %s: %s" % (
+                         chunk_task[2], chunk_task[3], e))
+        return False
 
 
 def get_day_limits(day=None, offset=0):
@@ -121,9 +175,7 @@ class TrackingLogHelper(object):
     def __init__(self, course_keys):
         self.block_sections_by_course = {}
         self.sections_by_course = {}
-        for course_key in course_keys:
-            sections, block_sections = self.get_sections(course_key)
-            course_id_str = "%s" % course_key
+        for course_id_str, (sections, block_sections) in CourseSectionIndex.get_sections_by_course(course_keys).iteritems():
             self.sections_by_course[course_id_str] = sections
             self.block_sections_by_course[course_id_str] = block_sections
 
@@ -145,9 +197,9 @@ class TrackingLogHelper(object):
 
 
     @classmethod
-    def get_sections(cls, course_key):
+    def get_sections(cls, structure):
         """
-        returns 2 dicts:
+        returns 2 dicts computed from the course structure in a single traversal:
         1) a dict giving the combined display name for the combined url of each section
         the combined display name of a section is formatted as "chapter.display_name / section.display_name"
         2) a dict giving the combined url of the parent section for each block id of the course
@@ -155,105 +207,101 @@ class TrackingLogHelper(object):
         - chapter_url is the part of the chapter block id after '@chapter+block@'
         - section_url is the part of the section block id after '@sequential+block@'
         """
-        _sections = {}
-
-        section_urls = {}
-        parentage = {}
-        outline = course_structure(course_key)
-
-        for block_id, block in outline['blocks'].iteritems():
-            if block['type'] == "chapter":
-                chapter_url = cls.get_chapter_url(block_id)
-                for section_id in block['children']:
-                    section_url = cls.get_section_url(section_id)
-                    combined_section_url = "%s/%s" % (chapter_url, section_url)
-                    section_urls[section_id] = combined_section_url
-                    _sections[section_id] = {
-                        'combined_url': combined_section_url,
-                        'chapter_display_name': block['display_name']
-                    }
-            else:
-                if block['type'] != "course" and len(block['children']) > 0:
-                    parent_id = block_id
-                    parent_type = block['type']
-                    for child_id in block['children']:
-                        parentage[child_id] = {
-                            'parent_id': parent_id,
-                            'parent_type': parent_type
-                        }
+        sections = {}
+        block_sections = {}
+        blocks = structure['blocks']
+        for chapter_id in blocks[structure['root']]['children']:
+            chapter = blocks.get(chapter_id)
+            if not chapter or chapter['block_type'] != "chapter":
+                continue
+            chapter_url = cls.get_chapter_url(chapter_id)
+            for section_id in chapter['children']:
+                section = blocks.get(section_id)
+                if not section:
+                    continue
+                combined_url = "%s/%s" % (chapter_url, cls.get_section_url(section_id))
+                sections[combined_url] = "%s / %s" % (chapter['display_name'], section['display_name'])
+                descendant_ids = list(section['children'])
+                while descendant_ids:
+                    block_id = descendant_ids.pop()
+                    block_sections[block_id] = combined_url
+                    if block_id in blocks:
+                        descendant_ids.extend(blocks[block_id]['children'])
 
-        done = False
-        while not done:
-            done = True
-            for child_id, child in parentage.iteritems():
-                if child['parent_type'] != "sequential":
-                    done = False
-                    parent_id = child['parent_id']
-                    child['parent_id'] = parentage[parent_id]['parent_id']
-                    child['parent_type'] = parentage[parent_id]['parent_type']
+        return sections, block_sections
 
-        block_sections = {child_id: section_urls[child['parent_id']] for child_id, child in parentage.iteritems()}
 
-        sections = {}
-        for block_id, block in outline['blocks'].iteritems():
-            if block_id in _sections.keys():
-                combined_url = _sections[block_id]['combined_url']
-                combined_display_name = "%s / %s" % (_sections[block_id]['chapter_display_name'],
-                                                     block['display_name'])
-                sections[combined_url] = combined_display_name
+    @classmethod
+    def filter_day_tracking_logs(cls, day_start, day_end):
+        return TrackingLog.objects.filter(time__gte=day_start, time__lt=day_end).exclude(user_id=None)
 
-        return sections, block_sections
+
+    @classmethod
+    def get_day_user_ids(cls, day_logs):
+        return sorted(day_logs.order_by().values_list('user_id', flat=True).distinct())
+
+
+    @classmethod
+    def fix_last_logins(cls, day_start, day_end):
+        """
+        sets the last_login of the users who have logs in [day_start, day_end[ but whose last_login is older
+        to the time of their first log of the day, with a single update
+        """
+        day_logs = cls.filter_day_tracking_logs(day_start, day_end)
+        first_log_time = day_logs.filter(user_id=OuterRef('id')).order_by('time').values('time')[:1]
+        nb_users = User.objects.filter(Q(last_login__isnull=True) | Q(last_login__lt=day_start),
+                                       id__in=day_logs.values('user_id')).update(last_login=Subquery(first_log_time))
+        logger.info("last_login fixed for %d users" % nb_users)
 
 
     @classmethod
     def get_day_tracking_logs(cls, day_start, day_end):
         """
         retrieve the TrackingLog objects with time between [like day_start, day_end[
-        and sort these logs by user_id and order them by time
+        and yield them by user_id, ordered by time, loading the logs of TRACKING_LOGS_USERS_CHUNK_SIZE users at once
         """
-        tracking_logs = TrackingLog.objects.filter(
-                            time__gte=day_start, time__lt=day_end).exclude(
-                            user_id=None).only('event_type', 'time', 'user_id', 'agent', 'time_spent')
-        user_logs = defaultdict(list)
-        for l in tracking_logs:
-            user_logs[l.user_id].append(l)
-        for user_id, logs in user_logs.iteritems():
-            user_logs[user_id] = sorted(logs, key=lambda v:v.time)
-            first_log_time = user_logs[user_id][0].time
-            try:
-                user = User.objects.get(id=user_id)
-                if not user.last_login or (user.last_login and user.last_login.date() < first_log_time.date()):
-                    logger.info("user %d last_login %s should => %s" % (user_id, user.last_login, first_log_time))
-                    user.last_login = first_log_time
-                    user.save()
-            except User.DoesNotExist:
-                pass
+        cls.fix_last_logins(day_start, day_end)
+        day_logs = cls.filter_day_tracking_logs(day_start, day_end)
+        for user_ids in chunks(cls.get_day_user_ids(day_logs), TRACKING_LOGS_USERS_CHUNK_SIZE):
+            tracking_logs = day_logs.filter(user_id__in=user_ids).order_by('user_id', 'time').only(
+                                'event_type', 'time', 'user_id', 'agent', 'time_spent')
+            for user_id, user_logs in groupby(tracking_logs, key=attrgetter('user_id')):
+                yield user_id, list(user_logs)
 
-        return user_logs
+
+    @classmethod
+    def get_times_spent(cls, user_ids, times):
+        """
+        user_ids and times of logs ordered by user_id and time
+        returns the time spent on each log: the time until the next log of the same user, capped at IDLE_TIME,
+        the last log of a user counts as IDLE_TIME
+        """
+        seconds = numpy.array([(t - times[0]).total_seconds() for t in times])
+        user_ids = numpy.array(user_ids)
+        times_spent = numpy.ones(len(seconds)) * IDLE_TIME
+        times_spent[:-1] = numpy.where(user_ids[1:] == user_ids[:-1],
+                                       numpy.minimum(numpy.diff(seconds), IDLE_TIME),
+                                       IDLE_TIME)
+        return times_spent.tolist()
 
 
     def update_logs(self, day=None):
         day_start, day_end = get_day_limits(day=day)
-        user_logs = self.get_day_tracking_logs(day_start, day_end)
-
-        for user_id, logs in user_logs.iteritems():
-            if len(logs) >= 2:
-                log_pairs = zip(logs[:-1], logs[1:])
-                for log1, log2 in log_pairs:
-                    total_seconds = (log2.time - log1.time).total_seconds()
-                    time_spent = total_seconds if total_seconds < IDLE_TIME else IDLE_TIME
-                    self.update_log(log1, time_spent)
-                self.update_log(logs[-1], IDLE_TIME)
-            elif len(logs) == 1:
-                self.update_log(logs[0], IDLE_TIME)
-
-
-    def update_log(self, tracking_log, time_spent):
-        tracking_log.time_spent = time_spent
-        section = self.get_parent_section_combined_url(tracking_log.event_type)
-        if section:
-            tracking_log.section = section
-        tracking_log.save()
+        self.fix_last_logins(day_start, day_end)
+        day_logs = self.filter_day_tracking_logs(day_start, day_end)
+        for user_ids in chunks(self.get_day_user_ids(day_logs), TRACKING_LOGS_USERS_CHUNK_SIZE):
+            logs = list(day_logs.filter(user_id__in=user_ids).order_by('user_id', 'time').values_list(
+                            'id', 'user_id', 'time', 'event_type', 'section'))
+            if not logs:
+                continue
+            log_ids, log_user_ids, times, event_types, sections = zip(*logs)
+            times_spent = self.get_times_spent(log_user_ids, times)
+            tracking_logs = [TrackingLog(id=log_id,
+                                         time_spent=time_spent,
+                                         section=self.get_parent_section_combined_url(event_type) or section)
+                             for log_id, time_spent, event_type, section in zip(log_ids, times_spent, event_types, sections)]
+            with transaction.atomic():
+                bulk_update(TrackingLog, tracking_logs, ['time_spent', 'section'])
 
 
     def get_parent_section_combined_url(self, event_type):
@@ -262,16 +310,76 @@ class TrackingLogHelper(object):
         nb_pieces = len(pieces)
         if nb_pieces > 4 and pieces[1] == "courses":
             course_id = pieces[2]
-            if course_id in self.block_sections_by_course.keys():
+            block_sections = self.block_sections_by_course.get(course_id)
+            if block_sections is not None:
                 if pieces[3] == "courseware" and nb_pieces > 5:
                     section = "%s/%s" % (pieces[4], pieces[5])
                 elif pieces[3] == "xblock":
-                    block_id = "%s" % pieces[4]
-                    if block_id in self.block_sections_by_course[course_id].keys():
-                        section = self.block_sections_by_course[course_id][block_id]
+                    section = block_sections.get(pieces[4])
         return section
 
 
+class CourseSectionIndex(TimeStampedModel):
+    """
+    sections of a course and parent section of each of its blocks, as computed by TrackingLogHelper.get_sections
+    from the course structure, which is regenerated when the course is published
+    """
+    class Meta(object):
+        app_label = "triboo_analytics"
+
+    course_id = CourseKeyField(max_length=255, unique=True, null=False)
+    structure_modified = models.DateTimeField(null=False)
+    structure_hash = models.CharField(max_length=32, null=False)
+    sections_json = models.TextField(default="{}")
+    block_sections_json = models.TextField(default="{}")
+
+
+    @classmethod
+    def update_from_structure(cls, course_structure):
+        structure_hash = hashlib.md5((course_structure.structure_json or "").encode('utf-8')).hexdigest()
+        index = cls.objects.filter(course_id=course_structure.course_id).first()
+        if index and index.structure_hash == structure_hash:
+            if index.structure_modified != course_structure.modified:
+                index.structure_modified = course_structure.modified
+                index.save()
+            return index
+
+        structure = course_structure.structure
+        sections, block_sections = TrackingLogHelper.get_sections(structure) if structure else ({}, {})
+        index, _ = cls.objects.update_or_create(course_id=course_structure.course_id,
+                                                defaults={'structure_modified': course_structure.modified,
+                                                          'structure_hash': structure_hash,
+                                                          'sections_json': json.dumps(sections),
+                                                          'block_sections_json': json.dumps(block_sections)})
+        logger.info("section index of course_id=%s updated: %d sections, %d blocks" % (
+                    course_structure.course_id, len(sections), len(block_sections)))
+        return index
+
+
+    @classmethod
+    def get_sections_by_course(cls, course_keys):
+        """
+        returns the sections and block sections of the given courses by course_id string
+        only the indexes of the courses whose structure was modified since they were built are computed
+        """
+        structures_modified = dict(CourseStructure.objects.filter(course_id__in=course_keys).values_list(
+                                   'course_id', 'modified'))
+        indexes = {index.course_id: index for index in cls.objects.filter(course_id__in=course_keys)}
+        sections_by_course = {}
+        for course_key in course_keys:
+            index = indexes.get(course_key)
+            structure_modified = structures_modified.get(course_key)
+            if structure_modified and (not index or index.structure_modified < structure_modified):
+                index = cls.update_from_structure(CourseStructure.objects.get(course_id=course_key))
+            if index:
+                sections_by_course["%s" % course_key] = (json.loads(index.sections_json),
+                                                         json.loads(index.block_sections_json))
+            else:
+                logger.warning("no course structure for course_id=%s" % course_key)
+                sections_by_course["%s" % course_key] = ({}, {})
+        return sections_by_course
+
+
 def get_day():
     return timezone.now().date()
 
@@ -320,32 +428,37 @@ class ReportMixin(object):
 
 
 class JsonReportMixin(object):
+    """
+    history of a report: one snapshot per day, stored as a row of the model
+    related to the report as 'day_records'
+    """
     @classmethod
-    def get_record_str(cls, records_str, key):
-        regex = r"\"%s\":\s(\{[^\}]+\})" % key
-        m = re.search(regex, records_str)
-        if m:
-            return m.group(1)
-        return None
+    def get_record_model(cls):
+        return cls._meta.get_field('day_records').related_model
 
 
     @classmethod
-    def get_record(cls, records_str, key):
-        record_str = cls.get_record_str(records_str, key)
-        if record_str:
-            return json.loads(record_str)
-        return None
+    def get_records_by_report(cls, reports, day):
+        """
+        returns the snapshots of the given day for the given reports, by report id
+        """
+        records = cls.get_record_model().objects.filter(day=day, report__in=reports)
+        return {record.report_id: record for record in records}
 
 
-    @classmethod
-    def recordify(cls, key, record_str):
-        return "\"%s\": %s" % (key, record_str)
+    def get_record(self, day):
+        return self.day_records.filter(day=day).first()
 
 
-    @classmethod
-    def append_record(cls, records_str, new_key, new_record_str):
-        new_record_str = cls.recordify(new_key, new_record_str)
-        return "%s, %s}" % (records_str[:-1], new_record_str)
+    def set_record(self, day, **record):
+        self.day_records.update_or_create(day=day, defaults=record)
+
+
+class DayRecordMixin(object):
+    SNAPSHOT_FIELDS = ()
+
+    def snapshot(self):
+        return {field: getattr(self, field) for field in self.SNAPSHOT_FIELDS}
 
 
 class UnicodeMixin(object):
@@ -465,7 +578,7 @@ class LearnerVisitsDailyReport(UnicodeMixin, ReportMixin, TimeModel):
     def generate_day_reports(cls, day=None):
         previous_day_start, previous_day_end = get_day_limits(day=day, offset=-1)
         previous_day_tracking_logs = TrackingLogHelper.get_day_tracking_logs(previous_day_start, previous_day_end)
-        for user_id, user_logs in previous_day_tracking_logs.iteritems():
+        for user_id, user_logs in previous_day_tracking_logs:
             if User.objects.filter(id=user_id).exists():
                 cls.update_or_create(user_id, user_logs, day)
 
@@ -516,14 +629,14 @@ class LearnerCourseDailyReportMockup(object):
         self.course_id = learner_course_json_report.course_id
         self.org = learner_course_json_report.org
         if record:
-            self.status = record['status']
-            self.progress = record['progress']
-            self.badges = record['badges']
-            self.current_score = record['current_score']
-            self.posts = record['posts']
-            self.total_time_spent = record['total_time_spent']
-            self.enrollment_date = dtload(record['enrollment_date'])
-            self.completion_date = dtload(record['completion_date']) if record['completion_date'] else None
+            self.status = record.status
+            self.progress = record.progress
+            self.badges = record.badges
+            self.current_score = record.current_score
+            self.posts = record.posts
+            self.total_time_spent = record.total_time_spent
+            self.enrollment_date = record.enrollment_date
+            self.completion_date = record.completion_date
         else:
             self.status = 0
             self.progress = 0
@@ -553,28 +666,21 @@ class LearnerCourseJsonReport(JsonReportMixin, TimeStampedModel):
     total_time_spent = models.PositiveIntegerField(default=0)
     enrollment_date = models.DateTimeField(default=None, null=True, blank=True)
     completion_date = models.DateTimeField(default=None, null=True, blank=True)
-    records = models.TextField(default="{}", null=False, blank=False)
     is_active = models.BooleanField(default=True)
 
 
-    @classmethod
-    def dump_record(cls, record):
-        return json.dumps({"status": record['status'],
-                "progress": record['progress'],
-                "badges": record['badges'],
-                "current_score": record['current_score'],
-                "posts": record['posts'],
-                "total_time_spent": record['total_time_spent'],
-                "enrollment_date": dtdump(record['enrollment_date']) if record['enrollment_date'] else None,
-                "completion_date": dtdump(record['completion_date']) if record['completion_date'] else None})
-
-
     @classmethod
     def generate_today_reports(cls, last_analytics_success, overviews, sections_by_course, multi_process=False):
+        """
+        splits the active enrollments of every course in chunks of REPORTS_CHUNK_SIZE, skipping the chunks
+        already generated today by an interrupted run. in multi process mode, the chunks of all courses are
+        consumed from a shared queue by a pool of get_concurrency() worker processes.
+        """
         analytics_worker = User.objects.get(username=ANALYTICS_WORKER_USER)
+        day = dt2day()
+        LearnerCourseReportCheckpoint.objects.filter(day__lt=day).delete()
 
-        nb_processes = 2 * multiprocessing.cpu_count() if multi_process else 1
-
+        chunk_tasks = []
         nb_courses = len(overviews)
         i = 0
         for overview in overviews:
@@ -589,14 +695,16 @@ class LearnerCourseJsonReport(JsonReportMixin, TimeStampedModel):
             Badge.refresh(course_id, course, analytics_worker)
 
             sections = sections_by_course[course_id_str]
-            
-            enrollments = CourseEnrollment.objects.filter(is_active=True,
-                                                          course_id=course_id,
-                                                          user__is_active=True)
-            nb_enrollments = len(enrollments)
 
-            logger.info("learner course report for course_id=%s (%d / %d): %d enrollments" % (
-                        course_id, i, nb_courses, nb_enrollments))
+            enrollment_ids = list(CourseEnrollment.objects.filter(is_active=True,
+                                                                  course_id=course_id,
+                                                                  user__is_active=True).order_by(
+                                                                  'id').values_list('id', flat=True))
+            nb_enrollments = len(enrollment_ids)
+            enrollment_ids = LearnerCourseReportCheckpoint.exclude_generated(day, course_id, enrollment_ids)
+
+            logger.info("learner course report for course_id=%s (%d / %d): %d enrollments, %d to generate" % (
+                        course_id, i, nb_courses, nb_enrollments, len(enrollment_ids)))
 
             if (not multi_process
                 and (nb_enrollments > 10000)
@@ -604,177 +712,292 @@ class LearnerCourseJsonReport(JsonReportMixin, TimeStampedModel):
                 multi_process = True
                 logger.info("force multiprocessing")
 
-            if multi_process:
-                enrollment_ids = [e_id for e_id in enrollments.values_list('id', flat=True)]
+            for chunk_enrollment_ids in chunks(enrollment_ids, REPORTS_CHUNK_SIZE):
+                chunk_tasks.append((last_analytics_success, course_last_update, course_id_str, chunk_enrollment_ids, sections))
 
-                enrollments_by_process = []
-                for j in range(0, nb_processes):
-                    enrollments_by_process.append([])
-
-                j = 0
-                for enrollment_id in enrollment_ids:
-                    enrollments_by_process[j].append(enrollment_id)
-                    j += 1
-                    if j == nb_processes:
-                        j = 0
+        nb_chunks = len(chunk_tasks)
+        if multi_process:
+            concurrency = cls.get_concurrency()
+            logger.info("generate %d chunks of learner course reports with %d processes" % (nb_chunks, concurrency))
+            connections.close_all()
+            pool = multiprocessing.Pool(processes=concurrency)
+            try:
+                # chunksize=1: an idle process takes the next chunk of the queue, whatever its course
+                results = pool.imap_unordered(_process_generate_learner_course_reports, chunk_tasks, chunksize=1)
+                cls.log_chunk_results(results, nb_chunks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = (_process_generate_learner_course_reports(chunk_task) for chunk_task in chunk_tasks)
+            cls.log_chunk_results(results, nb_chunks)
 
-                connections.close_all()
-                processes = []
-                for process_enrollments in enrollments_by_process:
-                    process = multiprocessing.Process(target=cls.process_generate_today_reports,
-                                                      args=(last_analytics_success, course_last_update, process_enrollments, course, sections,))
-                    process.start()
-                    processes.append(process)
-                [process.join() for process in processes]
 
-            else:
-                enrollments = enrollments.prefetch_related('user')
-                for enrollment in enrollments:
-                    cls.generate_enrollment_report(last_analytics_success, course_last_update, enrollment, course, sections)
+    @classmethod
+    def get_concurrency(cls):
+        return settings.TRIBOO_ANALYTICS_CONCURRENCY or 2 * multiprocessing.cpu_count()
 
 
     @classmethod
-    def process_generate_today_reports(cls, last_analytics_success, course_last_update, enrollment_ids, course, sections):
-        for enrollment_id in enrollment_ids:
-            enrollment = CourseEnrollment.objects.get(id=enrollment_id)
-            cls.generate_enrollment_report(last_analytics_success, course_last_update, enrollment, course, sections)
+    def log_chunk_results(cls, results, nb_chunks):
+        nb_failed = 0
+        i = 0
+        for success in results:
+            i += 1
+            if not success:
+                nb_failed += 1
+            if i % 100 == 0 or i == nb_chunks:
+                logger.info("learner course report chunks: %d / %d done, %d failed" % (i, nb_chunks, nb_failed))
+
+
+    @classmethod
+    def process_generate_today_reports(cls, last_analytics_success, course_last_update, course_id, enrollment_ids, sections):
+        course_key = CourseKey.from_string(course_id)
+        course = get_process_course(course_key)
+        if not course:
+            logger.error("course_id=%s returned Http404" % course_id)
+            return
+        enrollments = CourseEnrollment.objects.filter(id__in=enrollment_ids).select_related('user')
+        cls.generate_course_reports(last_analytics_success, course_last_update, enrollments, course, sections)
+        LearnerCourseReportCheckpoint.objects.create(day=dt2day(),
+                                                     course_id=course_key,
+                                                     first_enrollment_id=enrollment_ids[0],
+                                                     last_enrollment_id=enrollment_ids[-1])
 
 
     @classmethod
-    def generate_enrollment_report(cls, last_analytics_success, course_last_update, enrollment, course, sections):
-        key_last_analytics_success = dt2key(last_analytics_success) if last_analytics_success else None
-        updated = cls.update_or_create(key_last_analytics_success, course_last_update, enrollment, course)
-        LearnerSectionJsonReport.update_or_create(key_last_analytics_success, enrollment, sections, updated)
+    def generate_course_reports(cls, last_analytics_success, course_last_update, enrollments, course, sections):
+        """
+        generates the reports of the given enrollments of a course by chunks of REPORTS_CHUNK_SIZE
+        """
+        day_last_analytics_success = dt2day(last_analytics_success) if last_analytics_success else None
+        start = time.time()
+        nb_enrollments = 0
+        nb_updated = 0
+        for enrollments_chunk in chunks(enrollments, REPORTS_CHUNK_SIZE):
+            updated_user_ids = cls.bulk_update_or_create(day_last_analytics_success,
+                                                         course_last_update,
+                                                         enrollments_chunk,
+                                                         course)
+            for enrollment in enrollments_chunk:
+                LearnerSectionJsonReport.update_or_create(day_last_analytics_success,
+                                                          enrollment,
+                                                          sections,
+                                                          enrollment.user_id in updated_user_ids)
+            nb_enrollments += len(enrollments_chunk)
+            nb_updated += len(updated_user_ids)
+
+        duration = time.time() - start
+        logger.info("learner course report for course_id=%s: %d enrollments (%d updated) in %.1fs (%.1f enrollments/s)" % (
+                    course.id, nb_enrollments, nb_updated, duration, (nb_enrollments / duration) if duration else 0))
+
+
+    @classmethod
+    def get_missing_enrollments(cls, course_id, since):
+        """
+        returns the active enrollments of the course without an active report modified since the given time
+        """
+        generated_user_ids = cls.objects.filter(course_id=course_id,
+                                                is_active=True,
+                                                modified__gte=since).values('user_id')
+        return list(CourseEnrollment.objects.filter(is_active=True,
+                                                    course_id=course_id,
+                                                    user__is_active=True).exclude(
+                                                    user_id__in=generated_user_ids).select_related('user'))
 
 
     @classmethod
-    def update_or_create(cls, key_last_analytics_success, course_last_update, enrollment, course):
-        course_key = enrollment.course_id
+    def report_needs_update(cls, report, last_analytics_success_record, course_last_update, enrollment):
+        if not last_analytics_success_record:
+            return True
+        report_last_modified = report.modified.date()
         user = enrollment.user
-
-        if user.is_active:
-            report_needs_update = True
-            report = None
-            try:
-                report = cls.objects.get(course_id=course_key, user_id=user.id)
-            except cls.DoesNotExist:
-                pass
-            if key_last_analytics_success and report:
-                report_last_modified = report.modified.date()
-                last_analytics_success_record = cls.get_record_str(report.records, key_last_analytics_success)
-                if (last_analytics_success_record
-                    and (not enrollment.gradebook_edit or enrollment.gradebook_edit.date() < report_last_modified)
+        # logger.info("LAETITIA -- LC report user_id=%d / gradebook=%s / login=%s / "\
+        #     "course update=%s / completion=%s" % (
+        #     user.id,
+        #     (not enrollment.gradebook_edit or enrollment.gradebook_edit.date() < report_last_modified),
+        #     (not user.last_login or user.last_login.date() < report_last_modified),
+        #     (course_last_update < report_last_modified),
+        #     (enrollment.completed == report.completion_date)))
+        return not ((not enrollment.gradebook_edit or enrollment.gradebook_edit.date() < report_last_modified)
                     and (not user.last_login or user.last_login.date() < report_last_modified)
                     and course_last_update < report_last_modified
-                    and enrollment.completed == report.completion_date):
-                    # logger.info("LAETITIA -- LC report user_id=%d / gradebook=%s / login=%s / "\
-                    #     "course update=%s / completion=%s => NO UPDATE NEEDED" % (
-                    #     user.id,
-                    #     (not enrollment.gradebook_edit or enrollment.gradebook_edit.date() < report_last_modified),
-                    #     (not user.last_login or user.last_login.date() < report_last_modified),
-                    #     (course_last_update < report_last_modified),
-                    #     (enrollment.completed == report.completion_date)))
-                    report_needs_update = False
-                    report.records = cls.append_record(report.records, dt2key(), last_analytics_success_record)
-                    report.is_active = True
-                    report.save()
+                    and enrollment.completed == report.completion_date)
 
-            badge_report_needs_update = True
-            trophies_by_chapter = None
-            if report_needs_update:
-                # logger.info("LAETITIA -- LC report user_id=%d NEEDS UPDATE" % user.id)
-                with modulestore().bulk_operations(course_key):
-                    total_time_spent = (LearnerVisitsDailyReport.objects.filter(
-                                            user=user, course_id=course_key, created__gte=enrollment.created).aggregate(
-                                            Sum('time_spent')).get('time_spent__sum') or 0)
 
-                    grade_factory = CourseGradeFactory()
-                    progress = grade_factory.get_progress(user, course)
-                    if progress:
-                        progress['progress'] *= 100.0
-                        if enrollment.completed:
-                            status = CourseStatus.failed
-
-                            if progress['nb_trophies_possible'] == 0 or progress['is_course_passed']:
-                                status = CourseStatus.finished
+    @classmethod
+    def get_posts(cls, user_id, course_key):
+        try:
+            cc_user = cc.User(id=user_id, course_id=course_key).to_dict()
+            return cc_user.get('comments_count', 0) + cc_user.get('threads_count', 0)
+        except (cc.CommentClient500Error, cc.CommentClientRequestError, ConnectionError):
+            return 0
 
-                        else:
-                            # by gradebook edit a user could have a progress > 0 while total_time_spent = 0
-                            if total_time_spent > 0 or progress['progress'] > 0:
-                                status = CourseStatus.in_progress
-                            else:
-                                status = CourseStatus.not_started
 
-                        posts = 0
-                        try:
-                            cc_user = cc.User(id=user.id, course_id=course_key).to_dict()
-                            posts = cc_user.get('comments_count', 0) + cc_user.get('threads_count', 0)
-                        except (cc.CommentClient500Error, cc.CommentClientRequestError, ConnectionError):
-                            pass
+    @classmethod
+    def get_new_record(cls, enrollment, progress, total_time_spent):
+        if progress:
+            progress['progress'] *= 100.0
+            if enrollment.completed:
+                status = CourseStatus.failed
 
-                        new_record = {"status": status,
-                                      "progress": progress['progress'],
-                                      "badges": format_badges(progress['nb_trophies_earned'], progress['nb_trophies_possible']),
-                                      "current_score": progress['current_score'],
-                                      "posts": posts,
-                                      "total_time_spent": total_time_spent,
-                                      "enrollment_date": enrollment.created,
-                                      "completion_date": enrollment.completed}
+                if progress['nb_trophies_possible'] == 0 or progress['is_course_passed']:
+                    status = CourseStatus.finished
 
-                        trophies_by_chapter = progress['trophies_by_chapter']
+            else:
+                # by gradebook edit a user could have a progress > 0 while total_time_spent = 0
+                if total_time_spent > 0 or progress['progress'] > 0:
+                    status = CourseStatus.in_progress
+                else:
+                    status = CourseStatus.not_started
+
+            return {"status": status,
+                    "progress": progress['progress'],
+                    "badges": format_badges(progress['nb_trophies_earned'], progress['nb_trophies_possible']),
+                    "current_score": progress['current_score'],
+                    "posts": cls.get_posts(enrollment.user_id, enrollment.course_id),
+                    "total_time_spent": total_time_spent,
+                    "enrollment_date": enrollment.created,
+                    "completion_date": enrollment.completed}
+
+        # logger.warning('LAETITIA -- course=%s user_id=%d does not have progress info => empty report.' % (
+        #     enrollment.course_id, enrollment.user_id))
+        return {"status": CourseStatus.not_started,
+                "progress": 0,
+                "badges": 0,
+                "current_score": 0,
+                "posts": 0,
+                "total_time_spent": total_time_spent,
+                "enrollment_date": enrollment.created,
+                "completion_date": None}
+
+
+    @classmethod
+    def get_total_time_spent_by_user(cls, course_key, enrollments):
+        """
+        sums, with a single query, the visit time spent in the course by each learner since their enrollment
+        """
+        if not enrollments:
+            return {}
+        enrollment_days = {e.user_id: dt2day(e.created) for e in enrollments}
+        visits = LearnerVisitsDailyReport.objects.filter(course_id=course_key,
+                                                         user_id__in=enrollment_days.keys(),
+                                                         created__gte=min(enrollment_days.values())).values(
+                                                         'user_id', 'created').annotate(Sum('time_spent'))
+        total_time_spent_by_user = defaultdict(lambda: 0)
+        for visit in visits:
+            if visit['created'] >= enrollment_days[visit['user_id']]:
+                total_time_spent_by_user[visit['user_id']] += visit['time_spent__sum'] or 0
+        return total_time_spent_by_user
+
+
+    @classmethod
+    def bulk_update_or_create(cls, day_last_analytics_success, course_last_update, enrollments, course):
+        """
+        batched update_or_create for enrollments of the same course: existing reports, last analytics success
+        records, visit time and grades are prefetched in a few queries, reports and records are written in bulk.
+        returns the ids of the users whose report was updated; enrollments failing to build are logged and skipped
+        """
+        course_key = course.id
+        today = dt2day()
+        enrollments = [e for e in enrollments if e.user.is_active]
+        if not enrollments:
+            return set()
+        users = [e.user for e in enrollments]
+
+        reports = {r.user_id: r for r in cls.objects.filter(course_id=course_key,
+                                                            user_id__in=[u.id for u in users])}
+        last_analytics_success_records = {}
+        if day_last_analytics_success and reports:
+            last_analytics_success_records = cls.get_records_by_report(reports.values(), day_last_analytics_success)
+
+        new_records = {}
+        unchanged_report_ids = []
+        enrollments_to_update = []
+        for enrollment in enrollments:
+            report = reports.get(enrollment.user_id)
+            record = last_analytics_success_records.get(report.id) if report else None
+            if report and not cls.report_needs_update(report, record, course_last_update, enrollment):
+                unchanged_report_ids.append(report.id)
+                new_records[enrollment.user_id] = record.snapshot()
+            else:
+                enrollments_to_update.append(enrollment)
 
-                    else:
-                        # logger.warning('LAETITIA -- course=%s user_id=%d does not have progress info => empty report.' % (
-                        #     course_key, user.id))
-                        new_record = {"status": CourseStatus.not_started,
-                                      "progress": 0,
-                                      "badges": 0,
-                                      "current_score": 0,
-                                      "posts": 0,
-                                      "total_time_spent": total_time_spent,
-                                      "enrollment_date": enrollment.created,
-                                      "completion_date": None}
-                        badge_report_needs_update = False
-
-                    new_record_str = cls.dump_record(new_record)
-                    if report:
-                        # logger.info("LAETITIA -- LC report user_id=%d SIMPLY ADD RECORD" % user.id)
-                        report.status = new_record['status']
-                        report.progress = new_record['progress']
-                        report.badges = new_record['badges']
-                        report.current_score = new_record['current_score']
-                        report.posts = new_record['posts']
-                        report.total_time_spent = new_record['total_time_spent']
-                        report.enrollment_date = new_record['enrollment_date']
-                        report.completion_date = new_record['completion_date']
-                        report.records = cls.append_record(report.records, dt2key(), new_record_str)
-                        report.is_active = True
-                        report.save()
+        total_time_spent_by_user = cls.get_total_time_spent_by_user(course_key, enrollments_to_update)
+        trophies_by_user = {}
+        PersistentSubsectionGrade.prefetch(course_key, users)
+        PersistentCourseGrade.prefetch(course_key, users)
+        try:
+            with modulestore().bulk_operations(course_key):
+                grade_factory = CourseGradeFactory()
+                structures = get_course_blocks_for_users([e.user for e in enrollments_to_update], course.location)
+                failed_user_ids = set()
+                for enrollment, (__, structure) in izip(enrollments_to_update, structures):
+                    # one failing learner must not abort the reports of the whole chunk
+                    try:
+                        progress = grade_factory.get_progress(enrollment.user, course, course_structure=structure)
+                        new_records[enrollment.user_id] = cls.get_new_record(enrollment,
+                                                                             progress,
+                                                                             total_time_spent_by_user.get(enrollment.user_id, 0))
+                    except Exception as e:
+                        logger.exception("learner course report failed for course_id=%s user_id=%d: %s" % (
+                            course_key, enrollment.user_id, e))
+                        failed_user_ids.add(enrollment.user_id)
+                        continue
+                    if progress:
+                        trophies_by_user[enrollment.user_id] = progress['trophies_by_chapter']
+                if failed_user_ids:
+                    enrollments_to_update = [e for e in enrollments_to_update if e.user_id not in failed_user_ids]
+                    enrollments = [e for e in enrollments if e.user_id not in failed_user_ids]
+
+            now = timezone.now()
+            reports_to_update = []
+            reports_to_create = []
+            for enrollment in enrollments_to_update:
+                report = reports.get(enrollment.user_id)
+                if not report:
+                    report = cls(user=enrollment.user, course_id=course_key, org=course_key.org)
+                    reports_to_create.append(report)
+                else:
+                    reports_to_update.append(report)
+                for field, value in new_records[enrollment.user_id].iteritems():
+                    setattr(report, field, value)
+                report.is_active = True
+                report.modified = now
+
+            with transaction.atomic():
+                cls.objects.filter(id__in=unchanged_report_ids).update(is_active=True, modified=now)
+                bulk_update(cls, reports_to_update, LearnerCourseDayRecord.SNAPSHOT_FIELDS + ('is_active', 'modified'))
+                cls.objects.bulk_create(reports_to_create, batch_size=REPORTS_CHUNK_SIZE)
+                report_ids = dict(cls.objects.filter(course_id=course_key,
+                                                     user_id__in=new_records.keys()).values_list('user_id', 'id'))
+                record_model = cls.get_record_model()
+                record_model.objects.filter(day=today, report_id__in=report_ids.values()).delete()
+                record_model.objects.bulk_create([record_model(report_id=report_ids[user_id], day=today, **record)
+                                                  for user_id, record in new_records.iteritems()],
+                                                 batch_size=REPORTS_CHUNK_SIZE)
+
+            updated_user_ids = set(e.user_id for e in enrollments_to_update)
+            for enrollment in enrollments:
+                needs_update = enrollment.user_id in updated_user_ids
+                if needs_update and enrollment.user_id not in trophies_by_user:
+                    # no progress info => no badge
+                    continue
+                try:
+                    LearnerBadgeJsonReport.update_or_create(day_last_analytics_success,
+                                                            course_key,
+                                                            course,
+                                                            enrollment.user,
+                                                            trophies_by_user.get(enrollment.user_id),
+                                                            needs_update)
+                except Exception as e:
+                    logger.exception("learner badge report failed for course_id=%s user_id=%d: %s" % (
+                        course_key, enrollment.user_id, e))
+        finally:
+            PersistentSubsectionGrade.clear_prefetched_data(course_key)
+            PersistentCourseGrade.clear_prefetched_data(course_key)
 
-                    else:
-                        # logger.info("LAETITIA -- LC report user_id=%d CREATE NEW REPORT" % user.id)
-                        cls.objects.update_or_create(user=user,
-                                                     course_id=course_key,
-                                                     defaults={'org': course_key.org,
-                                                               'status': new_record['status'],
-                                                               'progress': new_record['progress'],
-                                                               'badges': new_record['badges'],
-                                                               'current_score': new_record['current_score'],
-                                                               'posts': new_record['posts'],
-                                                               'total_time_spent': new_record['total_time_spent'],
-                                                               'enrollment_date': new_record['enrollment_date'],
-                                                               'completion_date': new_record['completion_date'],
-                                                               'records': "{%s}" % cls.recordify(dt2key(), new_record_str)})
-
-            if badge_report_needs_update:
-                LearnerBadgeJsonReport.update_or_create(key_last_analytics_success,
-                                                        course_key,
-                                                        course,
-                                                        user,
-                                                        trophies_by_chapter,
-                                                        report_needs_update)
-            return report_needs_update
-        return False
+        return updated_user_ids
 
 
     @classmethod
@@ -797,13 +1020,10 @@ class LearnerCourseJsonReport(JsonReportMixin, TimeStampedModel):
         reports = cls.objects.filter(is_active=True, **kwargs)
         logger.info("LAETITIA -- LearnerCourseJsonReport nb reports = %d" % len(reports))
         if to_date:
-            day_key = dt2key(to_date)
-            logger.info("LAETITIA -- LearnerCourseJsonReport of %s" % day_key)
-            results = []
-            for r in reports:
-                record = cls.get_record(r.records, day_key)
-                results.append(LearnerCourseDailyReportMockup(r, record))
-            return results
+            day = dt2day(to_date)
+            logger.info("LAETITIA -- LearnerCourseJsonReport of %s" % day)
+            records = cls.get_records_by_report(reports, day)
+            return [LearnerCourseDailyReportMockup(r, records.get(r.id)) for r in reports]
         return reports
 
 
@@ -812,14 +1032,59 @@ class LearnerCourseJsonReport(JsonReportMixin, TimeStampedModel):
         try:
             r = cls.objects.get(is_active=True, **kwargs)
             if to_date:
-                day_key = dt2key(to_date)
-                record = cls.get_record(r.records, day_key)
-                return LearnerCourseDailyReportMockup(r, record)
+                return LearnerCourseDailyReportMockup(r, r.get_record(dt2day(to_date)))
             return r
         except cls.DoesNotExist:
             return None
         
 
+class LearnerCourseDayRecord(DayRecordMixin, models.Model):
+    class Meta(object):
+        app_label = "triboo_analytics"
+        unique_together = ('report', 'day')
+        index_together = ['day', 'report']
+
+    SNAPSHOT_FIELDS = ('status', 'progress', 'badges', 'current_score', 'posts', 'total_time_spent',
+                       'enrollment_date', 'completion_date')
+
+    report = models.ForeignKey(LearnerCourseJsonReport, null=False, related_name='day_records',
+                               on_delete=models.CASCADE)
+    day = models.DateField(null=False)
+    status = models.PositiveSmallIntegerField(default=0)
+    progress = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(100)])
+    badges = models.CharField(max_length=20, default="0 / 0")
+    current_score = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(100)])
+    posts = models.PositiveIntegerField(default=0)
+    total_time_spent = models.PositiveIntegerField(default=0)
+    enrollment_date = models.DateTimeField(default=None, null=True, blank=True)
+    completion_date = models.DateTimeField(default=None, null=True, blank=True)
+
+
+class LearnerCourseReportCheckpoint(models.Model):
+    """
+    a chunk of enrollments whose learner course reports have been generated, so that an interrupted
+    generation can resume where it stopped
+    """
+    class Meta(object):
+        app_label = "triboo_analytics"
+        index_together = ['day', 'course_id']
+
+    day = models.DateField(null=False)
+    course_id = CourseKeyField(max_length=255, null=False)
+    first_enrollment_id = models.PositiveIntegerField()
+    last_enrollment_id = models.PositiveIntegerField()
+
+
+    @classmethod
+    def exclude_generated(cls, day, course_id, enrollment_ids):
+        ranges = list(cls.objects.filter(day=day, course_id=course_id).values_list('first_enrollment_id',
+                                                                                   'last_enrollment_id'))
+        if not ranges:
+            return enrollment_ids
+        return [e_id for e_id in enrollment_ids
+                if not any(first <= e_id <= last for first, last in ranges)]
+
+
 class LearnerCourseDailyReport(UnicodeMixin, ReportMixin, TimeModel):
     class Meta(object):
         app_label = "triboo_analytics"
@@ -1036,12 +1301,11 @@ class LearnerSectionJsonReport(JsonReportMixin, TimeStampedModel):
     section_key = models.CharField(max_length=100, null=False)
     section_name = models.CharField(max_length=512, null=False)
     total_time_spent = models.PositiveIntegerField(default=0)
-    records = models.TextField(default="{}", null=False, blank=False)
     is_active = models.BooleanField(default=True)
 
 
     @classmethod
-    def update_or_create(cls, key_last_analytics_success, enrollment, sections, needs_update):
+    def update_or_create(cls, day_last_analytics_success, enrollment, sections, needs_update):
         for section_combined_url, section_combined_display_name in sections.iteritems():
             report = None
             try:
@@ -1052,39 +1316,36 @@ class LearnerSectionJsonReport(JsonReportMixin, TimeStampedModel):
                 pass
 
             last_analytics_success_record = None
-            if key_last_analytics_success and report:
-                last_analytics_success_record = cls.get_record_str(report.records, key_last_analytics_success)
+            if day_last_analytics_success and report:
+                last_analytics_success_record = report.get_record(day_last_analytics_success)
             if report and last_analytics_success_record and not needs_update:
                 # logger.info("LAETITIA -- Section report user_id=%d / section=%s NO UPDATE NEEDED" % (
                 #         enrollment.user.id, section_combined_url))
-                report.records = cls.append_record(report.records, dt2key(), last_analytics_success_record)
+                report.set_record(dt2day(), **last_analytics_success_record.snapshot())
                 report.is_active = True
                 report.save()
             else:
-                total_time_spent = (TrackingLog.objects.filter(user_id=enrollment.user.id,
-                                                           section=section_combined_url,
-                                                           time__gte=enrollment.created).aggregate(
-                                                               Sum('time_spent')).get('time_spent__sum') or 0)
+                total_time_spent = TrackingLogDailySummary.get_total_time_spent(enrollment.created,
+                                                                                user_id=enrollment.user.id,
+                                                                                section=section_combined_url)
                 total_time_spent = int(round(total_time_spent))
                 new_record = {"total_time_spent": total_time_spent}
-                new_record_str = json.dumps(new_record)
                 if report:
                     # logger.info("LAETITIA -- Section report user_id=%d / section=%s SIMPLY ADD RECORD" % (
                     #         enrollment.user.id, section_combined_url))
                     report.section_name = section_combined_display_name
                     report.total_time_spent = new_record['total_time_spent']
-                    report.records = cls.append_record(report.records, dt2key(), new_record_str)
                     report.is_active = True
                     report.save()
                 else:
                     # logger.info("LAETITIA -- Section report user_id=%d / section=%s CREATE NEW REPORT" % (
                     #         enrollment.user.id, section_combined_url))
-                    cls.objects.update_or_create(user=enrollment.user,
+                    report, _ = cls.objects.update_or_create(user=enrollment.user,
                                                  course_id=enrollment.course_id,
                                                  section_key=section_combined_url,
                                                  defaults={'section_name': section_combined_display_name.encode('utf-8'),
-                                                           'total_time_spent': new_record['total_time_spent'],
-                                                           'records': "{%s}" % cls.recordify(dt2key(), new_record_str)})
+                                                           'total_time_spent': new_record['total_time_spent']})
+                report.set_record(dt2day(), **new_record)
 
 
     @classmethod
@@ -1104,27 +1365,27 @@ class LearnerSectionJsonReport(JsonReportMixin, TimeStampedModel):
 
             reports = cls.objects.filter(course_id=course_id, is_active=True, **kwargs)
 
-            from_date_key = dt2key(from_date) if from_date else None
-            to_date_key = dt2key(to_date) if to_date else None
+            from_records = cls.get_records_by_report(reports, dt2day(from_date)) if from_date else {}
+            to_records = cls.get_records_by_report(reports, dt2day(to_date)) if to_date else {}
             for r in reports:
                 old_time_spent = 0
                 if from_date:
-                    from_record = cls.get_record(r.records, from_date_key)
+                    from_record = from_records.get(r.id)
                     if from_record:
-                        old_time_spent = from_record['total_time_spent']
+                        old_time_spent = from_record.total_time_spent
                 new_time_spent = r.total_time_spent
                 if to_date:
-                    to_record = cls.get_record(r.records, to_date_key)
+                    to_record = to_records.get(r.id)
                     if to_record:
-                        new_time_spent = to_record['total_time_spent']
+                        new_time_spent = to_record.total_time_spent
                     else:
                         new_time_spent = 0
                 if new_time_spent >= old_time_spent:
                     results.append(LearnerSectionDailyReportMockup(r, (new_time_spent - old_time_spent)))
                 else:
                     logger.error("invalid values for user_id %d / section %s: from %s = %d, to %s = %d" % (
-                        r.user_id, r.section_key, from_date_key, old_time_spent,
-                        to_date_key, new_time_spent))
+                        r.user_id, r.section_key, from_date, old_time_spent,
+                        to_date, new_time_spent))
         else:
             results = cls.objects.filter(course_id=course_id, is_active=True, **kwargs)
 
@@ -1143,6 +1404,20 @@ class LearnerSectionJsonReport(JsonReportMixin, TimeStampedModel):
         return dataset.values(), sections
 
 
+class LearnerSectionDayRecord(DayRecordMixin, models.Model):
+    class Meta(object):
+        app_label = "triboo_analytics"
+        unique_together = ('report', 'day')
+        index_together = ['day', 'report']
+
+    SNAPSHOT_FIELDS = ('total_time_spent',)
+
+    report = models.ForeignKey(LearnerSectionJsonReport, null=False, related_name='day_records',
+                               on_delete=models.CASCADE)
+    day = models.DateField(null=False)
+    total_time_spent = models.PositiveIntegerField(default=0)
+
+
 class LearnerSectionReport(TimeModel):
     class Meta(object):
         app_label = "triboo_analytics"
@@ -1157,11 +1432,9 @@ class LearnerSectionReport(TimeModel):
     @classmethod
     def update_or_create(cls, enrollment, sections):
         for section_combined_url, section_combined_display_name in sections.iteritems():
-            time_spent = (TrackingLog.objects.filter(
-                            user_id=enrollment.user.id,
-                            section=section_combined_url,
-                            time__gte=enrollment.created).aggregate(
-                                Sum('time_spent')).get('time_spent__sum') or 0)
+            time_spent = TrackingLogDailySummary.get_total_time_spent(enrollment.created,
+                                                                      user_id=enrollment.user.id,
+                                                                      section=section_combined_url)
             time_spent = int(round(time_spent))
             cls.objects.update_or_create(user=enrollment.user,
                                          course_id=enrollment.course_id,
@@ -1216,23 +1489,21 @@ class Badge(models.Model):
 
 
 class LearnerBadgeDailyReportMockup(object):
-    def __init__(self, learner_badge_json_report, key_day):
+    def __init__(self, learner_badge_json_report, record):
+        """
+        record is the report itself for the latest values, a LearnerBadgeDayRecord for a given day,
+        or None if the report has no record for that day
+        """
         self.user = learner_badge_json_report.user
         self.badge = learner_badge_json_report.badge
-        if key_day:
-            records = json.loads(learner_badge_json_report.records)
-            if key_day in records .keys():
-                self.score = records[key_day]['score']
-                self.success = records[key_day]['success']
-                self.success_date = dtload(records[key_day]['success_date']) if records[key_day]['success_date'] else None
-            else:
-                self.score = 0
-                self.success = 0
-                self.success_date = None
+        if record:
+            self.score = record.score
+            self.success = record.success
+            self.success_date = record.success_date
         else:
-            self.score = learner_badge_json_report.score
-            self.success = learner_badge_json_report.success
-            self.success_date = learner_badge_json_report.success_date
+            self.score = 0
+            self.success = 0
+            self.success_date = None
 
 
 class LearnerBadgeJsonReport(JsonReportMixin, TimeStampedModel):
@@ -1246,19 +1517,11 @@ class LearnerBadgeJsonReport(JsonReportMixin, TimeStampedModel):
     score = models.FloatField(default=0, null=True, blank=True)
     success = models.BooleanField(default=False)
     success_date = models.DateTimeField(default=None, null=True, blank=True)
-    records = models.TextField(default="{}", null=False, blank=False)
     is_active = models.BooleanField(default=True)
 
 
     @classmethod
-    def dump_record(cls, record):
-        return json.dumps({"score": record['score'],
-                "success": record['success'],
-                "success_date": dtdump(record['success_date']) if record['success_date'] else None})
-
-
-    @classmethod
-    def update_or_create(cls, key_last_analytics_success, course_key, course, user, trophies_by_chapter, needs_update):
+    def update_or_create(cls, day_last_analytics_success, course_key, course, user, trophies_by_chapter, needs_update):
         if not trophies_by_chapter:
             progress = CourseGradeFactory().get_progress(user, course)
             trophies_by_chapter = progress['trophies_by_chapter']
@@ -1288,20 +1551,19 @@ class LearnerBadgeJsonReport(JsonReportMixin, TimeStampedModel):
                     #     course_key, badge_hash, chapter['chapter_name'], trophy['section_name']))
 
                 report = None
-                records = {}
                 try:
                     report = cls.objects.get(user=user, badge=badge)
                 except cls.DoesNotExist:
                     pass
 
                 last_analytics_success_record = None
-                if key_last_analytics_success and report:
-                    last_analytics_success_record = cls.get_record_str(report.records, key_last_analytics_success)
+                if day_last_analytics_success and report:
+                    last_analytics_success_record = report.get_record(day_last_analytics_success)
 
                 if report and last_analytics_success_record and not needs_update:
                     # logger.info("LAETITIA -- Badge report user_id=%d / badge=%s NO UPDATE NEEDED" % (
                     #     user.id, badge))
-                    report.records = cls.append_record(report.records, dt2key(), last_analytics_success_record)
+                    report.set_record(dt2day(), **last_analytics_success_record.snapshot())
                     report.is_active = True
                     report.save()
 
@@ -1312,43 +1574,40 @@ class LearnerBadgeJsonReport(JsonReportMixin, TimeStampedModel):
                     new_record = {"score": score,
                                   "success": success,
                                   "success_date": success_date}
-                    new_record_str = cls.dump_record(new_record)
                     if report:
                         # logger.info("LAETITIA -- Badge report user_id=%d / badge=%s SIMPLY ADD RECORD" % (
                         #     user.id, badge))
                         report.score = new_record['score']
                         report.success = new_record['success']
                         report.success_date = new_record['success_date']
-                        report.records = cls.append_record(report.records, dt2key(), new_record_str)
                         report.is_active = True
                         report.save()
                     else:
                         # logger.info("LAETITIA -- Badge report user_id=%d / badge=%s CREATE NEW REPORT" % (
                         #     user.id, badge))
-                        cls.objects.update_or_create(user=user,
+                        report, _ = cls.objects.update_or_create(user=user,
                                                      badge=badge,
                                                      defaults={'score': score,
                                                                'success': success,
-                                                               'success_date': success_date,
-                                                               'records': "{%s}" % cls.recordify(dt2key(), new_record_str)})
+                                                               'success_date': success_date})
+                    report.set_record(dt2day(), **new_record)
 
 
     @classmethod
     def filter_by_day(cls, date_time=None, **kwargs):
-        key_day = dt2key(date_time) if date_time else None
         reports = cls.objects.filter(is_active=True, **kwargs)
-        results = []
-        for r in reports:
-            results.append(LearnerBadgeDailyReportMockup(r, key_day))
-        return results
+        if date_time:
+            records = cls.get_records_by_report(reports, dt2day(date_time))
+            return [LearnerBadgeDailyReportMockup(r, records.get(r.id)) for r in reports]
+        return [LearnerBadgeDailyReportMockup(r, r) for r in reports]
 
 
     @classmethod
     def get_by_day(cls, date_time=None, **kwargs):
-        day = dt2key(date_time) if date_time else None
         try:
             r = cls.objects.get(is_active=True, **kwargs)
-            return LearnerBadgeDailyReportMockup(r, key_day)
+            record = r.get_record(dt2day(date_time)) if date_time else r
+            return LearnerBadgeDailyReportMockup(r, record)
         except cls.DoesNotExist:
             return None
 
@@ -1378,6 +1637,22 @@ class LearnerBadgeJsonReport(JsonReportMixin, TimeStampedModel):
         return dataset.values()
 
 
+class LearnerBadgeDayRecord(DayRecordMixin, models.Model):
+    class Meta(object):
+        app_label = "triboo_analytics"
+        unique_together = ('report', 'day')
+        index_together = ['day', 'report']
+
+    SNAPSHOT_FIELDS = ('score', 'success', 'success_date')
+
+    report = models.ForeignKey(LearnerBadgeJsonReport, null=False, related_name='day_records',
+                               on_delete=models.CASCADE)
+    day = models.DateField(null=False)
+    score = models.FloatField(default=0, null=True, blank=True)
+    success = models.BooleanField(default=False)
+    success_date = models.DateTimeField(default=None, null=True, blank=True)
+
+
 class LearnerBadgeSuccess(models.Model):
     class Meta(object):
         app_label = "triboo_analytics"
@@ -2242,6 +2517,7 @@ def generate_today_reports(multi_process=False):
 
     logger.info("start Leaderboard daily update")
     LeaderBoard.update_stayed_online()
+    LeaderBoardRank.refresh()
 
     logger.info("start ILT reports")
     IltSession.prepare_today_reports()
@@ -2250,42 +2526,51 @@ def generate_today_reports(multi_process=False):
     IltSession.clean_obsolete_reports()
 
 
-def check_generated_learner_course_reports(last_analytics_success, overviews, course_last_updates, sections_by_course):
-    all_good = False
-    today = timezone.now().date()
+def check_generated_learner_course_reports(last_analytics_success, overviews, course_last_updates, sections_by_course,
+                                           max_retries=REPORTS_CHECK_MAX_RETRIES):
+    """
+    regenerates the learner course reports which were not generated today, found with one anti-join query
+    per course. the courses still missing reports are checked again, at most max_retries times.
+    returns the (user_id, course_id) pairs whose report could not be generated
+    """
+    today_start, _ = get_day_limits()
     course_ids_to_check = [o.id for o in overviews]
-    while not all_good:
-        course_ids_nok = []
-        logger.info("new check round with %d courses" % len(course_ids_to_check))
+    missing_enrollments_by_course = {}
+    for i in range(max_retries + 1):
+        missing_enrollments_by_course = {}
         for course_id in course_ids_to_check:
-            course_id_needs_fix = False
-            logger.info("checking %s" % course_id)
+            missing_enrollments = LearnerCourseJsonReport.get_missing_enrollments(course_id, today_start)
+            if missing_enrollments:
+                missing_enrollments_by_course[course_id] = missing_enrollments
+        if not missing_enrollments_by_course or i == max_retries:
+            break
+
+        logger.info("check round %d / %d: %d courses with missing reports" % (
+                    i + 1, max_retries, len(missing_enrollments_by_course)))
+        for course_id, missing_enrollments in missing_enrollments_by_course.iteritems():
+            logger.info("%d missing reports for %s => trying to generate them" % (len(missing_enrollments), course_id))
             course = modulestore().get_course(course_id)
-            sections = sections_by_course["%s" % course_id]
-            enrollments = CourseEnrollment.objects.filter(is_active=True, course_id=course_id, user__is_active=True)
-            for enrollment in enrollments:
-                is_missing = True
-                try:
-                    learner_course_report = LearnerCourseJsonReport.objects.get(course_id=course_id,
-                                                                                user_id=enrollment.user_id)
-                    if learner_course_report.modified.date() == today and learner_course_report.is_active:
-                        is_missing = False
-                except LearnerCourseJsonReport.DoesNotExist:
-                    pass
-                if is_missing:
-                    course_id_needs_fix = True
-                    # logger.info("missing report for user_id=%d => trying to generate it" % enrollment.user_id)
-                    LearnerCourseJsonReport.generate_enrollment_report(last_analytics_success,
-                                                                       course_last_updates[course_id],
-                                                                       enrollment,
-                                                                       course,
-                                                                       sections)
-            if course_id_needs_fix:
-                course_ids_nok.append(course_id)
-        if len(course_ids_nok) == 0:
-            all_good = True
-        else:
-            course_ids_to_check = course_ids_nok
+            if not course:
+                logger.error("course_id=%s returned Http404" % course_id)
+                continue
+            try:
+                LearnerCourseJsonReport.generate_course_reports(last_analytics_success,
+                                                                course_last_updates[course_id],
+                                                                missing_enrollments,
+                                                                course,
+                                                                sections_by_course["%s" % course_id])
+            except Exception as e:
+                logger.exception("could not generate missing reports of course_id=%s: %s" % (course_id, e))
+        course_ids_to_check = missing_enrollments_by_course.keys()
+
+    failing_pairs = [(enrollment.user_id, course_id)
+                     for course_id, missing_enrollments in missing_enrollments_by_course.iteritems()
+                     for enrollment in missing_enrollments]
+    if failing_pairs:
+        logger.error("%d learner course reports could not be generated: %s" % (
+                     len(failing_pairs),
+                     ", ".join(["user_id=%d course_id=%s" % (user_id, course_id) for user_id, course_id in failing_pairs])))
+    return failing_pairs
 
 
 class LeaderboardActivityLog(TimeStampedModel):
@@ -2521,47 +2806,87 @@ class LeaderBoard(TimeStampedModel):
                 ))
 
     @classmethod
-    def update_stayed_online(cls):
-        users = User.objects.filter(is_active=True)
-        for user in users:
-            tracking_log = LeaderboardActivityLog.objects.filter(
-                user_id=user.id,
-                event_type="online_check"
-            )
-            if tracking_log:
-                last_check = tracking_log.last().event_time
-                new_reports = LearnerVisitsDailyReport.objects.filter(
-                    user=user, modified__gt=last_check, org__isnull=False
-                )
-            else:
-                new_reports = LearnerVisitsDailyReport.objects.filter(user=user, org__isnull=False)
-
-            annotation_reports = new_reports.values("created").annotate(total=Sum("time_spent"))
-            stayed_online = annotation_reports.filter(total__gte=1800).count()
-
-            if new_reports:
-                query = new_reports.aggregate(Max("modified"))
-                last_online_check = query["modified__max"]
-            else:
-                last_online_check = ReportLog.objects.latest().learner_visit
-
-            LeaderboardActivityLog.objects.update_or_create(
-                user_id=user.id,
-                event_type="online_check",
-                defaults={
-                    "user_id": user.id,
-                    "event_type": "online_check",
-                    "event_time": last_online_check
-                }
-            )
+    def add_activity(cls, user_id, **deltas):
+        """
+        applies the given deltas to the activity counters of the user with a single atomic update,
+        counters never go below 0
+        """
+        updates = {field: Case(When(**{"%s__gte" % field: -delta, 'then': F(field) + delta}),
+                               default=Value(0),
+                               output_field=models.PositiveIntegerField())
+                   for field, delta in deltas.iteritems()}
+        if not cls.objects.filter(user_id=user_id).update(modified=timezone.now(), **updates):
+            try:
+                with transaction.atomic():
+                    cls.objects.create(user_id=user_id,
+                                       **{field: max(delta, 0) for field, delta in deltas.iteritems()})
+            except IntegrityError:
+                cls.objects.filter(user_id=user_id).update(modified=timezone.now(), **updates)
+        LeaderBoardRank.mark_dirty()
 
-            leader_board, _ = LeaderBoard.objects.get_or_create(user=user)
-            leader_board.stayed_online = leader_board.stayed_online + stayed_online
-            leader_board.save()
-            logger.info("online_check updated for user: {user_id}, last_check: {last}".format(
-                user_id=user.id,
-                last=last_online_check
-            ))
+    @classmethod
+    def update_stayed_online(cls):
+        """
+        adds to the stayed_online counter of the active users their days with at least 30 minutes of visit
+        reported since their last online check, by chunks of users
+        """
+        default_online_check = None
+        user_ids = list(User.objects.filter(is_active=True).values_list('id', flat=True))
+        for user_ids_chunk in chunks(user_ids, TRACKING_LOGS_USERS_CHUNK_SIZE):
+            last_checks = {}
+            online_checks = {}
+            for online_check in LeaderboardActivityLog.objects.filter(user_id__in=user_ids_chunk,
+                                                                      event_type="online_check").order_by('id'):
+                online_checks[online_check.user_id] = online_check
+                last_checks[online_check.user_id] = online_check.event_time
+
+            new_reports = LearnerVisitsDailyReport.objects.filter(user_id__in=user_ids_chunk, org__isnull=False)
+            if len(last_checks) == len(user_ids_chunk):
+                new_reports = new_reports.filter(modified__gt=min(last_checks.values()))
+            daily_time_spent = defaultdict(lambda: defaultdict(lambda: 0))
+            last_modified = {}
+            for user_id, created, modified, time_spent in new_reports.values_list('user_id', 'created', 'modified',
+                                                                                 'time_spent'):
+                if user_id in last_checks and modified <= last_checks[user_id]:
+                    continue
+                daily_time_spent[user_id][created] += time_spent
+                last_modified[user_id] = max(modified, last_modified.get(user_id, modified))
+
+            now = timezone.now()
+            users_by_stayed_online = defaultdict(list)
+            online_checks_to_update = []
+            online_checks_to_create = []
+            for user_id in user_ids_chunk:
+                stayed_online = len([total for total in daily_time_spent[user_id].values() if total >= 1800])
+                users_by_stayed_online[stayed_online].append(user_id)
+                if user_id in last_modified:
+                    last_online_check = last_modified[user_id]
+                else:
+                    if default_online_check is None:
+                        default_online_check = ReportLog.objects.latest().learner_visit
+                    last_online_check = default_online_check
+                if user_id in online_checks:
+                    online_check = online_checks[user_id]
+                    online_check.event_time = last_online_check
+                    online_check.modified = now
+                    online_checks_to_update.append(online_check)
+                else:
+                    online_checks_to_create.append(LeaderboardActivityLog(user_id=user_id,
+                                                                          event_type="online_check",
+                                                                          event_time=last_online_check))
+
+            with transaction.atomic():
+                existing_user_ids = set(cls.objects.filter(user_id__in=user_ids_chunk).values_list('user_id', flat=True))
+                cls.objects.bulk_create([cls(user_id=user_id) for user_id in user_ids_chunk
+                                         if user_id not in existing_user_ids])
+                for stayed_online, stayed_online_user_ids in users_by_stayed_online.iteritems():
+                    cls.objects.filter(user_id__in=stayed_online_user_ids).update(
+                        stayed_online=F('stayed_online') + stayed_online, modified=now)
+                bulk_update(LeaderboardActivityLog, online_checks_to_update, ['event_time', 'modified'])
+                LeaderboardActivityLog.objects.bulk_create(online_checks_to_create)
+            logger.info("online_check updated for %d users, %d stayed online" % (
+                        len(user_ids_chunk), len(user_ids_chunk) - len(users_by_stayed_online.get(0, []))))
+        LeaderBoardRank.mark_dirty()
 
 
 class LeaderBoardView(models.Model):
@@ -2606,26 +2931,154 @@ class LeaderBoardView(models.Model):
 
     @classmethod
     def calculate_last_week_rank(cls):
-        query_set = cls.objects.all()
-        weekly_rank = 0
-        for i in query_set.order_by("-current_week_score"):
-            weekly_rank += 1
-            logger.info("update last week rank of user: {user_id}, from {old_rank} ==> {new_rank}".format(
-                user_id=i.user_id,
-                old_rank=i.last_week_rank,
-                new_rank=weekly_rank
-            ))
-            LeaderBoard.objects.filter(id=i.id).update(last_week_rank=weekly_rank, last_week_score=i.total_score)
+        cls.calculate_last_rank("week")
 
     @classmethod
     def calculate_last_month_rank(cls):
-        query_set = cls.objects.all()
-        monthly_rank = 0
-        for i in query_set.order_by("-current_month_score"):
-            monthly_rank += 1
-            logger.info("update last month rank of user: {user_id}, from {old_rank} ==> {new_rank}".format(
-                user_id=i.user_id,
-                old_rank=i.last_month_rank,
-                new_rank=monthly_rank
-            ))
-            LeaderBoard.objects.filter(id=i.id).update(last_month_rank=monthly_rank, last_month_score=i.total_score)
+        cls.calculate_last_rank("month")
+
+    @classmethod
+    def calculate_last_rank(cls, period):
+        """
+        saves the current rank and total score of every user as the last ones of the period, in bulk
+        """
+        rank_field = "last_{}_rank".format(period)
+        score_field = "last_{}_score".format(period)
+        rows = cls.objects.order_by("-current_{}_score".format(period)).values_list('id', 'total_score')
+        leader_boards = [LeaderBoard(id=leader_board_id, **{rank_field: rank, score_field: total_score})
+                         for rank, (leader_board_id, total_score) in enumerate(rows, 1)]
+        bulk_update(LeaderBoard, leader_boards, [rank_field, score_field])
+        logger.info("update last {period} rank of {nb} users".format(period=period, nb=len(leader_boards)))
+        LeaderBoardRank.refresh()
+
+
+class LeaderBoardRank(models.Model):
+    """
+    materialized leaderboard: rank of each learner for each period among the learners visible on the leaderboard
+    of an org, i.e. the non staff learners of the org and the ones without org. refreshed by LeaderBoardRank.refresh
+    """
+    PERIODS = ("total", "week", "month")
+
+    org = models.CharField(max_length=255, null=False, blank=True)
+    period = models.CharField(max_length=10, null=False)
+    user = models.ForeignKey(User, null=False, on_delete=models.CASCADE)
+    score = models.PositiveIntegerField(default=0)
+    rank = models.PositiveIntegerField()
+    last_rank = models.PositiveIntegerField(default=0)
+    refreshed = models.DateTimeField()
+
+    class Meta(object):
+        app_label = "triboo_analytics"
+        unique_together = ('org', 'period', 'user')
+        index_together = ['org', 'period', 'rank']
+
+    @classmethod
+    def get_period(cls, period):
+        return period if period in cls.PERIODS else "total"
+
+    @classmethod
+    def get_cache_key(cls, org, period, top):
+        """
+        key of the cached leaderboard data of an org, which changes each time the ranks are refreshed
+        """
+        version = cache.get(LEADERBOARD_CACHE_VERSION_KEY, 0)
+        key = "%s.%s.%s.%s" % (version, org, period, top)
+        return "triboo_analytics.leaderboard.%s" % hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get_user_rank(cls, org, period, user_id):
+        """
+        rank of the user on the leaderboard of the org for the period, a single unique index lookup
+        """
+        return cls.objects.filter(org=org or "", period=cls.get_period(period), user_id=user_id).first()
+
+    @classmethod
+    def mark_dirty(cls):
+        """
+        records that leaderboard scores changed, the ranks are refreshed by the next run of the
+        refresh_leaderboard_ranks task
+        """
+        cache.set(LEADERBOARD_DIRTY_KEY, timezone.now(), None)
+
+    @classmethod
+    def get_site_orgs(cls):
+        """
+        orgs of the leaderboards of the sites, joined like the leaderboard views do
+        """
+        site_orgs = set()
+        for site_configuration in SiteConfiguration.objects.filter(enabled=True):
+            course_org_filter = site_configuration.get_value('course_org_filter')
+            if course_org_filter and not isinstance(course_org_filter, list):
+                course_org_filter = [course_org_filter]
+            if course_org_filter:
+                site_orgs.add("+".join(sorted(course_org_filter)))
+        return site_orgs
+
+    @classmethod
+    def refresh_if_stale(cls):
+        """
+        refreshes the ranks of every org if scores changed since the last refresh, or if a site org was not
+        refreshed yet. returns whether the ranks were refreshed
+        """
+        site_orgs = cls.get_site_orgs()
+        refreshed = cache.get(LEADERBOARD_REFRESHED_KEY)
+        if refreshed is not None and site_orgs <= refreshed["orgs"]:
+            dirty = cache.get(LEADERBOARD_DIRTY_KEY)
+            if dirty is not None and dirty <= refreshed["time"]:
+                return False
+        if not cache.add(LEADERBOARD_REFRESH_LOCK_KEY, 1, LEADERBOARD_REFRESH_INTERVAL):
+            return False
+        try:
+            cls.refresh(site_orgs)
+        finally:
+            cache.delete(LEADERBOARD_REFRESH_LOCK_KEY)
+        return True
+
+    @classmethod
+    def _save_org_ranks(cls, org, org_rows, now):
+        """
+        assigns in memory the ranks of the given score rows for each period, and replaces the ranks of the org
+        with them
+        """
+        # period: (index of the score, index of the last rank)
+        period_columns = {"total": (2, None), "week": (3, 5), "month": (4, 6)}
+        ranks = []
+        for period, (score_index, last_rank_index) in period_columns.iteritems():
+            org_rows.sort(key=lambda row: (-row[score_index], row[0]))
+            for rank, row in enumerate(org_rows, 1):
+                ranks.append(cls(org=org,
+                                 period=period,
+                                 user_id=row[0],
+                                 score=row[score_index],
+                                 rank=rank,
+                                 last_rank=row[last_rank_index] if last_rank_index else 0,
+                                 refreshed=now))
+        with transaction.atomic():
+            cls.objects.filter(org=org).delete()
+            cls.objects.bulk_create(ranks, batch_size=REPORTS_CHUNK_SIZE)
+
+    @classmethod
+    def refresh(cls, site_orgs=()):
+        """
+        recomputes the ranks of every org from the leaderboard scores, ranks are assigned in memory and
+        written with bulk_create. the orgs are the profile orgs, the given site orgs and the ones already ranked,
+        each one ranks its learners and the learners without org
+        """
+        now = timezone.now()
+        rows_by_org = defaultdict(list)
+        for row in LeaderBoardView.objects.filter(user__is_staff=False).values_list(
+                'user_id', 'user__profile__org', 'total_score', 'current_week_score', 'current_month_score',
+                'last_week_rank', 'last_month_rank'):
+            rows_by_org[row[1] or ""].append(row)
+        orgs = set(rows_by_org) | set(site_orgs) | {""}
+        orgs |= set(cls.objects.values_list('org', flat=True).distinct())
+        for org in orgs:
+            org_rows = rows_by_org[""] + rows_by_org[org] if org else list(rows_by_org[""])
+            cls._save_org_ranks(org, org_rows, now)
+        try:
+            cache.incr(LEADERBOARD_CACHE_VERSION_KEY)
+        except ValueError:
+            cache.set(LEADERBOARD_CACHE_VERSION_KEY, 1, None)
+        cache.set(LEADERBOARD_REFRESHED_KEY, {"time": now, "orgs": orgs}, None)
+        logger.info("leaderboard ranks refreshed for %d orgs, %d learners" % (
+                    len(orgs), sum(len(rows) for rows in rows_by_org.itervalues())))
@@ -34,6 +34,7 @@ from . import models
 from . import tables
 from django.http import HttpResponseNotFound
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from openedx.core.djangoapps.content.course_structures.models import CourseStructure
 from openedx.core.djangoapps.site_configuration import helpers as configuration_helpers
 
 
@@ -283,6 +284,11 @@ def generate_leaderboard_report_task(period, user_id, username, file_format, org
                          username)
 
 
+@receiver(post_save, sender=CourseStructure)
+def update_course_section_index(sender, instance, **kwargs):
+    models.CourseSectionIndex.update_from_structure(instance)
+
+
 @receiver(post_save, sender=BlockCompletion)
 def handle_leader_board_activity(sender, instance, **kwargs):
 
@@ -295,6 +301,15 @@ def handle_leader_board_activity(sender, instance, **kwargs):
     )
 
 
+@task(name='triboo_analytics.refresh_leaderboard_ranks', routing_key=settings.RECALCULATE_LEADERBOARD_ROUTING_KEY)
+def refresh_leaderboard_ranks():
+    """
+    periodic task (see CELERYBEAT_SCHEDULE) refreshing the materialized leaderboard ranks when scores changed,
+    so that the leaderboard views only read them
+    """
+    models.LeaderBoardRank.refresh_if_stale()
+
+
 @task(
     bind=True,
     base=LoggedPersistOnFailureTask,
@@ -308,26 +323,22 @@ def update_leader_board_activity(self, **kwargs):
     block_key = UsageKey.from_string(kwargs.get('block_id'))
     user = User.objects.get(id=kwargs.get('user_id'))
     block = modulestore().get_item(block_key)
-    leader_board = None
     completion = kwargs.get('completion')
     if completion == 1:
         offset = 1
     else:
         offset = -1
     if block_key.block_type in ['survey', 'poll', 'word_cloud']:
-        leader_board, _ = models.LeaderBoard.objects.get_or_create(user=user)
-        leader_board.non_graded_completed = leader_board.non_graded_completed + offset
+        models.LeaderBoard.add_activity(user.id, non_graded_completed=offset)
         logger.info("updated non_graded activity of leaderboard score by ({offset}) for user: {user_id}, "
                     "block_id: {block_id}".format(
                         user_id=user.id,
                         block_id=block_key,
                         offset=offset
                     ))
-        leader_board.save()
     elif block_key.block_type == 'problem':
-        leader_board, _ = models.LeaderBoard.objects.get_or_create(user=user)
         if not block.graded:
-            leader_board.non_graded_completed = leader_board.non_graded_completed + offset
+            models.LeaderBoard.add_activity(user.id, non_graded_completed=offset)
             logger.info(
                 "updated non_graded activity of leaderboard score by ({offset}) for user: {user_id}, "
                 "block_id: {block_id}".format(
@@ -337,7 +348,7 @@ def update_leader_board_activity(self, **kwargs):
                 ))
         else:
             if block.weight == 0:
-                leader_board.non_graded_completed = leader_board.non_graded_completed + offset
+                models.LeaderBoard.add_activity(user.id, non_graded_completed=offset)
                 logger.info(
                     "updated non_graded activity of leaderboard score by ({offset}) for user: {user_id}, "
                     "block_id: {block_id}".format(
@@ -352,7 +363,7 @@ def update_leader_board_activity(self, **kwargs):
                     course_structure[block_key], persist_grade=False
                 )
                 if subsection_grade.all_total.possible == 0:
-                    leader_board.non_graded_completed = leader_board.non_graded_completed + offset
+                    models.LeaderBoard.add_activity(user.id, non_graded_completed=offset)
                     logger.info(
                         "updated non_graded activity of leaderboard score by ({offset}) for user: {user_id}, "
                         "block_id: {block_id}".format(
@@ -361,7 +372,7 @@ def update_leader_board_activity(self, **kwargs):
                             offset=offset
                         ))
                 else:
-                    leader_board.graded_completed = leader_board.graded_completed + offset
+                    models.LeaderBoard.add_activity(user.id, graded_completed=offset)
                     logger.info(
                         "updated graded activity of leaderboard score by ({offset}) for user: {user_id}, "
                         "block_id: {block_id}".format(
@@ -371,8 +382,6 @@ def update_leader_board_activity(self, **kwargs):
                         )
                     )
 
-        leader_board.save()
-
     vertical_block = modulestore().get_item(block.parent)
     if block.parent.block_type == "library_content":
         vertical_block = modulestore().get_item(vertical_block.parent)
@@ -410,10 +419,7 @@ def update_leader_board_activity(self, **kwargs):
             cache_key = "{user_id}_{key}".format(user_id=user.id, key=unicode(block.parent))
             if cache.get(cache_key) is None:
                 cache.add(cache_key, "completed", 300)
-                if leader_board is None:
-                    leader_board, _ = models.LeaderBoard.objects.get_or_create(user=user)
-                leader_board.unit_completed = leader_board.unit_completed + 1
-                leader_board.save()
+                models.LeaderBoard.add_activity(user.id, unit_completed=1)
                 logger.info("updated unit completed of leaderboard score for user: {user_id}, "
                             "block_id: {block_id}".format(
                                 user_id=user.id,
@@ -434,8 +440,7 @@ def update_leader_board_activity(self, **kwargs):
     else:
         if completion == 0:
             unit_completion_event.delete()
-            leader_board.unit_completed = leader_board.unit_completed - 1
-            leader_board.save()
+            models.LeaderBoard.add_activity(user.id, unit_completed=-1)
             logger.info("remove unit completion for user: {user_id}, "
                         "block_id: {block_id}".format(
                             user_id=user.id,
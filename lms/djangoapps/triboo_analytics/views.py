@@ -13,10 +13,10 @@ from datetime import datetime, timedelta
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.core.urlresolvers import reverse
 from django.db import transaction
-from django.db.models import Max, Q
 from django.http import HttpResponseNotFound, Http404
 from django.shortcuts import redirect
 from django.utils import timezone
@@ -89,6 +89,7 @@ from .models import (
     ReportLog,
     TrackingLogHelper,
     LeaderBoard,
+    LeaderBoardRank,
     LeaderBoardView
 )
 from .tables import (
@@ -109,6 +110,7 @@ from .tasks import generate_export_table as generate_export_table_task, links_fo
 
 DEFAULT_LEADERBOARD_TOP = 10
 LEADERBOARD_DASHBOARD_TOP = 5
+LEADERBOARD_CACHE_TIMEOUT = 60 * 60 * 24
 
 logger = logging.getLogger('triboo_analytics')
 
@@ -1743,112 +1745,91 @@ def leaderboard_view(request):
     return render_to_response("triboo_analytics/leaderboard.html", data)
 
 
-def _leaderboard_data(request, period, orgs, top=None):
-    data = {}
-    top_list = []
-    query_set = LeaderBoardView.objects.filter(
-        (Q(user__profile__org=orgs) | Q(user__profile__org=None)) &
-        Q(user__is_staff=False)).select_related('user__profile')
-    total_user = query_set.count()
-    if period in ['week', 'month']:
-        order_by = '-current_{}_score'.format(period)
-        query_set = query_set.order_by(order_by)
-    else:
-        query_set = query_set.order_by('-total_score')
-
-    result_set = query_set[:top] if top is not None and top <= total_user else query_set
+def _leaderboard_user_detail(user, rank, score, request, top):
+    try:
+        name = user.profile.name or user.username
+    except:
+        name = user.username
+
+    if top is None:
+        return {"position": rank, "first_name": user.first_name,
+                "last_name": user.last_name,
+                "date_of_user_creation": strftime_localized(user.date_joined, "NUMBERIC_SHORT_DATE"),
+                "points": score}
     if top == LEADERBOARD_DASHBOARD_TOP:
-        for i in result_set:
-            try:
-                name = i.user.profile.name or i.user.username
-            except:
-                name = i.user.username
-            detail = {"Points": i.total_score, "Name": name,
-                      "Portrait": get_profile_image_urls_for_user(i.user, request=request)["medium"],
-                      "DateStr": strftime_localized(i.user.date_joined, "NUMBERIC_DATE_TIME")}
-            top_list.append(detail)
+        return {"Points": score, "Name": name,
+                "Portrait": get_profile_image_urls_for_user(user, request=request)["medium"],
+                "DateStr": strftime_localized(user.date_joined, "NUMBERIC_DATE_TIME")}
+    return {"Points": score, "Name": name, "Rank": rank,
+            "Portrait": get_profile_image_urls_for_user(user, request=request)["medium"],
+            "DateStr": strftime_localized(user.date_joined, "NUMBERIC_SHORT_DATE")}
 
-    else:
-        request_user_included = False
-        real_time_rank = 0
-        for i in result_set:
-            status = None
-            real_time_rank += 1
-            if period == "month":
-                point = i.current_month_score
-                if i.last_month_rank == 0 or i.last_month_rank > real_time_rank:
-                    status = "up"
-                elif i.last_month_rank == real_time_rank:
-                    status = "eq"
-                else:
-                    status = "down"
-            elif period == "week":
-                point = i.current_week_score
-                if i.last_week_rank == 0 or i.last_week_rank > real_time_rank:
-                    status = "up"
-                elif i.last_week_rank == real_time_rank:
-                    status = "eq"
-                else:
-                    status = "down"
-            else:
-                point = i.total_score
 
-            try:
-                name = i.user.profile.name or i.user.username
-            except:
-                name = i.user.username
-
-            if top is None:
-                detail = {"position": real_time_rank, "first_name": i.user.first_name,
-                          "last_name": i.user.last_name,
-                          "date_of_user_creation": strftime_localized(i.user.date_joined, "NUMBERIC_SHORT_DATE"),
-                          "points": point}
+def _leaderboard_top_ranks(period, orgs, top=None):
+    """
+    ranking shared by all the learners of the orgs, read from the materialized LeaderBoardRank:
+    the (user id, rank, score, last rank) of the listed learners, their total number and the last refresh
+    """
+    ranks = LeaderBoardRank.objects.filter(org=orgs, period=period)
+    total_user = ranks.count()
+    if top is not None:
+        ranks = ranks.filter(rank__lte=top)
+    rows = list(ranks.order_by('rank').values_list('user_id', 'rank', 'score', 'last_rank', 'refreshed'))
+    return {
+        "ranks": [row[:4] for row in rows],
+        "totalUser": total_user,
+        "refreshed": rows[0][4] if rows else None,
+    }
+
+
+def _leaderboard_data(request, period, orgs, top=None):
+    """
+    reads the ranks of the orgs, refreshed in the background by the refresh_leaderboard_ranks task, the ranking
+    is cached by orgs, period and top until the next refresh, the learner details are read on each request
+    """
+    period = LeaderBoardRank.get_period(period)
+    orgs = orgs or ""
+    cache_key = LeaderBoardRank.get_cache_key(orgs, period, top)
+    cached = cache.get(cache_key)
+    if cached is None:
+        cached = _leaderboard_top_ranks(period, orgs, top)
+        cache.set(cache_key, cached, LEADERBOARD_CACHE_TIMEOUT)
+    ranks = list(cached["ranks"])
+
+    # the requesting learner is shown after the top list if not in it
+    user = request.user if request is not None and top not in (None, LEADERBOARD_DASHBOARD_TOP) else None
+    if user is not None and user.id not in [user_id for user_id, _, _, _ in ranks] \
+            and not user.is_staff and top < cached["totalUser"]:
+        user_rank = LeaderBoardRank.get_user_rank(orgs, period, user.id)
+        if user_rank:
+            ranks.append((user.id, user_rank.rank, user_rank.score, user_rank.last_rank))
+
+    users = User.objects.filter(id__in=[user_id for user_id, _, _, _ in ranks]).select_related('profile').in_bulk()
+    top_list = []
+    for user_id, rank, score, last_rank in ranks:
+        if user_id not in users:
+            continue
+        detail = _leaderboard_user_detail(users[user_id], rank, score, request, top)
+        if top not in (None, LEADERBOARD_DASHBOARD_TOP) and period != "total" and rank <= 3:
+            if last_rank == 0 or last_rank > rank:
+                detail["OrderStatus"] = "up"
+            elif last_rank == rank:
+                detail["OrderStatus"] = "eq"
             else:
-                detail = {"Points": point, "Name": name, "Rank": real_time_rank,
-                          "Portrait": get_profile_image_urls_for_user(i.user, request=request)["medium"],
-                          "DateStr": strftime_localized(i.user.date_joined, "NUMBERIC_SHORT_DATE")}
-                if status and real_time_rank <= 3:
-                    detail["OrderStatus"] = status
-                if i.user == request.user:
-                    detail["Active"] = True
-                    data["mission"] = i.get_leaderboard_detail()
-                    request_user_included = True
-            top_list.append(detail)
-        if not request_user_included and top is not None and top < total_user and not request.user.is_staff:
-            personal_rank = top
-            for i in query_set[top:]:
-                personal_rank += 1
-                if i.user == request.user:
-                    if period == "month":
-                        point = i.current_month_score
-                    elif period == "week":
-                        point = i.current_week_score
-                    else:
-                        point = i.total_score
-
-                    try:
-                        name = i.user.profile.name or i.user.username
-                    except:
-                        name = i.user.username
-                    detail = {"Points": point, "Name": name,
-                              "Portrait": get_profile_image_urls_for_user(i.user, request=request)["medium"],
-                              "Active": True, "Rank": personal_rank,
-                              "DateStr": strftime_localized(i.user.date_joined, "NUMBERIC_SHORT_DATE")}
-                    top_list.append(detail)
-                    data["mission"] = i.get_leaderboard_detail()
-                    break
-        elif request and request.user.is_staff:
-            staff_leaderboard = LeaderBoardView.objects.filter(user=request.user)
-            if staff_leaderboard.exists():
-                staff_leaderboard = staff_leaderboard.first()
-                data['mission'] = staff_leaderboard.get_leaderboard_detail()
-    last_updated = query_set.aggregate(Max("last_updated"))
-    data.update({
-        "list": top_list,
-        "lastUpdate": strftime_localized(last_updated['last_updated__max'], "NUMBERIC_DATE_TIME"),
-        "totalUser": total_user
-    })
+                detail["OrderStatus"] = "down"
+        if user is not None and user_id == user.id:
+            detail["Active"] = True
+        top_list.append(detail)
 
+    data = {
+        "list": top_list,
+        "lastUpdate": strftime_localized(cached["refreshed"], "NUMBERIC_DATE_TIME") if cached["refreshed"] else "",
+        "totalUser": cached["totalUser"]
+    }
+    if user is not None:
+        user_leaderboard = LeaderBoardView.objects.filter(user=user).first()
+        if user_leaderboard:
+            data["mission"] = user_leaderboard.get_leaderboard_detail()
     return data
 
 
@@ -117,7 +117,13 @@ CELERYBEAT_SCHEDULE = {
         'task': 'lms.djangoapps.integrations.slack_lt.tasks.default_slack_message',
         'schedule': crontab(minute=0, hour=0),
         'options': {'queue': 'edx.lms.message'}
-    }
+    },
+    # LEADERBOARD_REFRESH_INTERVAL of triboo_analytics
+    'triboo-analytics-refresh-leaderboard-ranks': {
+        'task': 'triboo_analytics.refresh_leaderboard_ranks',
+        'schedule': datetime.timedelta(seconds=300),
+        'options': {'queue': LEADERBOARD_QUEUE}
+    },
 }  # For scheduling tasks, entries can be added to this dict
 
 ########################## NON-SECURE ENV CONFIG ##############################
@@ -572,6 +578,18 @@ XQUEUE_INTERFACE = AUTH_TOKENS['XQUEUE_INTERFACE']
 # Get the MODULESTORE from auth.json, but if it doesn't exist,
 # use the one from common.py
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
+COURSE_STRUCTURE_LRU_CACHE_SIZE = ENV_TOKENS.get('COURSE_STRUCTURE_LRU_CACHE_SIZE', COURSE_STRUCTURE_LRU_CACHE_SIZE)
+STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE = ENV_TOKENS.get(
+    'STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE', STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE
+)
+CONTENTSERVER_DISK_CACHE_DIR = ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE_DIR', CONTENTSERVER_DISK_CACHE_DIR)
+CONTENTSERVER_DISK_CACHE_SIZE = ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE_SIZE', CONTENTSERVER_DISK_CACHE_SIZE)
+CONTENTSERVER_DISK_CACHE_SENDFILE_HEADER = ENV_TOKENS.get(
+    'CONTENTSERVER_DISK_CACHE_SENDFILE_HEADER', CONTENTSERVER_DISK_CACHE_SENDFILE_HEADER
+)
+CONTENTSERVER_DISK_CACHE_SENDFILE_PREFIX = ENV_TOKENS.get(
+    'CONTENTSERVER_DISK_CACHE_SENDFILE_PREFIX', CONTENTSERVER_DISK_CACHE_SENDFILE_PREFIX
+)
 CONTENTSTORE = AUTH_TOKENS.get('CONTENTSTORE', CONTENTSTORE)
 DOC_STORE_CONFIG = AUTH_TOKENS.get('DOC_STORE_CONFIG', DOC_STORE_CONFIG)
 MONGODB_LOG = AUTH_TOKENS.get('MONGODB_LOG', {})
@@ -659,6 +677,7 @@ POLICY_CHANGE_TASK_RATE_LIMIT = ENV_TOKENS.get('POLICY_CHANGE_TASK_RATE_LIMIT',
 
 # Triboo analytics reports
 TRIBOO_ANALYTICS_REPORTS = ENV_TOKENS.get("TRIBOO_ANALYTICS_REPORTS", TRIBOO_ANALYTICS_REPORTS)
+TRIBOO_ANALYTICS_CONCURRENCY = ENV_TOKENS.get("TRIBOO_ANALYTICS_CONCURRENCY", TRIBOO_ANALYTICS_CONCURRENCY)
 
 # financial reports
 FINANCIAL_REPORTS = ENV_TOKENS.get("FINANCIAL_REPORTS", FINANCIAL_REPORTS)
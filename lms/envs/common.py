@@ -429,6 +429,10 @@ FEATURES = {
 
     # Enable the ILT virtual session email reminder checking
     'ENABLE_ILT_VIRTUAL_SESSION_REMINDER': False,
+
+    # Generate thumbnails and resized variants of uploaded images in the background,
+    # and offer the variants to browsers in a srcset on course images
+    'ENABLE_IMAGE_VARIANTS': False,
 }
 
 # Settings for the course reviews tool template and identification key, set either to None to disable course reviews
@@ -913,6 +917,22 @@ MODULESTORE = {
     }
 }
 
+# Maximum total size, in bytes, of the pickled course structures kept in each process
+# in front of the course_structure_cache, 0 to disable
+COURSE_STRUCTURE_LRU_CACHE_SIZE = 128 * 1024 * 1024
+
+# Maximum number of course asset urls resolved by static_replace kept in each process, 0 to disable
+STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE = 10000
+
+# Local disk cache of the course assets too large for the content cache, served by the
+# contentserver. Disabled when the directory is None.
+CONTENTSERVER_DISK_CACHE_DIR = None
+CONTENTSERVER_DISK_CACHE_SIZE = 10 * 1024 * 1024 * 1024
+# Header letting the web server send the cached files, e.g. 'X-Sendfile' or 'X-Accel-Redirect',
+# None to send them from Django. Its value is the file path, or the file name under the prefix.
+CONTENTSERVER_DISK_CACHE_SENDFILE_HEADER = None
+CONTENTSERVER_DISK_CACHE_SENDFILE_PREFIX = None
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -926,6 +946,17 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Pool of warm sandbox workers, see capa/safe_exec/worker_pool.py.
+    'worker_pool': {
+        # How many workers each process can start.  0 disables the pool.
+        'size': 0,
+        # How many executions a worker runs before it's recycled.
+        'max_runs': 100,
+        # How many workers all the processes of the host can start.  None
+        # means size, for a single process per host.
+        'host_size': None,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1315,6 +1346,7 @@ MIDDLEWARE_CLASSES = [
 
     'django_comment_client.utils.ViewNameMiddleware',
     'codejail.django_integration.ConfigureCodeJailMiddleware',
+    'capa.safe_exec.django_integration.ConfigureWorkerPoolMiddleware',
 
     # catches any uncaught RateLimitExceptions and returns a 403 instead of a 500
     'ratelimitbackend.middleware.RateLimitMiddleware',
@@ -2684,6 +2716,9 @@ TRIBOO_ANALYTICS_REPORTS = {
     'ROOT_PATH': '/tmp/edx-s3/analytics',
 }
 
+# Number of processes generating the learner course reports, 0 for twice the number of CPUs
+TRIBOO_ANALYTICS_CONCURRENCY = 0
+
 FINANCIAL_REPORTS = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-financial-reports',
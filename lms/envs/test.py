@@ -217,6 +217,12 @@ CACHES = {
     },
 }
 
+# Tests count the course structure cache and mongo calls
+COURSE_STRUCTURE_LRU_CACHE_SIZE = 0
+
+# Tests change course assets without going through del_cached_content
+STATIC_REPLACE_RESOLVED_URL_CACHE_SIZE = 0
+
 # Dummy secret key for dev
 SECRET_KEY = '85920908f28904ed733fe576320db18cabd7b6cd'
 
@@ -1079,6 +1079,7 @@ if settings.FEATURES.get('ENABLE_DEBUG_RUN_PYTHON'):
 
 urlpatterns += [
     url(r'^debug/show_parameters$', debug_views.show_parameters),
+    url(r'^debug/cache_stats$', debug_views.show_cache_stats),
 ]
 
 
@@ -8,7 +8,6 @@ The following internal data structures are implemented:
     _BlockRelations - Data structure for a single block's relations.
     _BlockData - Data structure for a single block's data.
 """
-from copy import deepcopy
 from functools import partial
 from logging import getLogger
 
@@ -39,6 +38,16 @@ class _BlockRelations(object):
         # list [UsageKey]
         self.children = []
 
+    def copy(self):
+        """
+        Returns a copy of these relations. Usage keys are immutable
+        and are shared with the copy.
+        """
+        block_relations = _BlockRelations()
+        block_relations.parents = list(self.parents)
+        block_relations.children = list(self.children)
+        return block_relations
+
 
 class BlockStructure(object):
     """
@@ -347,6 +356,18 @@ class TransformerDataMap(dict):
         key = self._translate_key(key)
         dict.__delitem__(self, key)
 
+    def copy(self):
+        """
+        Returns a copy of this map whose TransformerData can be modified
+        without affecting this map. Field values are shared.
+        """
+        transformer_data_map = TransformerDataMap()
+        for transformer_name, transformer_data in self.iteritems():
+            transformer_data_copy = TransformerData()
+            transformer_data_copy.fields = dict(transformer_data.fields)
+            transformer_data_map[transformer_name] = transformer_data_copy
+        return transformer_data_map
+
     def get_or_create(self, key):
         """
         Returns the TransformerData associated with the given
@@ -391,6 +412,17 @@ class BlockData(FieldData):
         # Map of transformer name to its block-specific data.
         self.transformer_data = TransformerDataMap()
 
+    def copy(self):
+        """
+        Returns a copy of this BlockData whose fields and transformer data
+        can be modified without affecting this instance. Field values are
+        shared.
+        """
+        block_data = BlockData(self.location)
+        block_data.fields = dict(self.fields)
+        block_data.transformer_data = self.transformer_data.copy()
+        return block_data
+
 
 class BlockStructureBlockData(BlockStructure):
     """
@@ -414,18 +446,31 @@ class BlockStructureBlockData(BlockStructure):
         # Map of a transformer's name to its non-block-specific data.
         self.transformer_data = TransformerDataMap()
 
+        # Usage keys of the blocks whose BlockData is shared with another
+        # block structure, and is copied before being modified.
+        # set {UsageKey}
+        self._shared_block_keys = set()
+
     def copy(self):
         """
-        Returns a new instance of BlockStructureBlockData with a
-        deep-copy of this instance's contents.
+        Returns a new instance of BlockStructureBlockData with a copy of
+        this instance's relations and transformer data.
+
+        The BlockData of the blocks are shared by both instances until
+        one of them modifies a block, which then gets its own copy
+        (copy-on-write). Copying a large collected structure for each
+        transformation is therefore cheap.
         """
         from .factory import BlockStructureFactory
-        return BlockStructureFactory.create_new(
+        block_structure = BlockStructureFactory.create_new(
             self.root_block_usage_key,
-            deepcopy(self._block_relations),
-            deepcopy(self.transformer_data),
-            deepcopy(self._block_data_map),
+            {usage_key: relations.copy() for usage_key, relations in self._block_relations.iteritems()},
+            self.transformer_data.copy(),
+            dict(self._block_data_map),
         )
+        self._shared_block_keys = set(self._block_data_map)
+        block_structure._shared_block_keys = set(self._block_data_map)  # pylint: disable=protected-access
+        return block_structure
 
     def iteritems(self):
         """
@@ -479,7 +524,7 @@ class BlockStructureBlockData(BlockStructure):
 
             override_data (object) - The data you want to set
         """
-        block_data = self._block_data_map.get(usage_key)
+        block_data = self._get_own_block(usage_key) if usage_key in self._block_data_map else None
         setattr(block_data, field_name, override_data)
 
     def get_transformer_data(self, transformer, key, default=None):
@@ -593,7 +638,7 @@ class BlockStructureBlockData(BlockStructure):
                 whose data entry is to be deleted.
         """
         try:
-            transformer_block_data = self.get_transformer_block_data(usage_key, transformer)
+            transformer_block_data = self._get_own_block(usage_key).transformer_data[transformer]
             delattr(transformer_block_data, key)
         except (AttributeError, KeyError):
             pass
@@ -632,6 +677,7 @@ class BlockStructureBlockData(BlockStructure):
         # Remove block.
         self._block_relations.pop(usage_key, None)
         self._block_data_map.pop(usage_key, None)
+        self._shared_block_keys.discard(usage_key)
 
         # Recreate the graph connections if descendants are to be kept.
         if keep_descendants:
@@ -750,14 +796,29 @@ class BlockStructureBlockData(BlockStructure):
             raise TransformerException('Version attributes are not set on transformer {0}.', transformer.name())
         self.set_transformer_data(transformer, TRANSFORMER_VERSION_KEY, transformer.WRITE_VERSION)
 
+    def _get_own_block(self, usage_key):
+        """
+        Returns the BlockData associated with the given usage_key,
+        copying it first if it is shared with another block structure,
+        so that it can be modified.
+
+        Raises KeyError if not found.
+        """
+        block_data = self._block_data_map[usage_key]
+        if usage_key in self._shared_block_keys:
+            block_data = block_data.copy()
+            self._block_data_map[usage_key] = block_data
+            self._shared_block_keys.discard(usage_key)
+        return block_data
+
     def _get_or_create_block(self, usage_key):
         """
-        Returns the BlockData associated with the given usage_key.
-        If not found, creates and returns a new BlockData and
-        maps it to the given key.
+        Returns the BlockData associated with the given usage_key,
+        which can be modified. If not found, creates and returns a new
+        BlockData and maps it to the given key.
         """
         try:
-            return self._block_data_map[usage_key]
+            return self._get_own_block(usage_key)
         except KeyError:
             block_data = BlockData(usage_key)
             self._block_data_map[usage_key] = block_data
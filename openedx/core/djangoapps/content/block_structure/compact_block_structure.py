@@ -0,0 +1,482 @@
+"""
+Array-backed alternative to BlockStructureBlockData.
+
+CompactBlockStructureBlockData keeps the same public API as
+BlockStructureBlockData, but instead of a _BlockRelations object and a
+BlockData object per block, it:
+
+    * interns the usage keys of the blocks to integer ids,
+    * stores the children and parents of all the blocks in CSR-style
+      arrays (an offsets array and an ids array per relation),
+    * stores each xBlock field and each transformer block field in a
+      column, a list indexed by block id.
+
+The arrays are never modified: removed blocks and edited relations are
+recorded in small per-structure overlays, and columns are copied when
+first written to. Copies of a structure therefore share all of its
+arrays and columns, and traversals work on integer ids.
+
+BlockData objects returned by __getitem__, iteritems and itervalues are
+built on demand and are read-only views; use the structure's methods to
+modify the blocks.
+"""
+# pylint: disable=protected-access
+from array import array
+
+from openedx.core.lib.graph_traversals import traverse_post_order, traverse_topologically
+
+from .block_structure import _BlockRelations, BlockData, BlockStructureBlockData, TransformerData, TransformerDataMap
+
+
+# Column value of blocks that do not have the field.
+_MISSING = object()
+
+# Column key of the xBlock fields, in place of a transformer name.
+_XBLOCK_FIELDS = None
+
+
+def _transformer_name(transformer):
+    """
+    Returns the name of the given transformer, which is either the
+    transformer's class or its name.
+    """
+    try:
+        return transformer.name()
+    except AttributeError:
+        return transformer
+
+
+def _csr_arrays(rows):
+    """
+    Returns the offsets and ids arrays storing the given lists of ids,
+    the ids of row i being ids[offsets[i]:offsets[i + 1]].
+    """
+    offsets = array('l', [0])
+    ids = array('l')
+    for row in rows:
+        ids.extend(row)
+        offsets.append(len(ids))
+    return offsets, ids
+
+
+class CompactBlockStructureBlockData(BlockStructureBlockData):
+    """
+    BlockStructureBlockData storing its blocks in arrays and columns
+    indexed by integer block ids.
+    """
+    def __init__(self, root_block_usage_key):  # pylint: disable=super-init-not-called
+        self.root_block_usage_key = root_block_usage_key
+        self.transformer_data = TransformerDataMap()
+        self._build({root_block_usage_key: _BlockRelations()}, {})
+
+    @classmethod
+    def create_new(cls, root_block_usage_key, block_relations, transformer_data, block_data_map):
+        """
+        Returns a new compact block structure for the given relations,
+        transformer data and block data, as created by
+        BlockStructureFactory.create_new.
+        """
+        block_structure = cls.__new__(cls)
+        block_structure.root_block_usage_key = root_block_usage_key
+        block_structure.transformer_data = transformer_data
+        block_structure._build(block_relations, block_data_map)
+        return block_structure
+
+    def _build(self, block_relations, block_data_map):
+        """
+        Interns the usage keys of the given blocks and builds the
+        relation arrays and field columns.
+        """
+        # List of usage keys, indexed by block id.
+        # list [UsageKey]
+        self._keys = list(block_relations)
+        self._keys.extend(usage_key for usage_key in block_data_map if usage_key not in block_relations)
+
+        # Map of a usage key to its block id.
+        # dict {UsageKey: int}
+        self._ids = {usage_key: block_id for block_id, usage_key in enumerate(self._keys)}
+
+        num_blocks = len(self._keys)
+        no_relations = ((), ())
+        relations = [
+            (block_relations[usage_key].children, block_relations[usage_key].parents)
+            if usage_key in block_relations else no_relations
+            for usage_key in self._keys
+        ]
+        self._child_offsets, self._child_ids = _csr_arrays(
+            [self._ids[child] for child in children] for children, __ in relations
+        )
+        self._parent_offsets, self._parent_ids = _csr_arrays(
+            [self._ids[parent] for parent in parents] for __, parents in relations
+        )
+
+        # Maps of a block id to its edited children/parents ids, taking
+        # precedence over the relation arrays.
+        # dict {int: [int]}
+        self._children_overrides = {}
+        self._parents_overrides = {}
+
+        # Whether each block is in the structure, and has block data.
+        self._in_structure = bytearray(1 if usage_key in block_relations else 0 for usage_key in self._keys)
+        self._has_data = bytearray(1 if usage_key in block_data_map else 0 for usage_key in self._keys)
+        self._num_blocks_in_structure = len(block_relations)
+
+        # Map of a (transformer name or _XBLOCK_FIELDS, field name) pair
+        # to the column of the field values, indexed by block id.
+        # dict {(string, string): [any picklable type]}
+        self._columns = {}
+        for block_id, usage_key in enumerate(self._keys):
+            block_data = block_data_map.get(usage_key)
+            if block_data is None:
+                continue
+            for field_name, value in block_data.fields.iteritems():
+                self._column((_XBLOCK_FIELDS, field_name), num_blocks)[block_id] = value
+            for transformer_name, transformer_block_data in block_data.transformer_data.iteritems():
+                for field_name, value in transformer_block_data.fields.iteritems():
+                    self._column((transformer_name, field_name), num_blocks)[block_id] = value
+
+        # Keys of the columns shared with another block structure, which
+        # are copied before being modified.
+        # set {(string, string)}
+        self._shared_columns = set()
+
+    def copy(self):
+        """
+        Returns a new instance of CompactBlockStructureBlockData sharing
+        the relation arrays and field columns of this instance, which
+        are copied by either instance before being modified.
+        """
+        block_structure = self.__class__.__new__(self.__class__)
+        block_structure.root_block_usage_key = self.root_block_usage_key
+        block_structure.transformer_data = self.transformer_data.copy()
+        block_structure._keys = self._keys
+        block_structure._ids = self._ids
+        block_structure._child_offsets = self._child_offsets
+        block_structure._child_ids = self._child_ids
+        block_structure._parent_offsets = self._parent_offsets
+        block_structure._parent_ids = self._parent_ids
+        block_structure._children_overrides = {
+            block_id: list(children) for block_id, children in self._children_overrides.iteritems()
+        }
+        block_structure._parents_overrides = {
+            block_id: list(parents) for block_id, parents in self._parents_overrides.iteritems()
+        }
+        block_structure._in_structure = bytearray(self._in_structure)
+        block_structure._has_data = bytearray(self._has_data)
+        block_structure._num_blocks_in_structure = self._num_blocks_in_structure
+        block_structure._columns = dict(self._columns)
+        self._shared_columns = set(self._columns)
+        block_structure._shared_columns = set(self._columns)
+        return block_structure
+
+    #--- Block structure relation methods ---#
+
+    def __len__(self):
+        return self._num_blocks_in_structure
+
+    def __contains__(self, usage_key):
+        block_id = self._ids.get(usage_key)
+        return block_id is not None and bool(self._in_structure[block_id])
+
+    def get_block_keys(self):
+        keys = self._keys
+        return (keys[block_id] for block_id in self._iter_block_ids())
+
+    def get_parents(self, usage_key):
+        if usage_key not in self:
+            return []
+        keys = self._keys
+        return [keys[parent_id] for parent_id in self._get_parent_ids(self._ids[usage_key])]
+
+    def get_children(self, usage_key):
+        if usage_key not in self:
+            return []
+        keys = self._keys
+        return [keys[child_id] for child_id in self._get_child_ids(self._ids[usage_key])]
+
+    def set_root_block(self, usage_key):
+        self.root_block_usage_key = usage_key
+        self._parents_overrides[self._ids[usage_key]] = []
+
+    #--- Block structure traversal methods ---#
+
+    def topological_traversal(
+            self,
+            filter_func=None,
+            yield_descendants_of_unyielded=False,
+            start_node=None,
+    ):
+        keys = self._keys
+        block_ids = traverse_topologically(
+            start_node=self._ids[start_node or self.root_block_usage_key],
+            get_parents=self._get_parent_ids,
+            get_children=self._get_child_ids,
+            filter_func=self._id_filter(filter_func),
+            yield_descendants_of_unyielded=yield_descendants_of_unyielded,
+        )
+        return (keys[block_id] for block_id in block_ids)
+
+    def post_order_traversal(
+            self,
+            filter_func=None,
+            start_node=None,
+    ):
+        keys = self._keys
+        block_ids = traverse_post_order(
+            start_node=self._ids[start_node or self.root_block_usage_key],
+            get_children=self._get_child_ids,
+            filter_func=self._id_filter(filter_func),
+        )
+        return (keys[block_id] for block_id in block_ids)
+
+    #--- Block data methods ---#
+
+    def iteritems(self):
+        return ((usage_key, self[usage_key]) for usage_key in self._iter_data_keys())
+
+    def itervalues(self):
+        return (self[usage_key] for usage_key in self._iter_data_keys())
+
+    def __getitem__(self, usage_key):
+        """
+        Returns a read-only BlockData built from the columns of the
+        block with the given key.
+        """
+        block_id = self._get_data_id(usage_key)
+        block_data = BlockData(usage_key)
+        for (transformer_name, field_name), column in self._columns.iteritems():
+            value = column[block_id]
+            if value is _MISSING:
+                continue
+            if transformer_name is _XBLOCK_FIELDS:
+                block_data.fields[field_name] = value
+            else:
+                block_data.transformer_data.get_or_create(transformer_name).fields[field_name] = value
+        return block_data
+
+    def get_xblock_field(self, usage_key, field_name, default=None):
+        return self._get_field(usage_key, _XBLOCK_FIELDS, field_name, default)
+
+    def override_xblock_field(self, usage_key, field_name, override_data):
+        self._set_field(self._get_data_id(usage_key), _XBLOCK_FIELDS, field_name, override_data)
+
+    def get_transformer_block_data(self, usage_key, transformer):
+        transformer_name = _transformer_name(transformer)
+        block_id = self._get_data_id(usage_key)
+        transformer_data = TransformerData()
+        for (column_transformer_name, field_name), column in self._columns.iteritems():
+            if column_transformer_name == transformer_name and column[block_id] is not _MISSING:
+                transformer_data.fields[field_name] = column[block_id]
+        if not transformer_data.fields:
+            raise KeyError(transformer_name)
+        return transformer_data
+
+    def get_transformer_block_field(self, usage_key, transformer, key, default=None):
+        return self._get_field(usage_key, _transformer_name(transformer), key, default)
+
+    def set_transformer_block_field(self, usage_key, transformer, key, value):
+        self._set_field(self._get_or_create_block_id(usage_key), _transformer_name(transformer), key, value)
+
+    def remove_transformer_block_field(self, usage_key, transformer, key):
+        column_key = (_transformer_name(transformer), key)
+        block_id = self._ids.get(usage_key)
+        if block_id is None or column_key not in self._columns:
+            return
+        self._writable_column(column_key)[block_id] = _MISSING
+
+    def remove_block(self, usage_key, keep_descendants):
+        block_id = self._ids[usage_key]
+        children = self._get_child_ids(block_id)
+        parents = self._get_parent_ids(block_id)
+
+        # Remove block from its children.
+        for child_id in children:
+            self._writable_parent_ids(child_id).remove(block_id)
+
+        # Remove block from its parents.
+        for parent_id in parents:
+            self._writable_child_ids(parent_id).remove(block_id)
+
+        # Remove block.
+        if self._in_structure[block_id]:
+            self._in_structure[block_id] = 0
+            self._num_blocks_in_structure -= 1
+        self._has_data[block_id] = 0
+        self._children_overrides[block_id] = []
+        self._parents_overrides[block_id] = []
+
+        # Recreate the graph connections if descendants are to be kept.
+        if keep_descendants:
+            for child_id in children:
+                for parent_id in parents:
+                    self._writable_child_ids(parent_id).append(child_id)
+                    self._writable_parent_ids(child_id).append(parent_id)
+
+    #--- Internal methods ---#
+
+    def _prune_unreachable(self):
+        reachable_ids = set(traverse_post_order(
+            start_node=self._ids[self.root_block_usage_key],
+            get_children=self._get_child_ids,
+        ))
+        for block_id in list(self._iter_block_ids()):
+            if block_id not in reachable_ids:
+                self._in_structure[block_id] = 0
+                self._children_overrides[block_id] = []
+                self._parents_overrides[block_id] = []
+                continue
+            for get_ids, overrides in (
+                    (self._get_child_ids, self._children_overrides),
+                    (self._get_parent_ids, self._parents_overrides),
+            ):
+                related_ids = get_ids(block_id)
+                reachable_related_ids = [related_id for related_id in related_ids if related_id in reachable_ids]
+                if len(reachable_related_ids) != len(related_ids):
+                    overrides[block_id] = reachable_related_ids
+        self._num_blocks_in_structure = len(reachable_ids)
+
+    def _add_relation(self, parent_key, child_key):
+        parent_id = self._get_or_create_block_id(parent_key, in_structure=True)
+        child_id = self._get_or_create_block_id(child_key, in_structure=True)
+        self._writable_parent_ids(child_id).append(parent_id)
+        self._writable_child_ids(parent_id).append(child_id)
+
+    def _get_or_create_block(self, usage_key):
+        """
+        Returns a read-only BlockData of the block with the given key,
+        creating the block if needed.
+        """
+        self._get_or_create_block_id(usage_key)
+        return self[usage_key]
+
+    def _iter_block_ids(self):
+        """
+        Returns an iterator of the ids of the blocks in the structure.
+        """
+        in_structure = self._in_structure
+        return (block_id for block_id in xrange(len(self._keys)) if in_structure[block_id])
+
+    def _iter_data_keys(self):
+        """
+        Returns an iterator of the usage keys of the blocks that have block data.
+        """
+        has_data = self._has_data
+        keys = self._keys
+        return (keys[block_id] for block_id in xrange(len(keys)) if has_data[block_id])
+
+    def _get_child_ids(self, block_id):
+        """
+        Returns the ids of the children of the given block.
+        """
+        children = self._children_overrides.get(block_id)
+        if children is not None:
+            return children
+        return self._child_ids[self._child_offsets[block_id]:self._child_offsets[block_id + 1]]
+
+    def _get_parent_ids(self, block_id):
+        """
+        Returns the ids of the parents of the given block.
+        """
+        parents = self._parents_overrides.get(block_id)
+        if parents is not None:
+            return parents
+        return self._parent_ids[self._parent_offsets[block_id]:self._parent_offsets[block_id + 1]]
+
+    def _writable_child_ids(self, block_id):
+        """
+        Returns the overlay list of the children ids of the given block.
+        """
+        if block_id not in self._children_overrides:
+            self._children_overrides[block_id] = list(self._get_child_ids(block_id))
+        return self._children_overrides[block_id]
+
+    def _writable_parent_ids(self, block_id):
+        """
+        Returns the overlay list of the parents ids of the given block.
+        """
+        if block_id not in self._parents_overrides:
+            self._parents_overrides[block_id] = list(self._get_parent_ids(block_id))
+        return self._parents_overrides[block_id]
+
+    def _id_filter(self, filter_func):
+        """
+        Returns the given filter function on usage keys as a filter function on block ids.
+        """
+        if filter_func is None:
+            return None
+        keys = self._keys
+        return lambda block_id: filter_func(keys[block_id])
+
+    def _get_data_id(self, usage_key):
+        """
+        Returns the id of the block with the given key.
+
+        Raises KeyError if the block has no block data.
+        """
+        block_id = self._ids[usage_key]
+        if not self._has_data[block_id]:
+            raise KeyError(usage_key)
+        return block_id
+
+    def _get_or_create_block_id(self, usage_key, in_structure=False):
+        """
+        Returns the id of the block with the given key, adding the block
+        to the structure's relations if in_structure, else to its block
+        data. The arrays of a new block are extended with empty relations,
+        without modifying the arrays shared with other structures.
+        """
+        block_id = self._ids.get(usage_key)
+        if block_id is None:
+            block_id = len(self._keys)
+            self._keys = self._keys + [usage_key]
+            self._ids = dict(self._ids)
+            self._ids[usage_key] = block_id
+            self._child_offsets = self._child_offsets + array('l', [self._child_offsets[-1]])
+            self._parent_offsets = self._parent_offsets + array('l', [self._parent_offsets[-1]])
+            self._in_structure.append(0)
+            self._has_data.append(0)
+            for column_key, column in self._columns.items():
+                self._columns[column_key] = column + [_MISSING]
+                self._shared_columns.discard(column_key)
+        if not in_structure:
+            self._has_data[block_id] = 1
+        elif not self._in_structure[block_id]:
+            self._in_structure[block_id] = 1
+            self._num_blocks_in_structure += 1
+        return block_id
+
+    def _get_field(self, usage_key, transformer_name, field_name, default):
+        """
+        Returns the value of the given field of the given block, or default.
+        """
+        column = self._columns.get((transformer_name, field_name))
+        block_id = self._ids.get(usage_key)
+        if column is None or block_id is None or not self._has_data[block_id]:
+            return default
+        value = column[block_id]
+        return default if value is _MISSING else value
+
+    def _set_field(self, block_id, transformer_name, field_name, value):
+        """
+        Sets the value of the given field of the given block.
+        """
+        self._writable_column((transformer_name, field_name))[block_id] = value
+
+    def _column(self, column_key, num_blocks):
+        """
+        Returns the column with the given key, creating it if needed.
+        """
+        column = self._columns.get(column_key)
+        if column is None:
+            column = self._columns[column_key] = [_MISSING] * num_blocks
+        return column
+
+    def _writable_column(self, column_key):
+        """
+        Returns the column with the given key, creating it if needed, or
+        copying it if it is shared with another block structure.
+        """
+        if column_key in self._shared_columns:
+            self._columns[column_key] = list(self._columns[column_key])
+            self._shared_columns.discard(column_key)
+        return self._column(column_key, len(self._keys))
@@ -0,0 +1,118 @@
+"""
+Command to compare the block structure engines on a generated course.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from openedx.core.djangoapps.content.block_structure.block_structure import BlockStructureBlockData
+from openedx.core.djangoapps.content.block_structure.compact_block_structure import CompactBlockStructureBlockData
+from openedx.core.djangoapps.content.block_structure.factory import BlockStructureFactory
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+
+# Number of children of a block of each type.
+CHILDREN_PER_BLOCK = (('course', 10), ('chapter', 10), ('sequential', 5), ('vertical', 9), ('problem', 0))
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_block_structures --settings=devstack
+        $ ./manage.py lms benchmark_block_structures --iterations 50 --settings=devstack
+    """
+    help = u'Compares the default and compact block structure engines on a generated course of about 5k blocks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help=u'Number of times each operation is timed.',
+        )
+
+    def handle(self, *args, **options):
+        serialized_data = zpickle(self._generate_course())
+        engines = (
+            ('default', BlockStructureFactory.create_new),
+            ('compact', CompactBlockStructureBlockData.create_new),
+        )
+        for engine_name, create_new in engines:
+            collected = self._deserialize(create_new, serialized_data)
+            timings = (
+                ('deserialize', lambda: self._deserialize(create_new, serialized_data)),
+                ('copy', collected.copy),
+                ('traverse', lambda: self._traverse(collected)),
+                ('copy and filter', lambda: self._filter(collected.copy())),
+            )
+            for operation, func in timings:
+                self.stdout.write(u'{:8} {:16} {:8.2f} ms ({} blocks)'.format(
+                    engine_name, operation, self._time(func, options['iterations']), len(collected),
+                ))
+
+    @staticmethod
+    def _generate_course():
+        """
+        Returns the relations, transformer data and block data of a
+        collected structure for a course of about 5k blocks.
+        """
+        block_structure = BlockStructureBlockData('course-0')
+        parents = ['course-0']
+        for (__, num_children), (child_type, __) in zip(CHILDREN_PER_BLOCK, CHILDREN_PER_BLOCK[1:]):
+            children = []
+            for parent in parents:
+                for __ in range(num_children):
+                    child = u'{}-{}'.format(child_type, len(children))
+                    block_structure._add_relation(parent, child)  # pylint: disable=protected-access
+                    children.append(child)
+            parents = children
+
+        for index, block_key in enumerate(block_structure):
+            block_data = block_structure._get_or_create_block(block_key)  # pylint: disable=protected-access
+            block_data.display_name = u'Block {}'.format(index)
+            block_data.visible_to_staff_only = index % 10 == 0
+            block_data.graded = index % 2 == 0
+            block_data.weight = 1.0
+            block_structure.set_transformer_block_field(block_key, 'grades', 'max_score', 1.0)
+            block_structure.set_transformer_block_field(block_key, 'visibility', 'merged_visible_to_staff_only', False)
+        return (
+            block_structure._block_relations,  # pylint: disable=protected-access
+            block_structure.transformer_data,
+            block_structure._block_data_map,  # pylint: disable=protected-access
+        )
+
+    @staticmethod
+    def _deserialize(create_new, serialized_data):
+        """
+        Returns the block structure created by create_new from the serialized data.
+        """
+        block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
+        return create_new('course-0', block_relations, transformer_data, block_data_map)
+
+    @staticmethod
+    def _traverse(block_structure):
+        """
+        Reads a field of each block in topological order.
+        """
+        for block_key in block_structure.topological_traversal():
+            block_structure.get_xblock_field(block_key, 'visible_to_staff_only')
+
+    @staticmethod
+    def _filter(block_structure):
+        """
+        Removes the blocks visible to staff only, as the visibility transformer does.
+        """
+        block_structure.remove_block_traversal(
+            lambda block_key: block_structure.get_xblock_field(block_key, 'visible_to_staff_only'),
+        )
+        block_structure._prune_unreachable()  # pylint: disable=protected-access
+
+    @staticmethod
+    def _time(func, iterations):
+        """
+        Returns the average duration of func in milliseconds.
+        """
+        start = time.time()
+        for __ in range(iterations):
+            func()
+        return (time.time() - start) * 1000 / iterations
@@ -60,7 +60,9 @@ class BlockStructureManager(object):
             BlockStructureBlockData - A transformed block structure,
                 starting at starting_block_usage_key.
         """
-        block_structure = collected_block_structure.copy() if collected_block_structure else self.get_collected()
+        # The collected block structure may be shared with other requests of
+        # this process, so transformers get a copy-on-write copy of it.
+        block_structure = (collected_block_structure or self.get_collected()).copy()
 
         if starting_block_usage_key:
             # Override the root_block_usage_key so traversals start at the
@@ -88,7 +90,9 @@ class BlockStructureManager(object):
         Returns:
             BlockStructureBlockData - A collected block structure,
                 starting at root_block_usage_key, with collected data
-                from each registered transformer.
+                from each registered transformer. It may be shared with
+                other callers in this process and must not be modified;
+                use its copy method to get a modifiable structure.
         """
         try:
             block_structure = BlockStructureFactory.create_from_store(
@@ -2,12 +2,15 @@
 Module for the Storage of BlockStructure objects.
 """
 # pylint: disable=protected-access
+from collections import OrderedDict
 from logging import getLogger
+from threading import Lock
 
 from openedx.core.lib.cache_utils import zpickle, zunpickle
 
 from . import config
 from .block_structure import BlockStructureBlockData
+from .compact_block_structure import CompactBlockStructureBlockData
 from .exceptions import BlockStructureNotFound
 from .factory import BlockStructureFactory
 from .models import BlockStructureModel
@@ -16,6 +19,15 @@ from .transformer_registry import TransformerRegistry
 
 logger = getLogger(__name__)  # pylint: disable=C0103
 
+# Maximum number of deserialized block structures kept by each process.
+DESERIALIZED_CACHE_SIZE = 8
+
+# Map of a root block usage key to the serialized data last read for it
+# and the block structure deserialized from it, in least recently used order.
+# OrderedDict {UsageKey: (str, BlockStructureBlockData)}
+_deserialized_cache = OrderedDict()
+_deserialized_cache_lock = Lock()
+
 
 class StubModel(object):
     """
@@ -203,15 +215,41 @@ class BlockStructureStore(object):
     def _deserialize(self, serialized_data, root_block_usage_key):
         """
         Deserializes the given data and returns the parsed block_structure.
-        """
+
+        The block structure last deserialized in this process for the same
+        root_block_usage_key and serialized_data is returned as is, without
+        unpickling it again. It is shared by all the callers and must not
+        be modified.
+
+        When the COMPACT_BLOCK_STRUCTURES switch is enabled, the block
+        structure is a CompactBlockStructureBlockData.
+        """
+        compact = config.waffle().is_enabled(config.COMPACT_BLOCK_STRUCTURES)
+        with _deserialized_cache_lock:
+            cached = _deserialized_cache.pop(root_block_usage_key, None)
+            if (
+                    cached is not None and
+                    cached[0] == serialized_data and
+                    isinstance(cached[1], CompactBlockStructureBlockData) == compact
+            ):
+                _deserialized_cache[root_block_usage_key] = cached
+                return cached[1]
+
         block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
-        return BlockStructureFactory.create_new(
+        create_new = CompactBlockStructureBlockData.create_new if compact else BlockStructureFactory.create_new
+        block_structure = create_new(
             root_block_usage_key,
             block_relations,
             transformer_data,
             block_data_map,
         )
 
+        with _deserialized_cache_lock:
+            _deserialized_cache[root_block_usage_key] = (serialized_data, block_structure)
+            while len(_deserialized_cache) > DESERIALIZED_CACHE_SIZE:
+                _deserialized_cache.popitem(last=False)
+        return block_structure
+
     @staticmethod
     def _encode_root_cache_key(bs_model):
         """
@@ -308,3 +308,22 @@ class TestBlockStructureData(TestCase, ChildrenMapTestMixin):
         _set_value(new_copy, 'edit2')
         self.assertEquals(_get_value(block_structure), 'edit1')
         self.assertEquals(_get_value(new_copy), 'edit2')
+
+    def test_copy_on_write(self):
+        block_structure = self.create_block_structure(ChildrenMapTestMixin.LINEAR_CHILDREN_MAP)
+        block_structure.set_transformer_block_field(1, 'transformer', 'test_key', 'original_value')
+        new_copy = block_structure.copy()
+
+        # block data is shared until modified
+        self.assertIs(new_copy[1], block_structure[1])
+        new_copy.override_xblock_field(1, 'display_name', 'overridden')
+        self.assertIsNot(new_copy[1], block_structure[1])
+        self.assertIs(new_copy[2], block_structure[2])
+        self.assertEquals(new_copy.get_xblock_field(1, 'display_name'), 'overridden')
+        self.assertIsNone(block_structure.get_xblock_field(1, 'display_name'))
+
+        new_copy.remove_transformer_block_field(1, 'transformer', 'test_key')
+        self.assertIsNone(new_copy.get_transformer_block_field(1, 'transformer', 'test_key'))
+        self.assertEquals(
+            block_structure.get_transformer_block_field(1, 'transformer', 'test_key'), 'original_value'
+        )
@@ -0,0 +1,119 @@
+"""
+Tests for compact_block_structure.py
+"""
+# pylint: disable=protected-access
+import itertools
+from unittest import TestCase
+
+import ddt
+from nose.plugins.attrib import attr
+
+from ..compact_block_structure import CompactBlockStructureBlockData
+from .helpers import ChildrenMapTestMixin
+
+
+@attr(shard=2)
+@ddt.ddt
+class TestCompactBlockStructureBlockData(TestCase, ChildrenMapTestMixin):
+    """
+    Tests for CompactBlockStructureBlockData, compared with BlockStructureBlockData
+    """
+    def create_structures(self, children_map):
+        """
+        Returns a default and a compact block structure for the given children_map,
+        with transformer data for even blocks.
+        """
+        block_structure = self.create_block_structure(children_map)
+        for block_key in range(0, len(children_map), 2):
+            block_structure.set_transformer_block_field(block_key, 'transformer', 'test_key', block_key)
+        compact_block_structure = CompactBlockStructureBlockData.create_new(
+            block_structure.root_block_usage_key,
+            block_structure._block_relations,
+            block_structure.transformer_data.copy(),
+            block_structure._block_data_map,
+        )
+        return block_structure, compact_block_structure
+
+    @ddt.data(
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    )
+    def test_relations(self, children_map):
+        block_structure, compact_block_structure = self.create_structures(children_map)
+        self.assert_block_structure(compact_block_structure, children_map)
+        self.assertEquals(len(compact_block_structure), len(children_map))
+        self.assertEquals(
+            list(compact_block_structure.topological_traversal()),
+            list(block_structure.topological_traversal()),
+        )
+        self.assertEquals(
+            list(compact_block_structure.post_order_traversal()),
+            list(block_structure.post_order_traversal()),
+        )
+
+    def test_empty_structure(self):
+        block_structure = self.create_block_structure(
+            ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP, block_structure_cls=CompactBlockStructureBlockData,
+        )
+        self.assert_block_structure(block_structure, ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+
+    @ddt.data(
+        *itertools.product(
+            [True, False],
+            range(1, 7),
+            [
+                ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+                ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+                ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+            ],
+        )
+    )
+    @ddt.unpack
+    def test_remove_block(self, keep_descendants, block_to_remove, children_map):
+        if block_to_remove >= len(children_map):
+            return
+
+        block_structure, compact_block_structure = self.create_structures(children_map)
+        block_structure.remove_block(block_to_remove, keep_descendants)
+        block_structure._prune_unreachable()
+        compact_block_structure.remove_block(block_to_remove, keep_descendants)
+        compact_block_structure._prune_unreachable()
+
+        self.assertEquals(set(compact_block_structure), set(block_structure))
+        for block_key in block_structure:
+            self.assertEquals(
+                set(compact_block_structure.get_children(block_key)), set(block_structure.get_children(block_key)),
+            )
+            self.assertEquals(
+                set(compact_block_structure.get_parents(block_key)), set(block_structure.get_parents(block_key)),
+            )
+
+    def test_fields(self):
+        __, compact_block_structure = self.create_structures(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        self.assertEquals(compact_block_structure.get_transformer_block_field(2, 'transformer', 'test_key'), 2)
+        self.assertIsNone(compact_block_structure.get_transformer_block_field(1, 'transformer', 'test_key'))
+        self.assertEquals(compact_block_structure[2].transformer_data['transformer'].test_key, 2)
+
+        compact_block_structure.override_xblock_field(2, 'display_name', 'Block 2')
+        self.assertEquals(compact_block_structure.get_xblock_field(2, 'display_name'), 'Block 2')
+        self.assertEquals(compact_block_structure[2].display_name, 'Block 2')
+
+        compact_block_structure.remove_transformer_block_field(2, 'transformer', 'test_key')
+        self.assertIsNone(compact_block_structure.get_transformer_block_field(2, 'transformer', 'test_key'))
+
+    def test_copy(self):
+        __, compact_block_structure = self.create_structures(ChildrenMapTestMixin.LINEAR_CHILDREN_MAP)
+        new_copy = compact_block_structure.copy()
+
+        new_copy.set_transformer_block_field(2, 'transformer', 'test_key', 'edit')
+        new_copy.set_transformer_block_field(3, 'transformer', 'new_key', 'new')
+        new_copy.remove_block(2, keep_descendants=True)
+        self.assert_block_structure(new_copy, [[1], [3], [], []], missing_blocks=[2])
+        self.assert_block_structure(compact_block_structure, ChildrenMapTestMixin.LINEAR_CHILDREN_MAP)
+        self.assertEquals(compact_block_structure.get_transformer_block_field(2, 'transformer', 'test_key'), 2)
+        self.assertIsNone(compact_block_structure.get_transformer_block_field(3, 'transformer', 'new_key'))
+
+        compact_block_structure.set_transformer_block_field(0, 'transformer', 'test_key', 'original edit')
+        self.assertEquals(new_copy.get_transformer_block_field(0, 'transformer', 'test_key'), 0)
+
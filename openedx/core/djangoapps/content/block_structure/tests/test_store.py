@@ -80,6 +80,20 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
             stored_value = self.store.get(self.block_structure.root_block_usage_key)
             self.assert_block_structure(stored_value, self.children_map)
 
+    def test_get_deserialized_once(self):
+        self.store.add(self.block_structure)
+        stored_value = self.store.get(self.block_structure.root_block_usage_key)
+        self.assertIs(self.store.get(self.block_structure.root_block_usage_key), stored_value)
+
+        # new data in the cache is deserialized again
+        self.block_structure.set_transformer_block_field(self.block_key_factory(1), MockTransformer, 'test', 'new')
+        self.store.add(self.block_structure)
+        new_stored_value = self.store.get(self.block_structure.root_block_usage_key)
+        self.assertIsNot(new_stored_value, stored_value)
+        self.assertEquals(
+            new_stored_value.get_transformer_block_field(self.block_key_factory(1), MockTransformer, 'test'), 'new'
+        )
+
     @ddt.data(1, 5, None)
     def test_cache_timeout(self, timeout):
         if timeout is not None:
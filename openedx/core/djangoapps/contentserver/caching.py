@@ -1,6 +1,8 @@
 """
 Helper functions for caching course assets.
 """
+from uuid import uuid4
+
 from django.core.cache import caches
 from django.core.cache.backends.base import InvalidCacheBackendError
 from opaque_keys import InvalidKeyError
@@ -47,4 +49,28 @@ def del_cached_content(location):
         # although deprecated keys allowed run=None, new keys don't if there is no version.
         pass
 
+    locations.append(_course_assets_version_key(location.course_key))
+
     CONTENT_CACHE.delete_many(locations, version=STATIC_CONTENT_VERSION)
+
+
+def get_course_assets_version(course_key):
+    """
+    Returns a token that changes whenever content of the course is deleted
+    from the cache by del_cached_content, so that data derived from the
+    course assets can be cached with it.
+    """
+    cache_key = _course_assets_version_key(course_key)
+    assets_version = CONTENT_CACHE.get(cache_key, version=STATIC_CONTENT_VERSION)
+    if assets_version is None:
+        # another process may add its token first, in which case it is used
+        CONTENT_CACHE.add(cache_key, uuid4().hex, None, version=STATIC_CONTENT_VERSION)
+        assets_version = CONTENT_CACHE.get(cache_key, version=STATIC_CONTENT_VERSION)
+    return assets_version
+
+
+def _course_assets_version_key(course_key):
+    """
+    Returns the cache key of the assets version of the given course.
+    """
+    return u'course_assets_version.{}'.format(course_key).encode('utf-8')
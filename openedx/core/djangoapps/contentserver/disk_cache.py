@@ -0,0 +1,222 @@
+"""
+Local disk cache of the course assets that are too large for the content cache.
+
+Cached files are named after the asset location and version, so a new version
+of an asset is a new file and stale versions are simply evicted.  The cache
+directory may be shared by the processes of a host: files are written
+atomically and the least recently used ones, by modification time, are evicted
+once the cache exceeds its size.
+
+A request for an asset that isn't cached is served from the contentstore, and
+the cache is filled in a background thread.  A lock file per asset makes sure
+that a single thread, among all the processes, downloads it.
+"""
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import dogstats_wrapper as dog_stats_api
+from django.conf import settings
+
+from xmodule.assetstore.assetmgr import AssetManager
+from xmodule.contentstore.content import STREAM_DATA_CHUNK_SIZE
+
+log = logging.getLogger(__name__)
+
+TEMP_FILE_SUFFIX = '.tmp'
+LOCK_FILE_SUFFIX = '.lock'
+
+# The lock file of a fill older than this many seconds was left by a process
+# that died, and is taken over.
+FILL_LOCK_TIMEOUT = 600
+
+
+def get_asset_disk_cache():
+    """
+    Returns the AssetDiskCache configured by CONTENTSERVER_DISK_CACHE_DIR and
+    CONTENTSERVER_DISK_CACHE_SIZE, or None if it is disabled.
+    """
+    directory = getattr(settings, 'CONTENTSERVER_DISK_CACHE_DIR', None)
+    max_size = getattr(settings, 'CONTENTSERVER_DISK_CACHE_SIZE', 0)
+    if not directory or not max_size:
+        return None
+    return AssetDiskCache(directory, max_size)
+
+
+def stream_file_range(cached_file, first_byte, last_byte):
+    """
+    Streams the data of the given open file between first_byte and last_byte
+    (included), and closes it.
+    """
+    with cached_file:
+        cached_file.seek(first_byte)
+        remaining = last_byte - first_byte + 1
+        while remaining > 0:
+            chunk = cached_file.read(min(STREAM_DATA_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class AssetDiskCache(object):
+    """
+    Caches the data of course assets in files of the given directory, up to
+    max_size bytes in total.
+    """
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def can_cache(self, content):
+        """
+        Returns whether the given content fits in the cache.
+        """
+        return content.length is not None and content.length <= self.max_size
+
+    def get_path(self, content):
+        """
+        Returns the path of the cached file of the given content, or None if
+        it isn't cached.
+        """
+        path = self._get_path(content)
+        try:
+            # Mark the file as recently used.
+            os.utime(path, None)
+        except OSError:
+            dog_stats_api.increment('contentserver.disk_cache.miss')
+            return None
+        dog_stats_api.increment('contentserver.disk_cache.hit')
+        return path
+
+    def fill_in_background(self, content):
+        """
+        Fills the cache with the given content in a new thread, which loads its
+        own stream of the asset.  Returns the thread, or None if the asset is
+        already being cached.
+        """
+        lock_path = self._get_path(content) + LOCK_FILE_SUFFIX
+        if not self._acquire_lock(lock_path):
+            return None
+        thread = threading.Thread(target=self._fill_locked, args=(content.location, lock_path))
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _fill_locked(self, location, lock_path):
+        """
+        Fills the cache with the asset at the given location, and releases the
+        lock of the fill.
+        """
+        try:
+            self.fill(AssetManager.find(location, as_stream=True))
+        except Exception:  # pylint: disable=broad-except
+            log.exception(u'Cannot cache asset %s on disk', location)
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+
+    def _acquire_lock(self, lock_path):
+        """
+        Creates the given lock file, taking it over if it's stale.  Returns
+        whether the lock was acquired.
+        """
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                log.exception(u'Cannot create the asset disk cache %s', self.directory)
+                return False
+
+        for __ in range(2):
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except OSError as error:
+                if error.errno != errno.EEXIST:
+                    log.exception(u'Cannot create a file in the asset disk cache %s', self.directory)
+                    return False
+            try:
+                if time.time() - os.path.getmtime(lock_path) < FILL_LOCK_TIMEOUT:
+                    return False
+                os.remove(lock_path)
+            except OSError:
+                # released or taken over by another process
+                return False
+        return False
+
+    def fill(self, content):
+        """
+        Writes the data of the given StaticContentStream to the cache and
+        returns the path of the cached file, or None if it can't be written.
+        The stream may be consumed even if it fails.
+        """
+        path = self._get_path(content)
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            file_descriptor, temp_path = tempfile.mkstemp(suffix=TEMP_FILE_SUFFIX, dir=self.directory)
+        except OSError:
+            log.exception(u'Cannot create a file in the asset disk cache %s', self.directory)
+            return None
+
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                for chunk in content.stream_data():
+                    temp_file.write(chunk)
+            os.rename(temp_path, path)
+        except (IOError, OSError):
+            log.exception(u'Cannot cache asset %s on disk', content.location)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+
+        dog_stats_api.increment('contentserver.disk_cache.fill')
+        dog_stats_api.histogram('contentserver.disk_cache.fill_size', content.length)
+        self._evict()
+        return path
+
+    def _evict(self):
+        """
+        Removes the least recently used files until the cache fits in max_size.
+        """
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.directory):
+            if name.endswith((TEMP_FILE_SUFFIX, LOCK_FILE_SUFFIX)):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # evicted by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        for __, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            dog_stats_api.increment('contentserver.disk_cache.eviction')
+
+        dog_stats_api.histogram('contentserver.disk_cache.size', total_size)
+
+    def _get_path(self, content):
+        """
+        Returns the path of the cached file of the given content.
+        """
+        version = content.content_digest or content.last_modified_at.isoformat()
+        key = u'{}@{}'.format(content.location, version)
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
@@ -4,24 +4,27 @@ Middleware to serve assets.
 
 import logging
 import datetime
+import os
 log = logging.getLogger(__name__)
 try:
     import newrelic.agent
 except ImportError:
     newrelic = None  # pylint: disable=invalid-name
+from django.conf import settings
 from django.http import (
-    HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
-    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect)
+    FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
+    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect, StreamingHttpResponse)
 from six import text_type
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from openedx.core.djangoapps.header_control import force_header_for_response
 from .caching import get_cached_content, set_cached_content
+from .disk_cache import get_asset_disk_cache, stream_file_range
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -115,6 +118,26 @@ class StaticContentServer(object):
                 if if_modified_since == last_modified_at_str:
                     return HttpResponseNotModified()
 
+            # Assets too large for the content cache are served from the local disk cache, if enabled.
+            # On a miss, the asset is streamed from the contentstore while the cache is filled in the background.
+            cached_path = None
+            cached_file = None
+            disk_cache = get_asset_disk_cache()
+            sendfile_header = getattr(settings, 'CONTENTSERVER_DISK_CACHE_SENDFILE_HEADER', None)
+            if disk_cache and isinstance(content, StaticContentStream) and disk_cache.can_cache(content):
+                cached_path = disk_cache.get_path(content)
+                if cached_path is None:
+                    disk_cache.fill_in_background(content)
+                elif not sendfile_header:
+                    try:
+                        cached_file = open(cached_path, 'rb')
+                    except IOError:
+                        # evicted by another process
+                        cached_path = None
+
+            if newrelic:
+                newrelic.agent.add_custom_parameter('contentserver.disk_cached', cached_path is not None)
+
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
@@ -122,9 +145,13 @@ class StaticContentServer(object):
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
-            if request.META.get('HTTP_RANGE'):
+            if cached_path and sendfile_header:
+                # The web server sends the file, and handles the Range header itself.
+                response = HttpResponse()
+                response[sendfile_header] = self.get_sendfile_value(cached_path)
+            elif request.META.get('HTTP_RANGE'):
                 # If we have a StaticContent, get a StaticContentStream.  Can't manipulate the bytes otherwise.
-                if isinstance(content, StaticContent):
+                if cached_path is None and isinstance(content, StaticContent):
                     content = AssetManager.find(loc, as_stream=True)
 
                 header_value = request.META['HTTP_RANGE']
@@ -151,7 +178,11 @@ class StaticContentServer(object):
 
                         if 0 <= first <= last < content.length:
                             # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                            if cached_file:
+                                response = StreamingHttpResponse(stream_file_range(cached_file, first, last))
+                                cached_file = None
+                            else:
+                                response = HttpResponse(content.stream_data_in_range(first, last))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
@@ -165,12 +196,21 @@ class StaticContentServer(object):
                                 u"Cannot satisfy ranges in Range header: %s for content: %s",
                                 header_value, text_type(loc)
                             )
+                            if cached_file:
+                                cached_file.close()
                             return HttpResponse(status=416)  # Requested Range Not Satisfiable
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                if cached_file:
+                    response = FileResponse(cached_file)
+                    cached_file = None
+                else:
+                    response = HttpResponse(content.stream_data())
                 response['Content-Length'] = content.length
+            if cached_file:
+                # Not used by a response, e.g. for an invalid range.
+                cached_file.close()
 
             if newrelic:
                 newrelic.agent.add_custom_parameter('contentserver.content_len', content.length)
@@ -220,6 +260,18 @@ class StaticContentServer(object):
         # caches a version of the response without CORS headers, in turn breaking XHR requests.
         force_header_for_response(response, 'Vary', 'Origin')
 
+    @staticmethod
+    def get_sendfile_value(cached_path):
+        """
+        Returns the value of the sendfile header for the given cached file: the
+        file path, or its name under CONTENTSERVER_DISK_CACHE_SENDFILE_PREFIX,
+        e.g. an internal nginx location for X-Accel-Redirect.
+        """
+        prefix = getattr(settings, 'CONTENTSERVER_DISK_CACHE_SENDFILE_PREFIX', None)
+        if prefix:
+            return prefix + os.path.basename(cached_path)
+        return cached_path
+
     @staticmethod
     def is_cdn_request(request):
         """
@@ -6,6 +6,10 @@ import copy
 import datetime
 import ddt
 import logging
+import os
+import shutil
+import StringIO
+import tempfile
 import unittest
 from uuid import uuid4
 
@@ -14,6 +18,7 @@ from django.test import RequestFactory
 from django.test.client import Client
 from django.test.utils import override_settings
 from mock import patch
+from PIL import Image
 
 from xmodule.contentstore.django import contentstore
 from xmodule.contentstore.content import StaticContent, VERSIONED_ASSETS_PREFIX
@@ -27,6 +32,7 @@ from xmodule.modulestore.exceptions import ItemNotFoundError
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory, AdminFactory
 
+from ..disk_cache import AssetDiskCache
 from ..middleware import parse_range_header, HTTP_DATE_FORMAT, StaticContentServer
 
 log = logging.getLogger(__name__)
@@ -199,6 +205,27 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200)
 
+    def test_locked_image_variants(self):
+        """
+        Test that the resized variants of a locked image are locked too.
+        """
+        image_file = StringIO.StringIO()
+        Image.new('RGB', (800, 400)).save(image_file, 'PNG')
+        location = self.course_key.make_asset_key('asset', 'locked_image.png')
+        content = StaticContent(location, 'locked_image.png', 'image/png', image_file.getvalue(), locked=True)
+        image_variants = self.contentstore.generate_image_variants(content)
+        self.contentstore.save(content)
+        self.assertEqual(len(image_variants), 3)
+
+        self.client.logout()
+        for __, variant_location in image_variants:
+            resp = self.client.get(unicode(variant_location))
+            self.assertEqual(resp.status_code, 403)
+
+        self.client.login(username=self.staff_usr, password='test')
+        resp = self.client.get(unicode(image_variants[0][1]))
+        self.assertEqual(resp.status_code, 200)
+
     def test_locked_asset_staff(self):
         """
         Test that locked assets behave appropriately in case user is staff.
@@ -402,6 +429,95 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
         is_from_cdn = StaticContentServer.is_cdn_request(browser_request)
         self.assertEqual(is_from_cdn, True)
 
+    def _enable_disk_cache(self, **settings_overrides):
+        """
+        Enables the asset disk cache in a temporary directory, for assets that aren't
+        kept in the content cache.  Returns the directory.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings_overrides.update(CONTENTSERVER_DISK_CACHE_DIR=cache_dir, CONTENTSERVER_DISK_CACHE_SIZE=1024 * 1024)
+        override = override_settings(**settings_overrides)
+        override.enable()
+        self.addCleanup(override.disable)
+        patcher = patch.object(
+            StaticContentServer,
+            'load_asset_from_location',
+            side_effect=lambda location: AssetManager.find(location, as_stream=True),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        fill_in_background = AssetDiskCache.fill_in_background
+
+        def fill_and_wait(disk_cache, content):
+            """
+            Waits for the cache to be filled, to test what the next request gets.
+            """
+            thread = fill_in_background(disk_cache, content)
+            if thread:
+                thread.join()
+            return thread
+
+        patcher = patch.object(AssetDiskCache, 'fill_in_background', autospec=True, side_effect=fill_and_wait)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return cache_dir
+
+    def test_disk_cache(self):
+        """
+        Tests that assets are served from the disk cache once cached, including ranges.
+        """
+        cache_dir = self._enable_disk_cache()
+        data = ''.join(AssetManager.find(self.unlocked_asset, as_stream=True).stream_data())
+
+        # a miss is served from the contentstore
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.streaming)
+        self.assertEqual(resp.content, data)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        with patch('openedx.core.djangoapps.contentserver.disk_cache.AssetDiskCache.fill') as mock_fill:
+            resp = self.client.get(self.url_unlocked)
+            self.assertEqual(''.join(resp.streaming_content), data)
+
+            first_byte = self.length_unlocked / 4
+            last_byte = self.length_unlocked / 2
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}'.format(
+                first=first_byte, last=last_byte))
+            self.assertEqual(resp.status_code, 206)
+            self.assertEqual(''.join(resp.streaming_content), data[first_byte:last_byte + 1])
+            self.assertEqual(resp['Content-Length'], str(last_byte - first_byte + 1))
+        self.assertFalse(mock_fill.called)
+
+    def test_disk_cache_sendfile(self):
+        """
+        Tests that the web server is asked to send cached assets when a sendfile header is set.
+        """
+        cache_dir = self._enable_disk_cache(
+            CONTENTSERVER_DISK_CACHE_SENDFILE_HEADER='X-Accel-Redirect',
+            CONTENTSERVER_DISK_CACHE_SENDFILE_PREFIX='/cached-assets/',
+        )
+        resp = self.client.get(self.url_unlocked)
+        self.assertNotIn('X-Accel-Redirect', resp)
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content, '')
+        self.assertEqual(resp['X-Accel-Redirect'], '/cached-assets/' + os.listdir(cache_dir)[0])
+
+    def test_disk_cache_evicted(self):
+        """
+        Tests that an asset evicted from the disk cache while it's served is served from the contentstore.
+        """
+        self._enable_disk_cache()
+        data = ''.join(AssetManager.find(self.unlocked_asset, as_stream=True).stream_data())
+        with patch.object(AssetDiskCache, 'get_path', return_value='/nonexistent/evicted-asset'):
+            resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content, data)
+
 
 @ddt.ddt
 class ParseRangeHeaderTestCase(unittest.TestCase):
@@ -0,0 +1,89 @@
+"""
+Tests for the asset disk cache.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from mock import Mock, patch
+
+from ..disk_cache import LOCK_FILE_SUFFIX, AssetDiskCache, stream_file_range
+
+
+class AssetDiskCacheTestCase(unittest.TestCase):
+    """
+    Tests for AssetDiskCache.
+    """
+    def setUp(self):
+        super(AssetDiskCacheTestCase, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.disk_cache = AssetDiskCache(self.cache_dir, 250)
+
+    def _content(self, name, data, content_digest='digest'):
+        """
+        Returns a mock StaticContentStream of the given data.
+        """
+        return Mock(
+            location=u'/asset-v1:org+course+run+type@asset+block@{}'.format(name),
+            content_digest=content_digest,
+            last_modified_at=datetime(2018, 1, 1),
+            length=len(data),
+            stream_data=Mock(return_value=iter([data[:50], data[50:]])),
+        )
+
+    def test_fill(self):
+        content = self._content('a', 'a' * 100)
+        self.assertIsNone(self.disk_cache.get_path(content))
+        path = self.disk_cache.fill(content)
+        self.assertEqual(self.disk_cache.get_path(content), path)
+        self.assertEqual(''.join(stream_file_range(open(path, 'rb'), 10, 59)), 'a' * 50)
+
+        # a new version of the asset is another file
+        self.assertIsNone(self.disk_cache.get_path(self._content('a', 'a' * 100, content_digest='new_digest')))
+
+    def test_eviction(self):
+        first, second, third = [self._content(name, name * 100) for name in ('a', 'b', 'c')]
+        first_path = self.disk_cache.fill(first)
+        second_path = self.disk_cache.fill(second)
+        os.utime(first_path, (0, 0))
+        os.utime(second_path, (1, 1))
+        # first becomes the most recently used one
+        self.disk_cache.get_path(first)
+
+        self.disk_cache.fill(third)
+        self.assertIsNotNone(self.disk_cache.get_path(first))
+        self.assertIsNone(self.disk_cache.get_path(second))
+        self.assertIsNotNone(self.disk_cache.get_path(third))
+
+    def test_too_large(self):
+        self.assertFalse(self.disk_cache.can_cache(self._content('a', 'a' * 251)))
+        self.assertTrue(self.disk_cache.can_cache(self._content('a', 'a' * 250)))
+
+    @patch('openedx.core.djangoapps.contentserver.disk_cache.AssetManager')
+    def test_fill_in_background(self, mock_asset_manager):
+        content = self._content('a', 'a' * 100)
+        mock_asset_manager.find.return_value = content
+        self.disk_cache.fill_in_background(content).join()
+        mock_asset_manager.find.assert_called_once_with(content.location, as_stream=True)
+        self.assertIsNotNone(self.disk_cache.get_path(content))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    @patch('openedx.core.djangoapps.contentserver.disk_cache.AssetManager')
+    def test_fill_in_background_locked(self, mock_asset_manager):
+        content = self._content('a', 'a' * 100)
+        mock_asset_manager.find.return_value = content
+        lock_path = self.disk_cache._get_path(content) + LOCK_FILE_SUFFIX  # pylint: disable=protected-access
+        open(lock_path, 'w').close()
+
+        # another fill is running
+        self.assertIsNone(self.disk_cache.fill_in_background(content))
+        self.assertFalse(mock_asset_manager.find.called)
+
+        # the other fill died
+        os.utime(lock_path, (0, 0))
+        self.disk_cache.fill_in_background(content).join()
+        self.assertIsNotNone(self.disk_cache.get_path(content))
+        self.assertFalse(os.path.exists(lock_path))
@@ -4,23 +4,115 @@ Utilities related to caching.
 import collections
 import cPickle as pickle
 import functools
+import threading
+import time
 import zlib
 
 from xblock.core import XBlock
 
 
-def memoize_in_request_cache(request_cache_attr_name=None):
+# Default number of entries kept by a memoized function.
+MEMOIZED_MAX_SIZE = 1024
+
+_MISSING = object()
+
+# Hit, miss and eviction counts of the caches of this process, by name.
+_cache_stats = {}
+
+
+class CacheStats(object):
+    """
+    Counters of a named cache, shared by all the instances of that cache.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+
+    def as_dict(self):
+        """
+        Returns the counters as a dict.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': self.size}
+
+
+def get_cache_stats():
+    """
+    Returns a dict mapping the name of each cache of this process to a dict
+    of its hit, miss and eviction counts and its last known size.
+    """
+    return {name: stats.as_dict() for name, stats in _cache_stats.items()}
+
+
+class LRUCache(object):
+    """
+    Thread-safe cache holding at most max_size entries, each for at most
+    timeout seconds, evicting the least recently used entries first.
+    Either bound may be None.  Counts hits, misses and evictions in the
+    CacheStats registered under the given name.
+    """
+    def __init__(self, name, max_size=None, timeout=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.stats = _cache_stats.setdefault(name, CacheStats())
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the value cached for key, or default.
+        """
+        with self._lock:
+            expires_at, value = self._data.pop(key, (None, _MISSING))
+            if value is _MISSING or (expires_at is not None and expires_at < time.time()):
+                self.stats.misses += 1
+                self.stats.size = len(self._data)
+                return default
+            self._data[key] = (expires_at, value)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Caches value for key, evicting the least recently used entries
+        if the cache is full.
+        """
+        expires_at = time.time() + self.timeout if self.timeout is not None else None
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (expires_at, value)
+            while self.max_size is not None and len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+            self.stats.size = len(self._data)
+
+    def clear(self):
+        """
+        Removes all the entries of the cache.
+        """
+        with self._lock:
+            self._data.clear()
+            self.stats.size = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+def memoize_in_request_cache(request_cache_attr_name=None, max_size=None):
     """
-    Memoize a method call's results in the request_cache if there's one. Creates the cache key by
-    joining the unicode of all the args with &; so, if your arg may use the default &, it may
-    have false hits.
+    Memoize a method call's results in the request_cache if there's one. Creates the cache key
+    from the unicode of all the args and kwargs.
 
     Arguments:
         request_cache_attr_name - The name of the field or property in this method's containing
          class that stores the request_cache.
+        max_size - The maximum number of results kept per request, or None.
     """
     def _decorator(func):
         """Outer method decorator."""
+        cache_name = u'{}.{}'.format(func.__module__, func.__name__)
+
         @functools.wraps(func)
         def _wrapper(self, *args, **kwargs):
             """
@@ -28,13 +120,16 @@ def memoize_in_request_cache(request_cache_attr_name=None):
             """
             request_cache = getattr(self, request_cache_attr_name, None)
             if request_cache:
-                cache_key = '&'.join([hashvalue(arg) for arg in args])
-                if cache_key in request_cache.data.setdefault(func.__name__, {}):
-                    return request_cache.data[func.__name__][cache_key]
-
-                result = func(self, *args, **kwargs)
-
-                request_cache.data[func.__name__][cache_key] = result
+                cache = request_cache.data.get(cache_name)
+                if cache is None:
+                    cache = request_cache.data[cache_name] = LRUCache(cache_name, max_size=max_size)
+                cache_key = tuple(hashvalue(arg) for arg in args) + tuple(
+                    (name, hashvalue(value)) for name, value in sorted(kwargs.items())
+                )
+                result = cache.get(cache_key, _MISSING)
+                if result is _MISSING:
+                    result = func(self, *args, **kwargs)
+                    cache.set(cache_key, result)
                 return result
             else:
                 return func(self, *args, **kwargs)
@@ -49,27 +144,38 @@ class memoized(object):  # pylint: disable=invalid-name
     (not reevaluated).
     https://wiki.python.org/moin/PythonDecoratorLibrary#Memoize
 
-    WARNING: Only use this memoized decorator for caching data that
-    is constant throughout the lifetime of a gunicorn worker process,
-    is costly to compute, and is required often.  Otherwise, it can lead to
-    unwanted memory leakage.
+    The cache is shared by the whole process and is bounded: it keeps the
+    MEMOIZED_MAX_SIZE most recently used results by default.  Use
+    memoized.bounded(max_size, timeout) to choose other bounds, e.g. a
+    timeout for data that may change during the lifetime of a gunicorn
+    worker process.
     """
 
-    def __init__(self, func):
+    def __init__(self, func, max_size=MEMOIZED_MAX_SIZE, timeout=None):
         self.func = func
-        self.cache = {}
+        self.cache = LRUCache(u'{}.{}'.format(func.__module__, func.__name__), max_size=max_size, timeout=timeout)
+
+    @classmethod
+    def bounded(cls, max_size=MEMOIZED_MAX_SIZE, timeout=None):
+        """
+        Returns a memoized decorator with the given bounds.
+        """
+        return lambda func: cls(func, max_size=max_size, timeout=timeout)
 
     def __call__(self, *args):
         if not isinstance(args, collections.Hashable):
             # uncacheable. a list, for instance.
             # better to not cache than blow up.
             return self.func(*args)
-        if args in self.cache:
-            return self.cache[args]
-        else:
+        try:
+            value = self.cache.get(args, _MISSING)
+        except TypeError:
+            # a tuple holding an unhashable value
+            return self.func(*args)
+        if value is _MISSING:
             value = self.func(*args)
-            self.cache[args] = value
-            return value
+            self.cache.set(args, value)
+        return value
 
     def __repr__(self):
         """
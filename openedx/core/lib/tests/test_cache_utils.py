@@ -4,9 +4,9 @@ Tests for cache_utils.py
 from unittest import TestCase
 
 import ddt
-from mock import MagicMock
+from mock import MagicMock, patch
 
-from openedx.core.lib.cache_utils import memoize_in_request_cache
+from openedx.core.lib.cache_utils import LRUCache, get_cache_stats, memoize_in_request_cache, memoized
 
 
 @ddt.ddt
@@ -63,3 +63,69 @@ class TestMemoizeInRequestCache(TestCase):
                 func_to_memoize(*arg_list2)
 
             self.assertEquals(self.func_to_count.call_count, 2)
+
+
+class TestLRUCache(TestCase):
+    """
+    Test the LRUCache class.
+    """
+    def test_max_size(self):
+        cache = LRUCache('test_max_size', max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        # 'b' is the least recently used entry
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(
+            get_cache_stats()['test_max_size'],
+            {'hits': 3, 'misses': 1, 'evictions': 1, 'size': 2},
+        )
+
+    @patch('openedx.core.lib.cache_utils.time.time')
+    def test_timeout(self, mock_time):
+        cache = LRUCache('test_timeout', timeout=10)
+        mock_time.return_value = 100
+        cache.set('a', 1)
+        mock_time.return_value = 110
+        self.assertEqual(cache.get('a'), 1)
+        mock_time.return_value = 111
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class TestMemoized(TestCase):
+    """
+    Test the memoized decorator.
+    """
+    def setUp(self):
+        super(TestMemoized, self).setUp()
+        self.calls = []
+
+    def func_to_count(self, param):
+        """
+        A test function recording its calls.
+        """
+        self.calls.append(param)
+        return param
+
+    def test_memoized(self):
+        memoized_func = memoized(self.func_to_count)
+        for _ in range(3):
+            self.assertEqual(memoized_func(1), 1)
+        self.assertEqual(self.calls, [1])
+
+    def test_bounded(self):
+        memoized_func = memoized.bounded(max_size=1)(self.func_to_count)
+        memoized_func(1)
+        memoized_func(2)
+        memoized_func(1)
+        self.assertEqual(self.calls, [1, 2, 1])
+
+    def test_unhashable(self):
+        memoized_func = memoized(self.func_to_count)
+        memoized_func([1])
+        memoized_func([1])
+        self.assertEqual(self.calls, [[1], [1]])
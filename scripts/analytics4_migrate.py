@@ -1,11 +1,10 @@
-import json
 import logging
 import time
 from django.utils import timezone
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from student.models import CourseEnrollment
 from triboo_analytics.models import (
-    dtdump,
+    LearnerCourseDayRecord,
     LearnerCourseJsonReport,
     LearnerCourseDailyReport,
 )
@@ -39,21 +38,11 @@ for o in overviews:
         if j == nb_enrollments or j % 10000 == 0:
             logger.info(j)
         reports = LearnerCourseDailyReport.objects.filter(user=e.user,
-                                                          course_id=e.course_id).order_by('created')
-        records = {}
-        for report in reports:
-            record = {
-                "status": report.status,
-                "progress": report.progress,
-                "badges": report.badges,
-                "current_score": report.current_score,
-                "posts": report.posts,
-                "total_time_spent": report.total_time_spent,
-                "enrollment_date": dtdump(report.enrollment_date) if report.enrollment_date else None,
-                "completion_date": dtdump(report.completion_date) if report.completion_date else None}
-            records[report.created.strftime('%Y-%m-%d')] = record
+                                                          course_id=e.course_id).order_by('created', 'id')
         last_report = reports.last()
-        LearnerCourseJsonReport.objects.update_or_create(user=e.user,
+        if not last_report:
+            continue
+        json_report, _ = LearnerCourseJsonReport.objects.update_or_create(user=e.user,
                                                          course_id=e.course_id,
                                                          defaults={'org': e.course_id.org,
                                                                    'status': last_report.status,
@@ -63,7 +52,22 @@ for o in overviews:
                                                                    'posts': last_report.posts,
                                                                    'total_time_spent': last_report.total_time_spent,
                                                                    'enrollment_date': last_report.enrollment_date,
-                                                                   'completion_date': last_report.completion_date,
-                                                                   'records': json.dumps(records)})
-
-
+                                                                   'completion_date': last_report.completion_date})
+        # a single record per day, the last report of the day as in the former records dict
+        last_reports_by_day = {}
+        for report in reports:
+            last_reports_by_day[report.created] = report
+        json_report.day_records.all().delete()
+        LearnerCourseDayRecord.objects.bulk_create([
+            LearnerCourseDayRecord(report=json_report,
+                                   day=report.created,
+                                   status=report.status,
+                                   progress=report.progress,
+                                   badges=report.badges,
+                                   current_score=report.current_score,
+                                   posts=report.posts,
+                                   total_time_spent=report.total_time_spent,
+                                   enrollment_date=report.enrollment_date,
+                                   completion_date=report.completion_date)
+            for report in last_reports_by_day.itervalues()
+        ])
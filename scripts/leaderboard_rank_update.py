@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import logging
+import os
+import time
+
+from logging.handlers import TimedRotatingFileHandler
+from triboo_analytics.models import LeaderBoardRank
+
+
+logger = logging.getLogger("triboo_analytics")
+
+d = os.path.dirname('/edx/var/log/lms/leaderboard.log')
+if not os.path.exists(d):
+    os.makedirs(d)
+
+log_handler = TimedRotatingFileHandler("/edx/var/log/lms/leaderboard.log",
+                                       when="W0",
+                                       backupCount=5,
+                                       encoding="utf-8")
+log_formatter = logging.Formatter('%(asctime)s [%(name)s] [%(filename)s:%(lineno)d] %(levelname)s  - %(message)s')
+log_formatter.converter = time.gmtime
+log_handler.setFormatter(log_formatter)
+log_handler.setLevel(logging.INFO)
+logger.addHandler(log_handler)
+
+logger.info("Start refreshing leaderboard ranks ...")
+LeaderBoardRank.refresh()
+logger.info("Finish.")